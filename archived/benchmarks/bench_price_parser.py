@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+価格パーサーのベンチマーク
+ゴールデンコーパスを繰り返した入力で、1件ずつの解析・一括解析・従来の正規表現を比較
+
+使用例:
+    python benchmarks/bench_price_parser.py --count 100000
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import price_parser
+from src.utils.price_parser import parse_price, parse_prices
+
+CORPUS_FILE = Path(__file__).parent.parent / "tests" / "fixtures" / "price_corpus.json"
+
+
+def legacy_parse(text):
+    """置き換え前の各所の実装（毎回パターンを解釈）"""
+    match = re.search(r'([\d,]+\.?\d*)', text)
+    return float(match.group(1).replace(',', '')) if match else None
+
+
+def measure(label, func, count):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {count / elapsed:>12,.0f} strings/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price parsing")
+    parser.add_argument("--count", type=int, default=100_000, help="number of strings to parse")
+    parser.add_argument("--unique", action="store_true", help="make every string unique (defeats the cache)")
+    args = parser.parse_args()
+
+    corpus = [case["text"] for case in json.loads(CORPUS_FILE.read_text(encoding="utf-8"))]
+    texts = [corpus[i % len(corpus)] for i in range(args.count)]
+    if args.unique:
+        texts = [f"{text} #{i}" for i, text in enumerate(texts)]
+
+    print(f"Parsing {len(texts):,} strings ({len(set(texts)):,} unique)")
+    price_parser._parse.cache_clear()
+    measure("parse_prices (batch)", lambda: parse_prices(texts, "JPY"), len(texts))
+    price_parser._parse.cache_clear()
+    measure("parse_price (per string)", lambda: [parse_price(text, "JPY") for text in texts], len(texts))
+    measure("legacy re.search", lambda: [legacy_parse(text) for text in texts], len(texts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+取得サイクル全体のベンチマーク
+合成カタログ（10〜10,000件）をローカルのリプレイサーバーから返し、各段階を別プロセスで実行して
+スループット・商品ごとの取得レイテンシ（p50/p95/p99）・最大RSS・CPU時間を計測する
+
+段階:
+    bullionstar    BullionStarScraper.run
+    coin           CoinPriceScraper.run
+    update_prices  update_prices.main
+    monitor        GoldPriceMonitor.run_once（メール送信は行わない）
+
+使用例:
+    python benchmarks/bench_scrape_cycle.py --sizes 10 100 1000 --repeat 3
+    python benchmarks/bench_scrape_cycle.py --sizes 10000 --stages bullionstar coin --latency 0.05 --jitter 0.02
+    python benchmarks/bench_scrape_cycle.py --compare benchmarks/results/before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).parent.parent
+PYTHON_VERSIONS = ROOT.parent / "python-versions"
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(ROOT))
+sys.path.insert(1, str(Path(__file__).parent))
+
+STAGES = ('bullionstar', 'coin', 'update_prices', 'monitor')
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """最近傍順位法のパーセンタイル"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values) if values else None
+    }
+
+
+# --- 子プロセス: 1つの段階を repeat 回実行 ---------------------------------
+
+class NullNotifier:
+    """ベンチマーク中はメールを送らない"""
+
+    def send_price_alert(self, *args, **kwargs) -> bool:
+        return True
+
+    def send_email(self, *args, **kwargs) -> bool:
+        return True
+
+    def send_error_notification(self, *args, **kwargs) -> bool:
+        return True
+
+
+def _install_fast_limiter():
+    """ローカルサーバー相手なのでホスト別レート制限を実質外す（--polite なら実際の制限のまま）"""
+    from src.utils import rate_limiter
+    policy = rate_limiter.HostPolicy(
+        rate=10_000, max_rate=10_000, burst=10_000, concurrency=64, max_concurrency=64, min_concurrency=64
+    )
+    rate_limiter._limiter = rate_limiter.AdaptiveRateLimiter(policies={}, default_policy=policy)
+
+
+def _import_stage(stage: str):
+    """計測に含めないよう段階のモジュールを先に読み込む"""
+    if stage == 'bullionstar':
+        import src.scrapers.bullionstar  # noqa: F401
+    elif stage == 'coin':
+        import src.coin_scraper  # noqa: F401
+    elif stage == 'update_prices':
+        import update_prices  # noqa: F401
+    elif stage == 'monitor':
+        import run_monitor  # noqa: F401
+
+
+async def _run_stage(stage: str, started_iso: str) -> int:
+    """段階を1回実行し、価格を取得できた商品数を返す"""
+    if stage == 'bullionstar':
+        from src.scrapers.bullionstar import BullionStarScraper
+        return len(await BullionStarScraper().run())
+
+    if stage == 'coin':
+        from src.coin_scraper import CoinPriceScraper
+        from src.utils.deadline import Budget
+        with open("data/products.json", 'r', encoding='utf-8') as f:
+            products = json.load(f)
+        return len(await CoinPriceScraper().run(products, Budget.from_env('CYCLE_BUDGET', 600)))
+
+    if stage == 'update_prices':
+        import update_prices
+        await update_prices.main()
+        with open("data/products.json", 'r', encoding='utf-8') as f:
+            products = json.load(f)
+        return sum(1 for info in products.values() if (info.get('last_updated') or '') >= started_iso)
+
+    if stage == 'monitor':
+        from run_monitor import GoldPriceMonitor
+        monitor = GoldPriceMonitor()
+        monitor.notifier = NullNotifier()
+        await monitor.run_once()
+        return len(monitor.last_prices)
+
+    raise ValueError(f"unknown stage: {stage}")
+
+
+def _cpu_seconds() -> Dict[str, float]:
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return {
+        'user': sum(item.ru_utime for item in usage),
+        'system': sum(item.ru_stime for item in usage)
+    }
+
+
+async def child_main(stage: str, repeat: int, polite: bool) -> Dict:
+    sys.path.insert(0, str(PYTHON_VERSIONS))
+    if not polite:
+        _install_fast_limiter()
+    _import_stage(stage)
+
+    runs = []
+    cpu_before = _cpu_seconds()
+    try:
+        for _ in range(repeat):
+            started = time.time()
+            priced = await _run_stage(stage, datetime.fromtimestamp(started).isoformat())
+            ended = time.time()
+            runs.append({'started': started, 'ended': ended, 'wall': ended - started, 'priced': priced})
+    finally:
+        from src.utils.browser_service import close_browser_service
+        await close_browser_service()
+    cpu_after = _cpu_seconds()
+
+    # ru_maxrss は Linux では KB
+    peak_kb = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return {
+        'runs': runs,
+        'cpu_seconds': {key: cpu_after[key] - cpu_before[key] for key in cpu_after},
+        'peak_rss_mb': peak_kb / 1024
+    }
+
+
+# --- 親プロセス: サーバーを起動して段階・件数ごとに子プロセスを実行 ---------------
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def _run_child(stage: str, args, workdir: Path, server_url: str) -> Dict:
+    from synthetic_site import WORKER_HOST
+
+    env = {
+        **os.environ,
+        'SCRAPER_REPLAY_URL': server_url,
+        'WORKER_URL': f"{server_url}/{WORKER_HOST}",
+        'CURRENCIES': args.currency,
+        'CURRENCY': args.currency,
+        'PRICE_CACHE_TTL': '0',
+        'CYCLE_BUDGET': str(args.budget),
+        'FX_SOURCE': '',
+        'JOB_QUEUE': '',
+        # GoldPriceMonitor の設定検証用（送信はしない）
+        'GMAIL_ADDRESS': 'bench@example.com',
+        'GMAIL_APP_PASSWORD': 'bench',
+        'RECIPIENT_EMAIL': 'bench@example.com',
+        'THRESHOLD_PRICE': '0',
+    }
+    command = [sys.executable, str(Path(__file__).resolve()), '--child', stage, '--repeat', str(args.repeat)]
+    if args.polite:
+        command.append('--polite')
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=workdir,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=None if args.verbose else asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await process.communicate()
+    lines = stdout.decode().strip().splitlines()
+    if process.returncode != 0 or not lines:
+        raise RuntimeError(f"{stage} exited with code {process.returncode}")
+    return json.loads(lines[-1])
+
+
+async def bench(args) -> Dict:
+    from src.replay.server import ReplayServer
+    from synthetic_site import SyntheticSite, make_catalog
+
+    server = ReplayServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    server_url = await server.start()
+    results = []
+    try:
+        for size in args.sizes:
+            catalog = make_catalog(size, args.dealer_share, args.browser_share, args.seed)
+            for stage in args.stages:
+                site = SyntheticSite(catalog)
+                server.fallback = site
+                requests_before, errors_before = server.stats['requests'], server.stats['errors']
+
+                workdir = Path(tempfile.mkdtemp(prefix=f"bench-{stage}-{size}-"))
+                try:
+                    (workdir / "data").mkdir()
+                    with open(workdir / "data" / "products.json", 'w', encoding='utf-8') as f:
+                        json.dump(site.products_json(), f)
+                    child = await _run_child(stage, args, workdir, server_url)
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+
+                latencies = []
+                for run in child['runs']:
+                    first = site.first_served(run['started'], run['ended'])
+                    latencies.extend(served_at - run['started'] for served_at in first.values())
+                walls = [run['wall'] for run in child['runs']]
+                priced = sum(run['priced'] for run in child['runs'])
+
+                result = {
+                    'stage': stage,
+                    'size': size,
+                    'repeat': args.repeat,
+                    'priced_per_run': priced / len(child['runs']),
+                    'products_per_second': priced / sum(walls) if sum(walls) else None,
+                    'cycle_seconds': summarize(walls),
+                    'latency_seconds': summarize(latencies),
+                    'peak_rss_mb': child['peak_rss_mb'],
+                    'cpu_seconds': child['cpu_seconds'],
+                    'requests': server.stats['requests'] - requests_before,
+                    'injected_errors': server.stats['errors'] - errors_before
+                }
+                results.append(result)
+                _print_row(result)
+    finally:
+        await server.stop()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('compare', 'output', 'child')}
+        },
+        'results': results
+    }
+
+
+def _fmt(value: Optional[float], spec: str = '.3f') -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def _print_header():
+    print(f"{'stage':<14}{'size':>7}{'priced':>8}{'prod/s':>10}{'cycle p50':>11}"
+          f"{'lat p50':>9}{'lat p95':>9}{'lat p99':>9}{'rss MB':>8}{'cpu s':>8}")
+
+
+def _print_row(result: Dict):
+    latency = result['latency_seconds']
+    cpu = result['cpu_seconds']['user'] + result['cpu_seconds']['system']
+    print(
+        f"{result['stage']:<14}{result['size']:>7}{result['priced_per_run']:>8.0f}"
+        f"{_fmt(result['products_per_second'], '.1f'):>10}{_fmt(result['cycle_seconds']['p50']):>11}"
+        f"{_fmt(latency['p50']):>9}{_fmt(latency['p95']):>9}{_fmt(latency['p99']):>9}"
+        f"{result['peak_rss_mb']:>8.0f}{cpu:>8.2f}",
+        flush=True
+    )
+
+
+def compare(current: Dict, baseline: Dict):
+    """前回の結果と段階・件数ごとに比較"""
+    before = {(item['stage'], item['size']): item for item in baseline.get('results', [])}
+    print(f"\nCompared with {baseline.get('meta', {}).get('revision') or 'baseline'} "
+          f"({baseline.get('meta', {}).get('timestamp', '?')})")
+    print(f"{'stage':<14}{'size':>7}{'prod/s':>18}{'lat p95':>18}{'rss MB':>16}")
+    for item in current['results']:
+        old = before.get((item['stage'], item['size']))
+        if not old:
+            continue
+
+        def change(new: Optional[float], previous: Optional[float]) -> str:
+            if new is None or not previous:
+                return '-'
+            return f"{(new - previous) / previous * 100:+.1f}%"
+
+        print(
+            f"{item['stage']:<14}{item['size']:>7}"
+            f"{change(item['products_per_second'], old['products_per_second']):>18}"
+            f"{change(item['latency_seconds']['p95'], old['latency_seconds']['p95']):>18}"
+            f"{change(item['peak_rss_mb'], old['peak_rss_mb']):>16}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full scrape cycles against a local synthetic catalog")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="catalog sizes (10 to 10000)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="cycles per stage and size")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency per response (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="random +/- latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of injected 503 responses")
+    parser.add_argument("--dealer-share", type=float, default=0.2, help="fraction of products on dealer pages")
+    parser.add_argument("--browser-share", type=float, default=0.0,
+                        help="fraction of dealer pages that need the browser (requires Chromium)")
+    parser.add_argument("--currency", default="JPY")
+    parser.add_argument("--budget", type=float, default=600, help="cycle budget (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--polite", action="store_true", help="keep the real per-host rate limits")
+    parser.add_argument("--verbose", action="store_true", help="show scraper logs")
+    parser.add_argument("--output", type=Path, help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="previous JSON results to compare with")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child_main(args.child, args.repeat, args.polite))))
+        return
+
+    _print_header()
+    report = asyncio.run(bench(args))
+
+    output = args.output or RESULTS_DIR / f"scrape_cycle-{datetime.now().strftime('%Y%m%dT%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
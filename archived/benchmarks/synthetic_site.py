@@ -0,0 +1,134 @@
+"""
+ベンチマーク用の合成サイト
+任意の件数の商品カタログを作り、BullionStar の価格API・ディーラーの商品ページ・Worker の商品一覧を
+ReplayServer の fallback として返す。商品ごとに価格を返した時刻を記録する
+"""
+
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+from src.utils.price_parser import format_price
+
+API_HOST = 'services.bullionstar.com'
+API_PATH = '/product/v2/prices'
+# update_prices.py の WORKER_URL の代わり（{server}/bench.local/api/products）
+WORKER_HOST = 'bench.local'
+
+# ディーラーのホスト数（ホスト別レート制限・シャード分割が効く程度に分散させる）
+DEALER_HOSTS = 8
+
+# 通貨ごとの価格の倍率（基準は SGD）
+CURRENCY_FACTORS = {'SGD': 1.0, 'JPY': 111.0, 'USD': 0.74, 'EUR': 0.68, 'GBP': 0.58}
+
+
+def make_catalog(size: int, dealer_share: float = 0.2, browser_share: float = 0.0, seed: int = 0) -> Dict[str, Dict]:
+    """size 件の商品（dealer_share の割合はディーラーのページ、残りは BullionStar の商品ID付き）
+
+    browser_share の割合のディーラーページは価格をスクリプトで描画する（静的HTMLでは取れない）。
+    """
+    rng = random.Random(seed)
+    catalog = {}
+    for index in range(size):
+        base = round(rng.uniform(30, 4000), 2)
+        if rng.random() < dealer_share:
+            host = f"dealer-{index % DEALER_HOSTS}.example"
+            render = 'script' if rng.random() < browser_share else 'static'
+            catalog[f"dealer-{index}"] = {
+                'url': f"https://{host}/product/{index}?render={render}",
+                'name': f"Dealer Coin {index}",
+                'enabled': True,
+                'base_price': base
+            }
+        else:
+            catalog[f"bullionstar-{index}"] = {
+                'id': 10000 + index,
+                'url': f"https://www.bullionstar.com/buy/product/coin-{index}",
+                'name': f"BullionStar Coin {index}",
+                'enabled': True,
+                'base_price': base
+            }
+    return catalog
+
+
+def _dealer_page(name: str, price: float, render: str) -> str:
+    if render == 'script':
+        # 構造化データなし、価格はスクリプトで描画
+        return (
+            f"<html lang='en-US'><head><title>{name}</title></head><body><h1>{name}</h1>"
+            f"<span class='price' id='price'></span>"
+            f"<script>document.getElementById('price').textContent = 'US$' + ({price}).toFixed(2);</script>"
+            f"</body></html>"
+        )
+    offer = {
+        '@context': 'https://schema.org',
+        '@type': 'Product',
+        'name': name,
+        'offers': {'@type': 'Offer', 'price': f"{price:.2f}", 'priceCurrency': 'USD'}
+    }
+    return (
+        f"<html lang='en-US'><head><title>{name}</title>"
+        f"<script type='application/ld+json'>{json.dumps(offer)}</script></head>"
+        f"<body><h1>{name}</h1><span class='price'>US${price:,.2f}</span></body></html>"
+    )
+
+
+class SyntheticSite:
+    """合成カタログを返す ReplayServer の fallback"""
+
+    def __init__(self, catalog: Dict[str, Dict]):
+        self.catalog = catalog
+        self._by_id = {str(info['id']): key for key, info in catalog.items() if 'id' in info}
+        self._by_path = {urlsplit(info['url']).netloc + urlsplit(info['url']).path: key
+                         for key, info in catalog.items() if 'id' not in info}
+        # (時刻, 商品キー)
+        self.served: List[Tuple[float, str]] = []
+
+    def products_json(self) -> Dict[str, Dict]:
+        """Worker の /api/products と同じ形（base_price は含めない）"""
+        return {
+            key: {name: value for name, value in info.items() if name != 'base_price'}
+            for key, info in self.catalog.items()
+        }
+
+    def first_served(self, start: float, end: float) -> Dict[str, float]:
+        """[start, end] の間に各商品の価格を最初に返した時刻"""
+        first: Dict[str, float] = {}
+        for served_at, key in self.served:
+            if start <= served_at <= end and key not in first:
+                first[key] = served_at
+        return first
+
+    async def __call__(self, request: web.Request, url: str) -> Optional[web.StreamResponse]:
+        parts = urlsplit(url)
+        now = time.time()
+
+        if parts.netloc == API_HOST and parts.path == API_PATH:
+            currency = request.query.get('currency', 'SGD').upper()
+            factor = CURRENCY_FACTORS.get(currency, 1.0)
+            products = []
+            for product_id in filter(None, request.query.get('productIds', '').split(',')):
+                key = self._by_id.get(product_id)
+                if key:
+                    amount = self.catalog[key]['base_price'] * factor
+                    products.append({'productId': int(product_id), 'price': format_price(amount, currency)})
+                    self.served.append((now, key))
+            return web.json_response({'products': products})
+
+        if parts.netloc == WORKER_HOST and parts.path == '/api/products':
+            return web.json_response(self.products_json())
+
+        key = self._by_path.get(parts.netloc + parts.path)
+        if key:
+            info = self.catalog[key]
+            render = request.query.get('render', 'static')
+            self.served.append((now, key))
+            return web.Response(
+                text=_dealer_page(info['name'], info['base_price'] * CURRENCY_FACTORS['USD'], render),
+                content_type='text/html'
+            )
+        return None
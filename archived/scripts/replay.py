@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+記録・再生によるオフライン実行
+実サイトの応答を記録し、ローカルのリプレイサーバーから再生する
+
+使用例:
+    # data/products.json の商品のAPI応答とページを記録
+    python scripts/replay.py record --store data/replay
+
+    # 遅延50ms±20ms・エラー1%で再生
+    python scripts/replay.py serve --store data/replay --port 8765 --latency 0.05 --jitter 0.02 --error-rate 0.01
+
+    # スクレイパーをリプレイサーバーに向ける
+    SCRAPER_REPLAY_URL=http://127.0.0.1:8765 python ../python-versions/update_prices.py
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import get_currencies
+from src.replay.store import FixtureStore
+
+DEFAULT_STORE = Path("data/replay")
+
+
+async def record(args):
+    from src.replay.recorder import FixtureRecorder
+    from src.scrapers.bullionstar import BullionStarScraper
+
+    products = BullionStarScraper().load_products()
+    store = FixtureStore(args.store)
+    recorded = await FixtureRecorder(store).record_products(products, args.currencies or get_currencies())
+    print(f"Recorded {recorded} responses for {len(products)} products into {args.store}")
+
+
+async def serve(args):
+    from src.replay.server import ReplayServer
+
+    store = FixtureStore(args.store)
+    server = ReplayServer(
+        store,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+    url = await server.start(args.host, args.port)
+    print(f"Replaying {len(store)} responses on {url} (set SCRAPER_REPLAY_URL={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f"Stats: {server.stats}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Record and replay scraper traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record API responses and dealer pages")
+    record_parser.add_argument("--store", type=Path, default=DEFAULT_STORE)
+    record_parser.add_argument("--currencies", nargs="*", help="currencies to record (default: CURRENCIES)")
+
+    serve_parser = commands.add_parser("serve", help="serve recorded responses")
+    serve_parser.add_argument("--store", type=Path, default=DEFAULT_STORE)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    serve_parser.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds around latency")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    serve_parser.add_argument("--error-status", type=int, default=503)
+    serve_parser.add_argument("--seed", type=int, help="random seed for jitter and errors")
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(record(args) if args.command == "record" else serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,12 @@ from pathlib import Path
 from datetime import datetime
 import sys
 
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.fx import DERIVED
+from src.utils.price_parser import format_price
+
 def view_price_history():
     """価格履歴を見やすく表示"""
     history_file = Path("data/price_history.json")
@@ -31,7 +37,15 @@ def view_price_history():
 
         for product_id, data in history.items():
             print(f"\n商品: {data['name']}")
-            print(f"価格: ${data['price']:.2f}")
+            # 通貨別の価格を並べて表示（換算値には * を付ける）
+            prices = data.get('prices') or {data.get('currency', 'SGD'): data['price']}
+            origin = data.get('price_origin', {})
+            print("価格: " + " / ".join(
+                format_price(price, currency) + (" *" if origin.get(currency) == DERIVED else "")
+                for currency, price in prices.items()
+            ))
+            if data.get('fx_timestamp'):
+                print(f"  * 為替レート（{data['fx_timestamp']}）からの換算値")
             print(f"URL: {data['url']}")
 
             # タイムスタンプをパース
@@ -0,0 +1,144 @@
+"""
+価格履歴ストアのインターフェース
+PriceAnalyzer が使う価格ポイント・アラートの保存先（JSONファイル、SQLite）
+"""
+
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WindowStats:
+    """期間内の価格の集計（first / last は時刻順）"""
+    count: int
+    first: float
+    last: float
+    min: float
+    max: float
+    avg: float
+
+
+class PriceHistoryStore(ABC):
+    """商品名・時刻（ISO形式）ごとの価格ポイントと、発生したアラートを保存する
+
+    期間の条件は ISO 形式の時刻の文字列比較で、after / before は境界を含まない。
+    """
+
+    @abstractmethod
+    def add_point(self, point: Dict, retain_after: Optional[str] = None):
+        """価格ポイント（PricePoint の dict）を追加し、retain_after 以前のポイントを削除"""
+
+    @abstractmethod
+    def first_price(self, product_name: str, before: str) -> Optional[float]:
+        """before より前で最も古い価格"""
+
+    @abstractmethod
+    def window(self, product_name: str, after: str) -> Optional[WindowStats]:
+        """after より後の価格の集計（該当なしはNone）"""
+
+    @abstractmethod
+    def add_alerts(self, alerts: List[Dict], retain_after: Optional[str] = None):
+        """アラート（PriceAlert の dict）を追加し、retain_after 以前のアラートを削除"""
+
+    @abstractmethod
+    def load(self) -> Dict:
+        """全体を {"prices": [...], "alerts": [...]} の形で返す"""
+
+    @abstractmethod
+    def save(self, history: Dict) -> bool:
+        """全体を {"prices": [...], "alerts": [...]} の内容に置き換える"""
+
+    def close(self):
+        """接続を閉じる"""
+
+
+class JSONHistoryStore(PriceHistoryStore):
+    """price_history.json に全体を保存する（操作ごとに全件を読み書きする）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> Dict:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load history: {e}")
+        return {"prices": [], "alerts": []}
+
+    def save(self, history: Dict) -> bool:
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(history, f, indent=2, ensure_ascii=False)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save history: {e}")
+            return False
+
+    def add_point(self, point: Dict, retain_after: Optional[str] = None):
+        history = self.load()
+        history["prices"].append(point)
+        if retain_after:
+            history["prices"] = [p for p in history["prices"] if p["timestamp"] > retain_after]
+        self.save(history)
+
+    def first_price(self, product_name: str, before: str) -> Optional[float]:
+        past_prices = [
+            p for p in self.load()["prices"]
+            if p["product_name"] == product_name and p["timestamp"] < before
+        ]
+        return past_prices[0]["price"] if past_prices else None
+
+    def window(self, product_name: str, after: str) -> Optional[WindowStats]:
+        prices = [
+            p["price"] for p in self.load()["prices"]
+            if p["product_name"] == product_name and p["timestamp"] > after
+        ]
+        if not prices:
+            return None
+        return WindowStats(
+            count=len(prices),
+            first=prices[0],
+            last=prices[-1],
+            min=min(prices),
+            max=max(prices),
+            avg=sum(prices) / len(prices)
+        )
+
+    def add_alerts(self, alerts: List[Dict], retain_after: Optional[str] = None):
+        history = self.load()
+        history["alerts"].extend(alerts)
+        if retain_after:
+            history["alerts"] = [a for a in history["alerts"] if a["triggered_at"] > retain_after]
+        self.save(history)
+
+
+def get_history_store(data_dir: Path) -> PriceHistoryStore:
+    """PRICE_HISTORY_BACKEND（json / sqlite、既定 json）に応じたストアを返す
+
+    sqlite で price_history.db が空なら、既存の price_history.json を取り込む。
+    """
+    data_dir = Path(data_dir)
+    json_store = JSONHistoryStore(data_dir / "price_history.json")
+    backend = os.getenv('PRICE_HISTORY_BACKEND', 'json').lower()
+    if backend == 'json':
+        return json_store
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown PRICE_HISTORY_BACKEND: {backend}")
+
+    from src.analyzers.sqlite_history import SQLiteHistoryStore
+
+    store = SQLiteHistoryStore(data_dir / "price_history.db")
+    if store.is_empty() and json_store.path.exists():
+        history = json_store.load()
+        store.save(history)
+        logger.info(f"Imported {len(history.get('prices', []))} price points from {json_store.path}")
+    return store
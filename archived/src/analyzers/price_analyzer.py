@@ -5,6 +5,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
+from src.analyzers.history_store import PriceHistoryStore, get_history_store
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -24,38 +26,25 @@ class PriceAlert:
     triggered_at: str
 
 class PriceAnalyzer:
-    """価格データの分析と追跡"""
+    """価格データの分析と追跡（保存先は store、省略時は PRICE_HISTORY_BACKEND に従う）"""
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", store: Optional[PriceHistoryStore] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         self.history_file = self.data_dir / "price_history.json"
         self.alert_file = self.data_dir / "last_alert.json"
+        self.store = store or get_history_store(self.data_dir)
 
     def load_history(self) -> Dict:
         """価格履歴を読み込み"""
-        if self.history_file.exists():
-            try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load history: {e}")
-        return {"prices": [], "alerts": []}
+        return self.store.load()
 
     def save_history(self, history: Dict) -> bool:
         """価格履歴を保存"""
-        try:
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save history: {e}")
-            return False
+        return self.store.save(history)
 
     def add_price_point(self, product_name: str, price: float, source: str = "BullionStar") -> None:
         """新しい価格ポイントを追加"""
-        history = self.load_history()
-
         price_point = PricePoint(
             timestamp=datetime.now().isoformat(),
             price=price,
@@ -63,16 +52,9 @@ class PriceAnalyzer:
             source=source
         )
 
-        history["prices"].append(asdict(price_point))
-
         # 古いデータを削除（30日以上前）
         cutoff_date = (datetime.now() - timedelta(days=30)).isoformat()
-        history["prices"] = [
-            p for p in history["prices"]
-            if p["timestamp"] > cutoff_date
-        ]
-
-        self.save_history(history)
+        self.store.add_point(asdict(price_point), retain_after=cutoff_date)
         logger.info(f"Added price point: {product_name} - {price}")
 
     def check_threshold(self, current_price: float, threshold: float, product_name: str) -> Optional[PriceAlert]:
@@ -88,20 +70,13 @@ class PriceAnalyzer:
 
     def check_percentage_change(self, product_name: str, current_price: float, hours: int = 24) -> Optional[PriceAlert]:
         """指定時間内の価格変動率をチェック"""
-        history = self.load_history()
         cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
 
-        # 該当商品の過去価格を取得
-        past_prices = [
-            p for p in history["prices"]
-            if p["product_name"] == product_name and p["timestamp"] < cutoff_time
-        ]
-
-        if not past_prices:
+        # 該当商品の過去価格のうち最も古い価格と比較
+        old_price = self.store.first_price(product_name, before=cutoff_time)
+        if old_price is None:
             return None
 
-        # 最も古い価格と比較
-        old_price = past_prices[0]["price"]
         change_percent = ((current_price - old_price) / old_price) * 100
 
         if abs(change_percent) >= 5:  # 5%以上の変動
@@ -116,20 +91,15 @@ class PriceAnalyzer:
 
     def check_new_extremes(self, product_name: str, current_price: float, days: int = 7) -> Optional[PriceAlert]:
         """新しい最高値・最安値をチェック"""
-        history = self.load_history()
         cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
 
-        # 該当期間の価格を取得
-        recent_prices = [
-            p["price"] for p in history["prices"]
-            if p["product_name"] == product_name and p["timestamp"] > cutoff_time
-        ]
-
-        if not recent_prices:
+        # 該当期間の最安値・最高値
+        stats = self.store.window(product_name, after=cutoff_time)
+        if not stats:
             return None
 
-        min_price = min(recent_prices)
-        max_price = max(recent_prices)
+        min_price = stats.min
+        max_price = stats.max
 
         if current_price < min_price:
             return PriceAlert(
@@ -152,7 +122,7 @@ class PriceAnalyzer:
         alerts = []
 
         for product_name, price_data in prices.items():
-            current_price = price_data.price_sgd
+            current_price = price_data['price']
 
             # 価格履歴に追加
             self.add_price_point(product_name, current_price)
@@ -181,39 +151,25 @@ class PriceAnalyzer:
 
     def _save_alerts(self, alerts: List[PriceAlert]) -> None:
         """アラートを保存"""
-        history = self.load_history()
-        for alert in alerts:
-            history["alerts"].append(asdict(alert))
-
         # 古いアラートを削除（7日以上前）
         cutoff_date = (datetime.now() - timedelta(days=7)).isoformat()
-        history["alerts"] = [
-            a for a in history["alerts"]
-            if a["triggered_at"] > cutoff_date
-        ]
-
-        self.save_history(history)
+        self.store.add_alerts([asdict(alert) for alert in alerts], retain_after=cutoff_date)
 
     def get_price_summary(self, product_name: str, hours: int = 24) -> Dict:
         """指定商品の価格サマリーを取得"""
-        history = self.load_history()
         cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
 
-        prices = [
-            p["price"] for p in history["prices"]
-            if p["product_name"] == product_name and p["timestamp"] > cutoff_time
-        ]
-
-        if not prices:
+        stats = self.store.window(product_name, after=cutoff_time)
+        if not stats:
             return {}
 
         return {
             "product_name": product_name,
-            "current": prices[-1] if prices else None,
-            "min": min(prices),
-            "max": max(prices),
-            "avg": sum(prices) / len(prices),
-            "count": len(prices),
+            "current": stats.last,
+            "min": stats.min,
+            "max": stats.max,
+            "avg": stats.avg,
+            "count": stats.count,
             "period_hours": hours
         }
 
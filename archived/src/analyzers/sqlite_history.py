@@ -0,0 +1,172 @@
+"""
+SQLite価格履歴ストア
+価格ポイントを (商品名, 時刻) を主キーとする WITHOUT ROWID テーブル（主キー順に格納）に保存し、
+期間の集計をインデックスの範囲走査で行う（コストは期間内の件数に比例し、全履歴の件数によらない）
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.analyzers.history_store import PriceHistoryStore, WindowStats
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_points (
+    product TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    price REAL NOT NULL,
+    source TEXT,
+    PRIMARY KEY (product, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    value REAL,
+    message TEXT,
+    triggered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_triggered ON alerts (triggered_at);
+"""
+
+
+class SQLiteHistoryStore(PriceHistoryStore):
+    """SQLite（WALモード）に保存する価格履歴
+
+    同じ商品・同じ時刻のポイントは後から追加したもので置き換える。
+    保持期間の削除は、追加のたびに同じ商品の範囲で行い、全商品分は prune_interval 秒に1回まとめて行う
+    （取得しなくなった商品の古いポイントも JSON ストアと同じく削除される）。
+    """
+
+    def __init__(self, path: Path, prune_interval: float = 3600):
+        self.path = Path(path)
+        self.prune_interval = prune_interval
+        self._last_prune: Optional[float] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # トランザクションは明示的に管理する
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self, fn):
+        """書き込みロックを取ってから fn(conn) を実行"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def is_empty(self) -> bool:
+        return not self._query("SELECT 1 FROM price_points LIMIT 1")
+
+    def add_point(self, point: Dict, retain_after: Optional[str] = None):
+        def insert(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO price_points (product, ts, price, source) VALUES (?, ?, ?, ?)",
+                (point["product_name"], point["timestamp"], point["price"], point.get("source"))
+            )
+            if not retain_after:
+                return
+            now = time.monotonic()
+            if self._last_prune is None or now - self._last_prune >= self.prune_interval:
+                # 全商品の古いポイントを削除（全件走査なので間隔を空ける）
+                conn.execute("DELETE FROM price_points WHERE ts <= ?", (retain_after,))
+                self._last_prune = now
+            else:
+                # 同じ商品の古いポイントだけを主キーの範囲で削除
+                conn.execute(
+                    "DELETE FROM price_points WHERE product = ? AND ts <= ?",
+                    (point["product_name"], retain_after)
+                )
+
+        self._transaction(insert)
+
+    def first_price(self, product_name: str, before: str) -> Optional[float]:
+        rows = self._query(
+            "SELECT price FROM price_points WHERE product = ? AND ts < ? ORDER BY ts LIMIT 1",
+            (product_name, before)
+        )
+        return rows[0]["price"] if rows else None
+
+    def window(self, product_name: str, after: str) -> Optional[WindowStats]:
+        in_window = "FROM price_points WHERE product = :product AND ts > :after"
+        rows = self._query(
+            "SELECT COUNT(*) AS count, MIN(price) AS min, MAX(price) AS max, AVG(price) AS avg,"
+            f" (SELECT price {in_window} ORDER BY ts LIMIT 1) AS first,"
+            f" (SELECT price {in_window} ORDER BY ts DESC LIMIT 1) AS last"
+            f" {in_window}",
+            {"product": product_name, "after": after}
+        )
+        row = rows[0]
+        if not row["count"]:
+            return None
+        return WindowStats(
+            count=row["count"],
+            first=row["first"],
+            last=row["last"],
+            min=row["min"],
+            max=row["max"],
+            avg=row["avg"]
+        )
+
+    def add_alerts(self, alerts: List[Dict], retain_after: Optional[str] = None):
+        def insert(conn):
+            conn.executemany(
+                "INSERT INTO alerts (type, value, message, triggered_at) VALUES (?, ?, ?, ?)",
+                [(a["type"], a["value"], a["message"], a["triggered_at"]) for a in alerts]
+            )
+            if retain_after:
+                conn.execute("DELETE FROM alerts WHERE triggered_at <= ?", (retain_after,))
+
+        self._transaction(insert)
+
+    def load(self) -> Dict:
+        prices = [
+            {"timestamp": row["ts"], "price": row["price"], "product_name": row["product"], "source": row["source"]}
+            for row in self._query("SELECT * FROM price_points ORDER BY ts, product")
+        ]
+        alerts = [
+            {"type": row["type"], "value": row["value"], "message": row["message"], "triggered_at": row["triggered_at"]}
+            for row in self._query("SELECT * FROM alerts ORDER BY id")
+        ]
+        return {"prices": prices, "alerts": alerts}
+
+    def save(self, history: Dict) -> bool:
+        def replace(conn):
+            conn.execute("DELETE FROM price_points")
+            conn.execute("DELETE FROM alerts")
+            conn.executemany(
+                "INSERT OR REPLACE INTO price_points (product, ts, price, source) VALUES (?, ?, ?, ?)",
+                [(p["product_name"], p["timestamp"], p["price"], p.get("source")) for p in history.get("prices", [])]
+            )
+            conn.executemany(
+                "INSERT INTO alerts (type, value, message, triggered_at) VALUES (?, ?, ?, ?)",
+                [(a["type"], a["value"], a["message"], a["triggered_at"]) for a in history.get("alerts", [])]
+            )
+
+        try:
+            self._transaction(replace)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save history: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
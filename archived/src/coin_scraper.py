@@ -6,12 +6,35 @@
 import asyncio
 import json
 import os
-import re
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
 from datetime import datetime
-from playwright.async_api import async_playwright, Page
+from contextlib import AsyncExitStack
+from urllib.parse import urlparse
+from playwright.async_api import Page
+import aiohttp
 import logging
 
+from src.config import get_currencies
+from src.process_scraper import resolve_workers, scrape_in_processes, shard_products
+from src.scrapers.bullionstar import BullionStarScraper
+from src.replay.routing import to_replay
+from src.utils.browser_service import USER_AGENT, BrowserService, close_browser_service, get_browser_service
+from src.utils.deadline import Budget, BudgetExceeded, client_timeout, gather_within, product_budget
+from src.utils.discovery_index import ProductDiscoveryIndex
+from src.utils.fx import apply_fx, get_fx_rates
+from src.utils.page_extract import extract_page_text
+from src.utils.page_pool import PagePool
+from src.utils.page_readiness import SITE_READINESS, navigate, wait_for_response_during
+from src.utils.price_parser import parse_price, parse_price_details, parse_prices
+from src.utils.rate_limiter import RequestSlot, get_rate_limiter
+from src.utils.static_fetch import (
+    BROWSER, STATIC, ConditionalFetcher, HostPathMemory, parse_in_thread, run_parser, static_parsing_available
+)
+from src.utils.currency_resolver import (
+    explicit_currency, html_currency_context, resolve_currency, resolve_page_currency
+)
+from src.utils.structured_data import StructuredPrice, collect_structured_data, extract_structured_data
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -19,36 +42,173 @@ logger = logging.getLogger(__name__)
 class CoinPriceScraper:
     """汎用コイン価格スクレイパー"""
 
-    def __init__(self):
-        self.browser = None
+    # ページプールのページ数とブラウザコンテキスト数
+    DEFAULT_MAX_PAGES = 4
+    DEFAULT_CONTEXTS = 2
+
+    # BullionStarのページが価格取得に呼び出すAPI
+    BULLIONSTAR_PRICES_API = 'services.bullionstar.com/product/v2/prices'
+
+    # JSON APIで直接価格を取得できるサイト
+    API_SITES = {'bullionstar'}
+
+    # 通貨ごとの価格の目印（優先順）
+    CURRENCY_MARKERS = {
+        'JPY': ['¥', 'JPY', '円'],
+        'SGD': ['S$', 'SGD'],
+        'USD': ['US$', 'USD', '$'],
+    }
+    JPY_MARKERS = CURRENCY_MARKERS['JPY']
+
+    # サイトごとの商品名・価格のセレクター（ブラウザ・静的HTMLの両経路で共通）
+    SITE_ADAPTERS = {
+        'goldsilver': {
+            'site': 'GoldSilver.com',
+            'name': '.product-name, h1',
+            'price': '.price-now, .product-price, [itemprop="price"]',
+            'currency': 'USD',  # GoldSilverは主にUSD
+        },
+        'apmex': {
+            'site': 'APMEX',
+            'name': 'h1.product-title',
+            'price': '.price-value, .product-price',
+            'currency': 'USD',
+        },
+        'jmbullion': {
+            'site': 'JM Bullion',
+            'name': 'h1.title',
+            'price': '.price-per-unit, .product-price',
+            'currency': 'USD',
+        },
+    }
+
+    # 汎用サイトのデフォルトセレクター
+    GENERIC_SELECTORS = {
+        'name': ['h1', '.product-name', '.product-title', '[itemprop="name"]'],
+        'price': ['.price', '.product-price', '[itemprop="price"]', '.price-now']
+    }
+
+    def __init__(
+        self,
+        max_pages: Optional[int] = None,
+        contexts: Optional[int] = None,
+        browser_service: Optional[BrowserService] = None,
+        workers: Optional[int] = None
+    ):
+        self.browser_service = browser_service or get_browser_service()
         self.context = None
-        self.currency = os.getenv('CURRENCY', 'JPY')
+        self.contexts = []
+        self.page_pool = None
+        self._leases: Optional[AsyncExitStack] = None
+        # 1回の取得で取得する通貨（先頭が主通貨）
+        self.currencies = get_currencies()
+        # 為替レート（設定時は主通貨のみ取得し、他の通貨は換算で求める）
+        self.fx = get_fx_rates()
+        self.max_pages = max_pages or int(os.getenv('SCRAPER_MAX_PAGES', self.DEFAULT_MAX_PAGES))
+        self.num_contexts = contexts or int(os.getenv('SCRAPER_CONTEXTS', self.DEFAULT_CONTEXTS))
+        # ワーカープロセス数（2以上なら run() は商品をプロセスに振り分ける）
+        self.workers = workers or resolve_workers()
+        self.limiter = get_rate_limiter()
+        # リソースのブロックはブラウザサービスのコンテキストに設定済み
+        self.blocker = self.browser_service.blocker
+        # API経由の取得（BullionStar）
+        self.api = BullionStarScraper(currencies=self.currencies)
+        # 検出済みの URL -> 商品ID
+        self.discovery = ProductDiscoveryIndex()
+        # 静的HTMLの高速経路（ホストごとに価格が取れた経路を記録）
+        self.static_first = os.getenv('SCRAPER_STATIC_FIRST', 'true').lower() == 'true'
+        self.host_paths = HostPathMemory()
+        self.static_fetcher = ConditionalFetcher()
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        # 商品ごとに使われた取得経路（'api' / 'browser'）
+        self.routes: Dict[str, str] = {}
+        # 直近の取得で時間切れ・失敗により価格が得られなかった商品キー
+        self.missing: List[str] = []
+        # 直近の取得の観測時刻（全商品・全通貨で共通）
+        self.observed_at: Optional[str] = None
+        # 1件取得するごとに呼ぶコールバック（商品キー, 結果）
+        self.on_result: Optional[Callable[[str, Dict], None]] = None
+
+    @property
+    def currency(self) -> str:
+        """主通貨"""
+        return self.currencies[0]
+
+    @property
+    def native_currencies(self) -> List[str]:
+        """サイトから直接取得する通貨（為替レートがあれば主通貨のみ）"""
+        return self.currencies[:1] if self.fx else self.currencies
 
     async def initialize(self):
-        """ブラウザを初期化"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0 Safari/537.36',
-            locale='ja-JP' if self.currency == 'JPY' else 'en-US'
-        )
-        logger.info("Browser initialized")
+        """APIセッションとブラウザを初期化"""
+        await self._ensure_api()
+        await self._ensure_browser()
+
+    async def _ensure_api(self):
+        """APIセッションを必要になった時点で初期化"""
+        if self.api.session is None:
+            await self.api.initialize()
+
+    async def _ensure_http(self):
+        """静的HTML取得用のセッション（keep-aliveのコネクションプール）を用意"""
+        if self.http_session is None:
+            self.http_session = aiohttp.ClientSession(
+                timeout=client_timeout(),
+                connector=aiohttp.TCPConnector(limit_per_host=4, ttl_dns_cache=300),
+                headers={'User-Agent': USER_AGENT, 'Accept': 'text/html,application/xhtml+xml'}
+            )
+
+    async def _ensure_browser(self):
+        """共有ブラウザサービスからコンテキストを借りてページプールを用意"""
+        if self._leases is not None:
+            return
+
+        self._leases = AsyncExitStack()
+        count = max(1, min(self.num_contexts, self.max_pages, self.browser_service.size))
+        for _ in range(count):
+            self.contexts.append(await self._leases.enter_async_context(self.browser_service.context()))
+        self.context = self.contexts[0]
+
+        # 使い回すページのナビゲーションもコンテキストの入れ替え上限に数える
+        self.page_pool = PagePool(self.contexts, self.max_pages, service=self.browser_service)
+        await self.page_pool.open()
+        logger.info(f"Borrowed {count} browser contexts")
 
     async def cleanup(self):
-        """リソースをクリーンアップ"""
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
-        logger.info("Browser cleaned up")
-
-    async def scrape_price(self, url: str, selectors: Dict = None) -> Optional[Dict]:
-        """汎用価格スクレイピング"""
-        page = await self.context.new_page()
+        """リソースをクリーンアップ（ブラウザは閉じずにコンテキストを返却）"""
+        if self.api.session:
+            await self.api.cleanup()
+            self.api.session = None
+        if self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+        if self.page_pool:
+            await self.page_pool.close()
+            self.page_pool = None
+        if self._leases:
+            await self._leases.aclose()
+            self._leases = None
+        self.contexts = []
+        self.context = None
+        logger.info("Browser contexts returned")
+
+    async def scrape_price(
+        self,
+        url: str,
+        selectors: Dict = None,
+        page: Optional[Page] = None,
+        slot: Optional[RequestSlot] = None
+    ) -> Optional[Dict]:
+        """汎用価格スクレイピング
+
+        page を渡した場合はそのページを使い、閉じずに返す（ページプール用）。
+        slot を渡した場合は確保済みのホスト枠で読み込む。
+        """
+        own_page = page is None
+        if own_page:
+            await self._ensure_browser()
+            # ページプールが入れ替えた場合に備えて現在のコンテキストを使う
+            page = await self.contexts[0].new_page()
 
         try:
             logger.info(f"Scraping: {url}")
@@ -56,31 +216,46 @@ class CoinPriceScraper:
             # サイトを判定
             site_type = self._detect_site_type(url)
 
-            # ページを読み込み
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            await page.wait_for_timeout(3000)  # JavaScriptの実行を待つ
+            # ページを読み込み、サイトごとの条件で価格の表示を待つ
+            await self._load_page(page, url, slot)
 
             # サイトタイプに応じた処理
             if site_type == 'bullionstar':
-                result = await self._scrape_bullionstar(page, url)
+                return await self._scrape_bullionstar(page, url)
             elif site_type == 'goldsilver':
-                result = await self._scrape_goldsilver(page, url)
+                return await self._scrape_goldsilver(page, url)
             elif site_type == 'apmex':
-                result = await self._scrape_apmex(page, url)
+                return await self._scrape_apmex(page, url)
             elif site_type == 'jmbullion':
-                result = await self._scrape_jmbullion(page, url)
+                return await self._scrape_jmbullion(page, url)
             else:
                 # 汎用スクレイピング
-                result = await self._scrape_generic(page, url, selectors)
-
-            await page.close()
-            return result
+                return await self._scrape_generic(page, url, selectors)
 
         except Exception as e:
             logger.error(f"Error scraping {url}: {e}")
-            await page.close()
             return None
 
+        finally:
+            if self.blocker:
+                self.blocker.report(page, url)
+            if own_page:
+                await page.close()
+
+    async def _load_page(self, page: Page, url: str, slot: Optional[RequestSlot] = None) -> bool:
+        """ホスト枠を確保してページを読み込み、準備完了を待つ"""
+        if slot is None:
+            async with self.limiter.slot(url) as slot:
+                return await self._load_page(page, url, slot)
+
+        strategy = SITE_READINESS.get(self._detect_site_type(url), SITE_READINESS['generic'])
+        slot.begin()
+        _, ready = await navigate(
+            page, url, strategy,
+            on_response=lambda response: slot.record(response.status if response else None)
+        )
+        return ready
+
     def _detect_site_type(self, url: str) -> str:
         """URLからサイトタイプを判定"""
         if 'bullionstar.com' in url:
@@ -95,54 +270,49 @@ class CoinPriceScraper:
             return 'generic'
 
     async def _scrape_bullionstar(self, page: Page, url: str) -> Optional[Dict]:
-        """BullionStar専用スクレイピング"""
+        """BullionStar専用スクレイピング
+
+        1回のページ読み込みで通貨を切り替えながら全通貨の価格を取得する。
+        """
         try:
-            price = None
+            prices = {}
             product_name = None
 
-            # 商品名を取得
-            try:
-                name_elem = await page.query_selector('h1')
-                if name_elem:
-                    product_name = await name_elem.inner_text()
-            except:
-                pass
-
-            # 価格を取得（JPY）
-            if self.currency == 'JPY':
-                # JPYラジオボタンをクリック
+            for currency in self.native_currencies:
+                # 通貨のラジオボタンをクリックし、価格APIの再取得を待つ
                 try:
-                    jpy_radio = await page.query_selector('input[type="radio"][value="JPY"]')
-                    if jpy_radio:
-                        await jpy_radio.click()
-                        await page.wait_for_timeout(2000)
+                    radio = await page.query_selector(f'input[type="radio"][value="{currency}"]')
+                    if radio:
+                        await wait_for_response_during(page, radio.click, self.BULLIONSTAR_PRICES_API, 3.0)
                 except:
                     pass
 
-                # 価格を探す
-                price_patterns = [
-                    r'¥\s*([\d,]+)',
-                    r'JPY\s*([\d,]+)',
-                    r'円\s*([\d,]+)'
-                ]
-
-                for pattern in price_patterns:
-                    price_elements = await page.query_selector_all('td, span, div')
-                    for elem in price_elements:
-                        text = await elem.inner_text()
-                        match = re.search(pattern, text)
-                        if match:
-                            price = float(match.group(1).replace(',', ''))
-                            break
-                    if price:
-                        break
-
-            if price:
+                # 商品名と価格マーカー付近のテキストを1回で取得
+                markers = self.CURRENCY_MARKERS.get(currency, [currency])
+                text = await extract_page_text(page, markers=markers, name_selectors=['h1'])
+                product_name = product_name or text.name
+
+                # 目印の優先順に、その記号・コードが付いたこの通貨の最初の金額
+                parsed = [parse_price_details(candidate, currency) for candidate in text.candidates]
+                price = next(
+                    (
+                        result.amount
+                        for marker in markers
+                        for result in parsed
+                        if result and result.symbol == marker and result.currency == currency
+                    ),
+                    None
+                )
+                if price:
+                    prices[currency] = price
+
+            if self.currency in prices:
                 return {
                     'url': url,
                     'name': product_name or 'Unknown Product',
-                    'price': price,
+                    'price': prices[self.currency],
                     'currency': self.currency,
+                    'prices': prices,
                     'site': 'BullionStar',
                     'timestamp': datetime.now().isoformat()
                 }
@@ -155,21 +325,9 @@ class CoinPriceScraper:
     async def _scrape_goldsilver(self, page: Page, url: str) -> Optional[Dict]:
         """GoldSilver.com専用スクレイピング"""
         try:
-            price = None
-            product_name = None
-
-            # 商品名
-            name_elem = await page.query_selector('.product-name, h1')
-            if name_elem:
-                product_name = await name_elem.inner_text()
-
-            # 価格
-            price_elem = await page.query_selector('.price-now, .product-price, [itemprop="price"]')
-            if price_elem:
-                text = await price_elem.inner_text()
-                match = re.search(r'[\d,]+\.?\d*', text)
-                if match:
-                    price = float(match.group(0).replace(',', ''))
+            # 商品名と価格を1回で取得
+            adapter = self.SITE_ADAPTERS['goldsilver']
+            product_name, price = await self._extract_name_and_price(page, adapter['name'], adapter['price'])
 
             if price:
                 return {
@@ -177,6 +335,7 @@ class CoinPriceScraper:
                     'name': product_name or 'Unknown Product',
                     'price': price,
                     'currency': 'USD',  # GoldSilverは主にUSD
+                    'prices': {'USD': price},
                     'site': 'GoldSilver.com',
                     'timestamp': datetime.now().isoformat()
                 }
@@ -189,21 +348,9 @@ class CoinPriceScraper:
     async def _scrape_apmex(self, page: Page, url: str) -> Optional[Dict]:
         """APMEX専用スクレイピング"""
         try:
-            price = None
-            product_name = None
-
-            # 商品名
-            name_elem = await page.query_selector('h1.product-title')
-            if name_elem:
-                product_name = await name_elem.inner_text()
-
-            # 価格
-            price_elem = await page.query_selector('.price-value, .product-price')
-            if price_elem:
-                text = await price_elem.inner_text()
-                match = re.search(r'[\d,]+\.?\d*', text)
-                if match:
-                    price = float(match.group(0).replace(',', ''))
+            # 商品名と価格を1回で取得
+            adapter = self.SITE_ADAPTERS['apmex']
+            product_name, price = await self._extract_name_and_price(page, adapter['name'], adapter['price'])
 
             if price:
                 return {
@@ -211,6 +358,7 @@ class CoinPriceScraper:
                     'name': product_name or 'Unknown Product',
                     'price': price,
                     'currency': 'USD',
+                    'prices': {'USD': price},
                     'site': 'APMEX',
                     'timestamp': datetime.now().isoformat()
                 }
@@ -223,21 +371,9 @@ class CoinPriceScraper:
     async def _scrape_jmbullion(self, page: Page, url: str) -> Optional[Dict]:
         """JM Bullion専用スクレイピング"""
         try:
-            price = None
-            product_name = None
-
-            # 商品名
-            name_elem = await page.query_selector('h1.title')
-            if name_elem:
-                product_name = await name_elem.inner_text()
-
-            # 価格
-            price_elem = await page.query_selector('.price-per-unit, .product-price')
-            if price_elem:
-                text = await price_elem.inner_text()
-                match = re.search(r'[\d,]+\.?\d*', text)
-                if match:
-                    price = float(match.group(0).replace(',', ''))
+            # 商品名と価格を1回で取得
+            adapter = self.SITE_ADAPTERS['jmbullion']
+            product_name, price = await self._extract_name_and_price(page, adapter['name'], adapter['price'])
 
             if price:
                 return {
@@ -245,6 +381,7 @@ class CoinPriceScraper:
                     'name': product_name or 'Unknown Product',
                     'price': price,
                     'currency': 'USD',
+                    'prices': {'USD': price},
                     'site': 'JM Bullion',
                     'timestamp': datetime.now().isoformat()
                 }
@@ -254,66 +391,77 @@ class CoinPriceScraper:
 
         return None
 
+    async def _extract_name_and_price(
+        self,
+        page: Page,
+        name_selector: str,
+        price_selector: str
+    ) -> Tuple[Optional[str], Optional[float]]:
+        """商品名と価格要素のテキストを1回の評価で取得して数値化"""
+        text = await extract_page_text(page, selectors=[price_selector], name_selectors=[name_selector])
+        return text.name, parse_price(text.selected.get(price_selector), 'USD')
+
     async def _scrape_generic(self, page: Page, url: str, selectors: Dict = None) -> Optional[Dict]:
         """汎用スクレイピング"""
         try:
             price = None
             product_name = None
 
-            # カスタムセレクターまたはデフォルトセレクター
-            if not selectors:
-                selectors = {
-                    'name': ['h1', '.product-name', '.product-title', '[itemprop="name"]'],
-                    'price': ['.price', '.product-price', '[itemprop="price"]', '.price-now']
-                }
+            # 構造化データ（JSON-LD・microdata・OpenGraph）があればセレクターを探さない
+            offer = (await extract_structured_data(page)).offer()
+            if offer:
+                currency = offer.currency or await resolve_page_currency(page, ['[itemprop="price"]'])
+                return self._structured_result(url, offer, currency)
 
-            # 商品名を取得
-            for selector in selectors.get('name', []):
-                elem = await page.query_selector(selector)
-                if elem:
-                    product_name = await elem.inner_text()
-                    break
-
-            # 価格を取得
-            for selector in selectors.get('price', []):
-                elem = await page.query_selector(selector)
-                if elem:
-                    text = await elem.inner_text()
-                    # 数値を抽出
-                    match = re.search(r'[\d,]+\.?\d*', text)
-                    if match:
-                        price = float(match.group(0).replace(',', ''))
-                        break
-
-            # JavaScriptから価格を取得
-            if not price:
-                price_data = await page.evaluate("""
-                    () => {
-                        // 価格を含む要素を探す
-                        const priceElements = document.querySelectorAll('[data-price], .price, .product-price');
-                        for (let elem of priceElements) {
-                            const text = elem.textContent || elem.dataset.price || '';
-                            const match = text.match(/[\d,]+\.?\d*/);
-                            if (match) {
-                                return parseFloat(match[0].replace(/,/g, ''));
-                            }
-                        }
-                        return null;
-                    }
-                """)
-                if price_data:
-                    price = price_data
+            # カスタムセレクターまたはデフォルトセレクター
+            selectors = selectors or self.GENERIC_SELECTORS
+
+            # 商品名と価格候補を1回で取得
+            text = await extract_page_text(
+                page,
+                selectors=selectors.get('price', []),
+                name_selectors=selectors.get('name', [])
+            )
+            product_name = text.name
+
+            # セレクターの順に、数値を含む最初の値を価格とする
+            price_selectors = selectors.get('price', [])
+            price_texts = [text.selected.get(selector) for selector in price_selectors]
+            prices = parse_prices(price_texts)
+
+            # 見つからなければ価格を含みそうな要素のテキストをまとめて取得
+            if not any(prices):
+                fallback_selector = '[data-price], .price, .product-price'
+                price_texts = await page.evaluate("""
+                    (selector) => Array.from(
+                        document.querySelectorAll(selector),
+                        (elem) => elem.textContent || elem.dataset.price || ''
+                    )
+                """, fallback_selector)
+                price_selectors = [fallback_selector] * len(price_texts)
+                prices = parse_prices(price_texts)
+
+            price, price_text, price_selector = next(
+                (
+                    (value, candidate, selector)
+                    for selector, candidate, value in zip(price_selectors, price_texts, prices) if value
+                ),
+                (None, None, None)
+            )
 
             if price:
+                # 価格の記号で判定できなければ、価格要素の周辺とサイトのメタデータから判定
+                currency = explicit_currency(price_text) or await resolve_page_currency(page, [price_selector])
+
                 # URLからサイト名を推定
-                from urllib.parse import urlparse
                 site_name = urlparse(url).hostname or 'Unknown Site'
 
                 return {
                     'url': url,
                     'name': product_name or 'Unknown Product',
                     'price': price,
-                    'currency': self._detect_currency(await page.content()),
+                    'currency': currency,
+                    'prices': {currency: price},
                     'site': site_name,
                     'timestamp': datetime.now().isoformat()
                 }
@@ -323,56 +471,310 @@ class CoinPriceScraper:
 
         return None
 
-    def _detect_currency(self, html: str) -> str:
-        """HTMLから通貨を推定"""
-        if '¥' in html or 'JPY' in html or '円' in html:
-            return 'JPY'
-        elif '€' in html or 'EUR' in html:
-            return 'EUR'
-        elif '£' in html or 'GBP' in html:
-            return 'GBP'
-        elif 'S$' in html or 'SGD' in html:
-            return 'SGD'
+    def _structured_result(self, url: str, offer: StructuredPrice, currency: str) -> Dict:
+        """構造化データの価格を結果の形にする"""
+        adapter = self.SITE_ADAPTERS.get(self._detect_site_type(url))
+        logger.debug(f"Price for {url} from {offer.source}")
+        return {
+            'url': url,
+            'name': offer.name or 'Unknown Product',
+            'price': offer.price,
+            'currency': currency,
+            'prices': {currency: offer.price},
+            'site': adapter['site'] if adapter else (urlparse(url).hostname or 'Unknown Site'),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _use_static(self, url: str) -> bool:
+        """静的HTMLの経路を先に試すか（BullionStar・API対応サイトはブラウザ/APIのみ）"""
+        site_type = self._detect_site_type(url)
+        return (
+            self.static_first
+            and site_type != 'bullionstar'
+            and site_type not in self.API_SITES
+            and self.host_paths.use_static(url)
+        )
+
+    async def scrape_static(self, url: str, selectors: Optional[Dict] = None) -> Optional[Dict]:
+        """ブラウザを使わずにサーバー描画のHTMLから価格を取得（取れなければNone）
+
+        構造化データを先に確認し、なければセレクターで探す（beautifulsoup4 が必要）。
+        """
+        site_type = self._detect_site_type(url)
+        adapter = self.SITE_ADAPTERS.get(site_type)
+        if adapter:
+            price_selectors, name_selectors = [adapter['price']], [adapter['name']]
+        else:
+            selectors = selectors or self.GENERIC_SELECTORS
+            price_selectors, name_selectors = selectors.get('price', []), selectors.get('name', [])
+
+        await self._ensure_http()
+        try:
+            async with self.limiter.slot(url) as slot:
+                page = await self.static_fetcher.fetch(self.http_session, to_replay(url), slot)
+        except Exception as e:
+            logger.debug(f"Static fetch error for {url}: {e}")
+            return None
+        if page is None:
+            return None
+
+        # 解析はスレッドプールで行い、イベントループを止めない
+        data = await run_parser(collect_structured_data, page.html)
+        offer = data.offer()
+        if offer:
+            currency = offer.currency or (
+                adapter['currency'] if adapter
+                else resolve_currency(html_currency_context(page.html, None, data.declared_currency()))
+            )
+            return self._structured_result(url, offer, currency)
+        if not static_parsing_available():
+            return None
+
+        text = await parse_in_thread(page.html, price_selectors, name_selectors)
+        price_texts = [text.selected.get(selector) for selector in price_selectors]
+        prices = parse_prices(price_texts, adapter['currency'] if adapter else None)
+        price, price_text = next(
+            ((value, candidate) for candidate, value in zip(price_texts, prices) if value),
+            (None, None)
+        )
+        if not price:
+            return None
+
+        if adapter:
+            currency = adapter['currency']
         else:
-            return 'USD'  # デフォルト
+            currency = resolve_currency(html_currency_context(page.html, price_text, data.declared_currency()))
+        return {
+            'url': url,
+            'name': text.name or 'Unknown Product',
+            'price': price,
+            'currency': currency,
+            'prices': {currency: price},
+            'site': adapter['site'] if adapter else (urlparse(url).hostname or 'Unknown Site'),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def _api_product_id(self, product_info: Dict) -> Optional[str]:
+        """API経由で取得できる商品ならAPIの商品IDを返す"""
+        if self._detect_site_type(product_info.get('url', '')) not in self.API_SITES:
+            return None
+        product_id = product_info.get('product_id', product_info.get('id'))
+        if product_id in (None, ''):
+            # 商品情報にIDがなければ検出インデックスを確認
+            entry = self.discovery.lookup(product_info['url'])
+            product_id = entry['product_id'] if entry else None
+        return str(product_id) if product_id not in (None, '') else None
+
+    async def _scrape_via_api(self, items: List[Tuple[str, Dict]]) -> Dict[str, Dict]:
+        """API対応商品の全通貨の価格をバッチ取得（主通貨の価格が取れなかった商品は含まない）"""
+        await self._ensure_api()
+        results = {}
+
+        async def fetch_batch(batch: List[Tuple[str, Dict]]):
+            # 通貨ごとのリクエストを並行実行（失敗した通貨は空）
+            currencies = self.native_currencies
+            prices = await self.api.fetch_prices_multi(
+                [self._api_product_id(info) for _, info in batch], currencies
+            )
+            if not prices[self.currency]:
+                logger.warning(f"API batch returned no {self.currency} prices, falling back to browser")
+                return
+
+            timestamp = datetime.now().isoformat()
+            for product_key, product_info in batch:
+                product_id = self._api_product_id(product_info)
+                product_prices = {
+                    currency: prices[currency][product_id]
+                    for currency in currencies
+                    if prices[currency].get(product_id)
+                }
+                if self.currency in product_prices:
+                    results[product_key] = {
+                        'url': product_info['url'],
+                        'name': product_info.get('name') or 'Unknown Product',
+                        'price': product_prices[self.currency],
+                        'currency': self.currency,
+                        'prices': product_prices,
+                        'site': 'BullionStar',
+                        'timestamp': timestamp
+                    }
+
+        await asyncio.gather(*[fetch_batch(batch) for batch in self.api._chunk(items, self.api.batch_size)])
+        return results
+
+    @staticmethod
+    def _targets(products: Dict[str, Dict]) -> Dict[str, Dict]:
+        """取得対象（有効でURLのある商品）"""
+        return {
+            product_key: product_info
+            for product_key, product_info in products.items()
+            if product_info.get('enabled', True) and product_info.get('url')
+        }
 
-    async def scrape_multiple(self, products: Dict[str, Dict]) -> Dict[str, Dict]:
-        """複数の商品をスクレイピング"""
+    async def _scrape_api_items(self, targets: List[Tuple[str, Dict]], budget: Budget) -> Dict[str, Dict]:
+        """API対応商品をまとめてAPIで取得して記録（取れなかった商品は含まない）"""
         results = {}
+        api_items = [(key, info) for key, info in targets if self._api_product_id(info)]
+        if not api_items:
+            return results
+        try:
+            api_results = await budget.run(self._scrape_via_api(api_items), product_budget())
+        except BudgetExceeded:
+            logger.warning("API fetch exceeded its time budget, falling back to browser")
+            api_results = {}
+        for product_key, result in api_results.items():
+            self._record(product_key, result, 'api')
+            results[product_key] = result
+        return results
+
+    async def scrape_multiple(self, products: Dict[str, Dict], budget: Optional[Budget] = None) -> Dict[str, Dict]:
+        """複数の商品を取得（API対応商品はAPI、それ以外と失敗分はブラウザ）
+
+        budget を使い切った場合はそれまでの結果を返し、取得できなかった商品を self.missing に残す。
+        結果の timestamp は全商品・全通貨で self.observed_at に揃える。
+        """
+        self.routes = {}
+        self.observed_at = datetime.now().isoformat()
+        budget = budget or Budget()
+        targets = list(self._targets(products).items())
+
+        # ルーター: 既知のJSON APIと商品IDがある商品は直接APIで取得
+        results = await self._scrape_api_items(targets, budget)
+
+        # 静的HTMLで価格が取れるホストの商品はブラウザを起動せずに取得
+        async def scrape_one_static(product_key: str, product_info: Dict):
+            url = product_info['url']
+            result = await self.scrape_static(url, product_info.get('selectors'))
+            if result:
+                if product_info.get('name'):
+                    result['name'] = product_info['name']
+                self.host_paths.record(url, STATIC)
+                self._record(product_key, result, 'static')
+                results[product_key] = result
 
-        for product_key, product_info in products.items():
-            if not product_info.get('enabled', True):
-                continue
+        static_items = [(key, info) for key, info in targets if key not in results and self._use_static(info['url'])]
+        if static_items and not budget.expired:
+            await gather_within(budget, {
+                key: budget.run(scrape_one_static(key, info), product_budget())
+                for key, info in static_items
+            })
 
-            url = product_info.get('url')
-            if not url:
-                continue
+        browser_items = [(key, info) for key, info in targets if key not in results]
+        if browser_items and not budget.expired:
+            try:
+                await budget.run(self._ensure_browser())
+            except BudgetExceeded:
+                logger.warning("Browser startup exceeded the time budget")
+                browser_items = []
 
+        async def scrape_one(product_key: str, product_info: Dict):
+            url = product_info['url']
             # カスタムセレクターがあれば使用
             selectors = product_info.get('selectors')
 
-            result = await self.scrape_price(url, selectors)
+            # ホスト枠を先に確保し、空いたホストの商品だけがページを使う
+            async with self.limiter.slot(url) as slot:
+                async with self.page_pool.page() as page:
+                    result = await self.scrape_price(url, selectors, page=page, slot=slot)
 
             if result:
                 # 商品情報で上書き
                 if product_info.get('name'):
                     result['name'] = product_info['name']
 
+                if self.static_first and self._detect_site_type(url) != 'bullionstar':
+                    self.host_paths.record(url, BROWSER)
+                self._record(product_key, result, 'browser')
                 results[product_key] = result
-                logger.info(f"✓ {result['name']}: {result['currency']} {result['price']:,.2f}")
             else:
                 logger.warning(f"✗ {product_info.get('name', product_key)}: Failed to get price")
 
-            # レート制限対策
-            await asyncio.sleep(2)
+        # 商品ごとに予算を設け、サイクルの予算を使い切ったら残りを取り消す
+        if browser_items and not budget.expired:
+            await gather_within(budget, {
+                key: budget.run(scrape_one(key, info), product_budget())
+                for key, info in browser_items
+            })
+
+        # 取得しなかった通貨（単一通貨のサイトを含む）は為替レートで換算
+        await apply_fx(self.fx, results, self.currencies)
+
+        self.missing = [product_key for product_key, _ in targets if product_key not in results]
+        if self.missing:
+            logger.warning(f"Partial results: {len(self.missing)} products missing: {', '.join(self.missing)}")
+
+        logger.info(f"Routes: {self._route_summary()}, failed={len(targets) - len(results)}")
+        return results
 
+    def _route_summary(self) -> str:
+        routes = list(self.routes.values())
+        return ', '.join(f"{route}={routes.count(route)}" for route in ('api', 'static', 'browser'))
+
+    def _record(self, product_key: str, result: Dict, source: str):
+        """取得経路を記録し、観測時刻を揃える"""
+        result['source'] = source
+        if self.observed_at:
+            result['timestamp'] = self.observed_at
+        if self.on_result:
+            self.on_result(product_key, result)
+        self.routes[product_key] = source
+        logger.info(f"✓ [{source}] {result['name']}: {result['currency']} {result['price']:,.2f}")
+
+    async def scrape_in_processes(
+        self,
+        products: Dict[str, Dict],
+        workers: int,
+        budget: Optional[Budget] = None
+    ) -> Dict[str, Dict]:
+        """商品をワーカープロセスに振り分けて取得し、scrape_multiple と同じ形でまとめる
+
+        API対応商品は親プロセスでまとめてAPIで取得し（バッチを分けない）、
+        残りの商品を各ワーカーが自分のブラウザで取得して1件ずつ親に送る。
+        """
+        self.routes = {}
+        self.observed_at = datetime.now().isoformat()
+        budget = budget or Budget()
+        targets = self._targets(products)
+        api_results = await self._scrape_api_items(list(targets.items()), budget)
+        rest = {key: info for key, info in targets.items() if key not in api_results}
+
+        def on_result(product_key: str, result: Dict):
+            # ワーカーごとの観測時刻をこのサイクルの時刻に揃える
+            result['timestamp'] = self.observed_at
+            self.routes[product_key] = result.get('source', 'browser')
+            if self.on_result:
+                self.on_result(product_key, result)
+
+        results, self.missing = await scrape_in_processes(rest, workers, budget, on_result) if rest else ({}, [])
+        results.update(api_results)
+
+        # 取得しなかった通貨は為替レートで換算
+        await apply_fx(self.fx, results, self.currencies)
+
+        if self.missing:
+            logger.warning(f"Partial results: {len(self.missing)} products missing: {', '.join(self.missing)}")
+        logger.info(f"Routes ({workers} workers): {self._route_summary()}, failed={len(self.missing)}")
         return results
 
-    async def run(self, products: Dict[str, Dict]) -> Dict[str, Dict]:
-        """スクレイピングを実行"""
+    async def run(self, products: Dict[str, Dict], budget: Optional[Budget] = None) -> Dict[str, Dict]:
+        """スクレイピングを実行
+
+        workers が2以上で、API対応以外の取得対象が2件以上あればマルチプロセス
+        （API対応商品は親プロセスでまとめて取得し、残りを最大 workers 個のシャードに分ける）。
+        それ以外は1プロセスで取得する。
+        """
         try:
-            await self.initialize()
-            return await self.scrape_multiple(products)
+            workers = 1
+            if self.workers > 1:
+                rest = {
+                    key: info for key, info in self._targets(products).items()
+                    if not self._api_product_id(info)
+                }
+                workers = len(shard_products(rest, self.workers))
+            if workers > 1:
+                return await self.scrape_in_processes(products, workers, budget)
+            # ブラウザはAPIで取得できない商品がある場合のみ起動
+            return await self.scrape_multiple(products, budget)
         finally:
             await self.cleanup()
 
@@ -397,7 +799,10 @@ if __name__ == "__main__":
             # }
         }
 
-        results = await scraper.run(test_products)
-        print(json.dumps(results, indent=2, ensure_ascii=False))
+        try:
+            results = await scraper.run(test_products)
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        finally:
+            await close_browser_service()
 
     asyncio.run(test())
\ No newline at end of file
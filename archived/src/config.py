@@ -5,11 +5,24 @@
 
 import os
 from pathlib import Path
+from typing import List
 from dotenv import load_dotenv
 
 # .envファイルを読み込み
 load_dotenv()
 
+def get_currencies() -> List[str]:
+    """監視する通貨の一覧（CURRENCIES をカンマ区切りで指定、未設定なら CURRENCY のみ）
+
+    先頭の通貨が主通貨（price / currency フィールドに入る通貨）になる。
+    """
+    currencies = [
+        currency.strip().upper()
+        for currency in os.getenv("CURRENCIES", "").split(",")
+        if currency.strip()
+    ]
+    return list(dict.fromkeys(currencies)) or [os.getenv("CURRENCY", "JPY").upper()]
+
 class Config:
     """設定クラス"""
 
@@ -23,6 +36,7 @@ class Config:
 
     # 通貨設定
     CURRENCY = os.getenv("CURRENCY", "JPY")  # デフォルトを日本円に設定
+    CURRENCIES = get_currencies()  # 1回の取得で取得する全通貨
 
     # デバッグモード
     DEBUG = os.getenv("DEBUG", "false").lower() == "true"
@@ -0,0 +1,80 @@
+"""
+ジョブキューのインターフェース
+プロデューサーが登録したジョブを、任意の台数のワーカーがリース（可視性タイムアウト）付きで取得する
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+# ジョブの状態
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+CANCELLED = 'cancelled'
+
+
+@dataclass
+class Job:
+    """取得したジョブ"""
+    id: int
+    batch: str                      # まとめて登録した単位（監視サイクル等）
+    key: str                        # バッチ内のキー（商品キー）
+    payload: Dict
+    attempts: int                   # この取得を含む試行回数
+    max_attempts: int
+    lease_expires: float
+
+
+class JobQueue(ABC):
+    """リース方式のジョブキュー
+
+    - claim したジョブは lease_seconds の間ほかのワーカーから見えない
+    - 期限内に heartbeat でリースを延長し、ack / nack で完了を報告する
+    - リースが切れたジョブは再び取得可能になり、試行回数を使い切ると dead letter に移る
+    """
+
+    @abstractmethod
+    def enqueue(self, batch: str, jobs: Dict[str, Dict], max_attempts: int = 3) -> List[int]:
+        """キー -> ペイロードのジョブを登録してIDを返す"""
+
+    @abstractmethod
+    def claim(self, owner: str, limit: int = 1, lease_seconds: float = 60) -> List[Job]:
+        """取得可能なジョブを最大 limit 件リースする"""
+
+    @abstractmethod
+    def heartbeat(self, owner: str, job_ids: Iterable[int], lease_seconds: float = 60) -> List[int]:
+        """リースを延長し、まだ保持しているジョブIDを返す"""
+
+    @abstractmethod
+    def ack(self, owner: str, job_id: int, result: Optional[Dict] = None) -> bool:
+        """完了を報告（リースを失っていればFalse）"""
+
+    @abstractmethod
+    def nack(self, owner: str, job_id: int, error: str, retry_delay: float = 0) -> bool:
+        """失敗を報告（再試行に戻せばTrue、dead letter に移せばFalse）"""
+
+    @abstractmethod
+    def cancel(self, batch: str) -> int:
+        """バッチの未着手ジョブを取り消して件数を返す"""
+
+    @abstractmethod
+    def batch_status(self, batch: str) -> Dict[str, int]:
+        """バッチの状態ごとの件数"""
+
+    @abstractmethod
+    def results(self, batch: str) -> Dict[str, Dict]:
+        """バッチの完了済みジョブのキー -> 結果"""
+
+    @abstractmethod
+    def dead_letters(self, batch: Optional[str] = None) -> List[Dict]:
+        """試行回数を使い切ったジョブ"""
+
+    def pending(self, batch: str) -> int:
+        """バッチの未完了（待機中・リース中）ジョブ数"""
+        status = self.batch_status(batch)
+        return status.get(QUEUED, 0) + status.get(LEASED, 0)
+
+    def close(self):
+        """接続を閉じる"""
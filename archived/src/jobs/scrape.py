@@ -0,0 +1,200 @@
+"""
+価格取得ジョブ
+商品1件を1ジョブとしてキューに登録し、任意の台数のワーカーが取得して結果を返す
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.jobs.base import Job, JobQueue
+from src.jobs.sqlite_queue import SQLiteJobQueue
+from src.utils.deadline import Budget
+
+logger = logging.getLogger(__name__)
+
+# 予算切れの後、ローカルワーカーが処理中のジョブを片付けるまで待つ秒数
+SHUTDOWN_GRACE = 5.0
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """JOB_QUEUE（SQLiteファイルのパス）が設定されていればジョブキューを返す"""
+    path = os.getenv('JOB_QUEUE')
+    return SQLiteJobQueue(Path(path)) if path else None
+
+
+def enqueue_products(queue: JobQueue, products: Dict[str, Dict], batch: Optional[str] = None) -> str:
+    """有効な商品をジョブとして登録し、バッチ名を返す"""
+    batch = batch or datetime.now().strftime('%Y%m%dT%H%M%S')
+    jobs = {
+        product_key: product_info
+        for product_key, product_info in products.items()
+        if product_info.get('enabled', True) and product_info.get('url')
+    }
+    queue.enqueue(batch, jobs, max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3')))
+    return batch
+
+
+async def wait_for_batch(
+    queue: JobQueue,
+    batch: str,
+    keys: List[str],
+    budget: Optional[Budget] = None,
+    poll_interval: float = 1.0
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """バッチの全ジョブが終わるか予算を使い切るまで待ち、結果と取得できなかったキーを返す
+
+    予算切れの場合は未着手のジョブを取り消す（リース中のジョブはワーカーが完了させる）。
+    キューの操作（SQLite）はイベントループを止めないようスレッドで実行する。
+    """
+    budget = budget or Budget()
+    while await asyncio.to_thread(queue.pending, batch) and not budget.expired:
+        await asyncio.sleep(budget.timeout(poll_interval))
+
+    if await asyncio.to_thread(queue.pending, batch):
+        cancelled = await asyncio.to_thread(queue.cancel, batch)
+        logger.warning(f"Batch {batch} exceeded the time budget: cancelled {cancelled} queued jobs")
+
+    results = await asyncio.to_thread(queue.results, batch)
+    return results, [key for key in keys if key not in results]
+
+
+class ScrapeJobWorker:
+    """キューから商品ジョブを取得して価格を取得するワーカー
+
+    取得中はリースの1/3ごとにハートビートを送り、価格が取れた商品は ack、
+    取れなかった商品は nack（指数バックオフで再試行、回数を使い切れば dead letter）。
+    budget を渡すと取得はその期限で打ち切り、期限後は新しいジョブを取得しない。
+    キューの操作（SQLite）はイベントループを止めないようスレッドで実行する。
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        scraper=None,
+        owner: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        retry_delay: float = 30.0,
+        idle_sleep: float = 2.0,
+        budget: Optional[Budget] = None
+    ):
+        self.queue = queue
+        self._scraper = scraper
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size or int(os.getenv('JOB_CLAIM_BATCH', '10'))
+        self.lease_seconds = lease_seconds or float(os.getenv('JOB_LEASE_SECONDS', '120'))
+        self.retry_delay = retry_delay
+        self.idle_sleep = idle_sleep
+        self.budget = budget or Budget()
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def scraper(self):
+        if self._scraper is None:
+            from src.coin_scraper import CoinPriceScraper
+            self._scraper = CoinPriceScraper(workers=1)
+        return self._scraper
+
+    async def run_once(self) -> int:
+        """ジョブを1回分取得して処理し、処理した件数を返す"""
+        if self.budget.expired:
+            return 0
+        jobs = await asyncio.to_thread(self.queue.claim, self.owner, self.batch_size, self.lease_seconds)
+        if jobs:
+            await self._process(jobs)
+        return len(jobs)
+
+    async def run(self, stop: Optional[Callable[[], bool]] = None, exit_when_idle: bool = False):
+        """stop() が真になるまで（exit_when_idle なら取得できるジョブがなくなるまで）処理を続ける"""
+        logger.info(f"Job worker {self.owner} started")
+        try:
+            while not (stop and stop()) and not self.budget.expired:
+                if await self.run_once():
+                    continue
+                if exit_when_idle:
+                    break
+                await asyncio.sleep(self.budget.timeout(self.idle_sleep))
+        finally:
+            if self._scraper is not None:
+                await self._scraper.cleanup()
+            logger.info(f"Job worker {self.owner} stopped: {self.completed} done, {self.failed} failed")
+
+    async def _heartbeat(self, jobs: List[Job]):
+        """リースを定期的に延長（失ったジョブはログに残す）"""
+        held = {job.id for job in jobs}
+        while held:
+            await asyncio.sleep(self.lease_seconds / 3)
+            alive = set(await asyncio.to_thread(self.queue.heartbeat, self.owner, held, self.lease_seconds))
+            for job_id in held - alive:
+                logger.warning(f"Lost lease on job {job_id}")
+            held = alive
+
+    async def _process(self, jobs: List[Job]):
+        # 別バッチの同じ商品が重ならないようジョブIDをキーにする
+        products = {str(job.id): job.payload for job in jobs}
+        heartbeat = asyncio.create_task(self._heartbeat(jobs))
+        try:
+            results = await self.scraper.scrape_multiple(products, self.budget)
+        except Exception as e:
+            logger.error(f"Job batch failed: {e}")
+            results = {}
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+        for job in jobs:
+            result = results.get(str(job.id))
+            if result:
+                if await asyncio.to_thread(self.queue.ack, self.owner, job.id, result):
+                    self.completed += 1
+            elif self.budget.expired:
+                # 予算切れで取得しなかったジョブはすぐに他のワーカーへ戻す
+                await asyncio.to_thread(self.queue.nack, self.owner, job.id, "time budget exhausted")
+            else:
+                # 再試行までの待ち時間は試行ごとに倍増
+                delay = self.retry_delay * 2 ** (job.attempts - 1)
+                await asyncio.to_thread(self.queue.nack, self.owner, job.id, "no price", delay)
+                self.failed += 1
+
+
+async def scrape_via_queue(
+    queue: JobQueue,
+    products: Dict[str, Dict],
+    budget: Optional[Budget] = None,
+    local_worker: bool = True
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """商品をジョブとして登録し、ワーカー（local_worker なら自プロセスでも1つ）の結果を集める
+
+    ローカルワーカーも同じ予算で取得を打ち切り、予算切れから SHUTDOWN_GRACE 秒で終わらなければ取り消す。
+
+    Returns:
+        (商品キー -> 結果, 取得できなかった商品キー)
+    """
+    budget = budget or Budget()
+    batch = await asyncio.to_thread(enqueue_products, queue, products)
+    keys = [key for key, info in products.items() if info.get('enabled', True) and info.get('url')]
+
+    done = False
+    worker_task = None
+    if local_worker:
+        worker = ScrapeJobWorker(queue, budget=budget)
+        worker_task = asyncio.create_task(worker.run(stop=lambda: done))
+    try:
+        return await wait_for_batch(queue, batch, keys, budget)
+    finally:
+        done = True
+        if worker_task:
+            try:
+                await asyncio.wait_for(worker_task, SHUTDOWN_GRACE)
+            except asyncio.TimeoutError:
+                logger.warning(f"Local job worker did not stop within {SHUTDOWN_GRACE}s: cancelled")
+            # 予算切れでワーカーがキューに戻したジョブも取り消す
+            if budget.expired:
+                await asyncio.to_thread(queue.cancel, batch)
@@ -0,0 +1,229 @@
+"""
+SQLiteジョブキュー
+1台のマシン上の複数ワーカープロセス向け（WALモード、取得は BEGIN IMMEDIATE で排他）
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.jobs.base import CANCELLED, DEAD, DONE, LEASED, QUEUED, Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch, status);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    job_id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """SQLiteに保存するジョブキュー（時刻は複数プロセスで共有できる壁時計）"""
+
+    DEFAULT_FILE = Path("data/jobs.db")
+
+    def __init__(self, path: Optional[Path] = None, clock: Callable[[], float] = time.time):
+        self.path = Path(path) if path else self.DEFAULT_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # トランザクションは明示的に管理する
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self, fn):
+        """書き込みロックを取ってから fn(conn) を実行"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def enqueue(self, batch: str, jobs: Dict[str, Dict], max_attempts: int = 3) -> List[int]:
+        now = self.clock()
+
+        def insert(conn):
+            return [
+                conn.execute(
+                    "INSERT INTO jobs (batch, key, payload, status, max_attempts, available_at, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch, key, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts, now, now, now)
+                ).lastrowid
+                for key, payload in jobs.items()
+            ]
+
+        ids = self._transaction(insert)
+        logger.info(f"Enqueued {len(ids)} jobs in batch {batch}")
+        return ids
+
+    def claim(self, owner: str, limit: int = 1, lease_seconds: float = 60) -> List[Job]:
+        def lease(conn):
+            now = self.clock()
+            # リース切れのジョブのうち試行回数を使い切ったものは dead letter へ
+            for row in conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND lease_expires <= ? AND attempts >= max_attempts",
+                (LEASED, now)
+            ).fetchall():
+                self._bury(conn, row, f"lease expired (owner {row['lease_owner']})", now)
+
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?)"
+                " ORDER BY id LIMIT ?",
+                (QUEUED, now, LEASED, now, limit)
+            ).fetchall()
+            expires = now + lease_seconds
+            jobs = []
+            for row in rows:
+                if row['status'] == LEASED:
+                    logger.warning(f"Reclaiming job {row['id']} from expired lease of {row['lease_owner']}")
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (LEASED, owner, expires, now, row['id'])
+                )
+                jobs.append(Job(
+                    id=row['id'],
+                    batch=row['batch'],
+                    key=row['key'],
+                    payload=json.loads(row['payload']),
+                    attempts=row['attempts'] + 1,
+                    max_attempts=row['max_attempts'],
+                    lease_expires=expires
+                ))
+            return jobs
+
+        return self._transaction(lease)
+
+    def heartbeat(self, owner: str, job_ids: Iterable[int], lease_seconds: float = 60) -> List[int]:
+        job_ids = list(job_ids)
+
+        def extend(conn):
+            now = self.clock()
+            held = []
+            for job_id in job_ids:
+                updated = conn.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (now + lease_seconds, now, job_id, LEASED, owner)
+                ).rowcount
+                if updated:
+                    held.append(job_id)
+            return held
+
+        return self._transaction(extend)
+
+    def ack(self, owner: str, job_id: int, result: Optional[Dict] = None) -> bool:
+        def complete(conn):
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), self.clock(), job_id, LEASED, owner)
+            ).rowcount > 0
+
+        done = self._transaction(complete)
+        if not done:
+            logger.warning(f"Ack for job {job_id} ignored: lease no longer held by {owner}")
+        return done
+
+    def nack(self, owner: str, job_id: int, error: str, retry_delay: float = 0) -> bool:
+        def fail(conn):
+            now = self.clock()
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?", (job_id, LEASED, owner)
+            ).fetchone()
+            if row is None:
+                return False
+            if row['attempts'] >= row['max_attempts']:
+                self._bury(conn, row, error, now)
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL,"
+                " last_error = ?, updated_at = ? WHERE id = ?",
+                (QUEUED, now + retry_delay, error, now, job_id)
+            )
+            return True
+
+        return self._transaction(fail)
+
+    def _bury(self, conn, row: sqlite3.Row, error: str, now: float):
+        """ジョブを dead letter に移す"""
+        conn.execute(
+            "INSERT OR REPLACE INTO dead_letters (job_id, batch, key, payload, attempts, error, failed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (row['id'], row['batch'], row['key'], row['payload'], row['attempts'], error, now)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ?",
+            (DEAD, error, now, row['id'])
+        )
+        logger.error(f"Job {row['id']} ({row['key']}) moved to dead letters after {row['attempts']} attempts: {error}")
+
+    def cancel(self, batch: str) -> int:
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE batch = ? AND status = ?",
+            (CANCELLED, self.clock(), batch, QUEUED)
+        ).rowcount)
+
+    def batch_status(self, batch: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs WHERE batch = ? GROUP BY status", (batch,)
+            ).fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    def results(self, batch: str) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, result FROM jobs WHERE batch = ? AND status = ? ORDER BY id", (batch, DONE)
+            ).fetchall()
+        return {row['key']: json.loads(row['result']) for row in rows if row['result'] is not None}
+
+    def dead_letters(self, batch: Optional[str] = None) -> List[Dict]:
+        query = "SELECT * FROM dead_letters"
+        params = ()
+        if batch is not None:
+            query += " WHERE batch = ?"
+            params = (batch,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY failed_at", params).fetchall()
+        return [{**dict(row), 'payload': json.loads(row['payload'])} for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
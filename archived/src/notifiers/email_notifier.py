@@ -3,9 +3,13 @@ import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from jinja2 import Template
 
+from src.config import get_currencies
+from src.utils.fx import DERIVED
+from src.utils.price_parser import format_price
+
 logger = logging.getLogger(__name__)
 
 class EmailNotifier:
@@ -118,17 +122,24 @@ class EmailNotifier:
                 <table>
                     <tr>
                         <th>商品名</th>
-                        <th>価格 (SGD)</th>
+                        {% for currency in currencies %}
+                        <th>価格 ({{ currency }})</th>
+                        {% endfor %}
                         <th>取得時刻</th>
                     </tr>
-                    {% for name, price_data in prices.items() %}
+                    {% for row in rows %}
                     <tr>
-                        <td>{{ name }}</td>
-                        <td>S$ {{ "%.2f"|format(price_data.price_sgd) }}</td>
-                        <td>{{ price_data.timestamp.strftime('%H:%M:%S') }}</td>
+                        <td>{{ row.name }}</td>
+                        {% for cell in row.cells %}
+                        <td>{{ cell.text }}{% if cell.derived %} *{% endif %}</td>
+                        {% endfor %}
+                        <td>{{ row.time }}</td>
                     </tr>
                     {% endfor %}
                 </table>
+                {% if has_derived %}
+                <p>* 為替レートからの換算値</p>
+                {% endif %}
 
                 {% if threshold_info and threshold_info.price_history %}
                 <h3>価格推移（過去24時間）</h3>
@@ -148,13 +159,45 @@ class EmailNotifier:
         </html>
         """
 
+        currencies, rows = self._price_rows(prices)
         template = Template(template_str)
         return template.render(
             timestamp=datetime.now().strftime('%Y年%m月%d日 %H:%M:%S'),
-            prices=prices,
+            currencies=currencies,
+            rows=rows,
+            has_derived=any(cell['derived'] for row in rows for cell in row['cells']),
             threshold_info=threshold_info
         )
 
+    def _price_rows(self, prices: Dict) -> Tuple[List[str], List[Dict]]:
+        """通貨を列に並べた表の行（取得結果の prices / price_origin を使用）"""
+        # 設定の通貨順、その後に結果にだけある通貨
+        currencies = list(get_currencies())
+        for price_data in prices.values():
+            for currency in price_data.get('prices') or {price_data.get('currency', 'SGD'): None}:
+                if currency not in currencies:
+                    currencies.append(currency)
+
+        rows = []
+        for key, price_data in prices.items():
+            amounts = price_data.get('prices') or {price_data.get('currency', 'SGD'): price_data['price']}
+            origin = price_data.get('price_origin', {})
+            timestamp = price_data.get('timestamp')
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            rows.append({
+                'name': price_data.get('name', key),
+                'cells': [
+                    {
+                        'text': format_price(amounts[currency], currency) if currency in amounts else '-',
+                        'derived': origin.get(currency) == DERIVED
+                    }
+                    for currency in currencies
+                ],
+                'time': timestamp.strftime('%H:%M:%S') if timestamp else '-'
+            })
+        return currencies, rows
+
     def send_error_notification(self, recipient_email: str, error_message: str) -> bool:
         """エラー通知メールを送信"""
         subject = f"金価格モニター - エラー通知"
@@ -0,0 +1,201 @@
+"""
+マルチプロセス実行
+商品をホスト単位でワーカープロセスに振り分け（大きなホストは複数に分割）、
+各ワーカーが自分のブラウザで取得した結果を親へ逐次送る
+"""
+
+import asyncio
+import copy
+import logging
+import math
+import multiprocessing
+import os
+import queue as queue_module
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.deadline import Budget
+from src.utils.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# 親がキューを確認する間隔（秒）
+POLL_INTERVAL = 0.5
+
+# 予算切れ後にワーカーの終了を待つ秒数（過ぎたら強制終了）
+SHUTDOWN_GRACE = 5.0
+
+
+def available_cores() -> int:
+    """このプロセスが使えるCPUコア数"""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def resolve_workers(value: Optional[str] = None) -> int:
+    """ワーカー数（'auto' は親プロセス用に1コア残して使えるコア数に合わせる）"""
+    value = (value if value is not None else os.getenv('SCRAPER_WORKERS', '1')).strip().lower()
+    if value == 'auto':
+        return max(1, available_cores() - 1)
+    return max(1, int(value))
+
+
+def _host_of(product_info: Dict) -> str:
+    """レート制限と同じ単位のホスト（サブドメインは親ドメインにまとめる）"""
+    return get_rate_limiter().host_key(product_info.get('url', ''))
+
+
+def shard_products(products: Dict[str, Dict], workers: int) -> List[Dict[str, Dict]]:
+    """商品をワーカー数以下のシャードに分割
+
+    小さなホストの商品は同じシャードに入れる。1シャード分（全商品 / シャード数）を超えるホストは
+    複数のシャードに分ける（host_shares の数でレート制限を分担する）。
+    商品数の多いホストから順に、そのホストをまだ持たない最も空いているシャードへ割り当てる。
+    """
+    by_host: Dict[str, Dict[str, Dict]] = {}
+    for product_key, product_info in products.items():
+        by_host.setdefault(_host_of(product_info), {})[product_key] = product_info
+
+    count = max(1, min(workers, len(products)))
+    per_shard = math.ceil(len(products) / count) if products else 1
+    shards: List[Dict[str, Dict]] = [{} for _ in range(count)]
+    for host, host_products in sorted(by_host.items(), key=lambda item: len(item[1]), reverse=True):
+        parts = min(count, math.ceil(len(host_products) / per_shard))
+        keys = list(host_products)
+        used = set()
+        for part in range(parts):
+            candidates = [index for index in range(count) if index not in used]
+            index = min(candidates, key=lambda i: len(shards[i]))
+            used.add(index)
+            shards[index].update({key: host_products[key] for key in keys[part::parts]})
+    return [shard for shard in shards if shard]
+
+
+def host_shares(shards: List[Dict[str, Dict]]) -> Dict[str, int]:
+    """ホスト -> そのホストの商品を持つシャード数"""
+    shares: Dict[str, int] = {}
+    for shard in shards:
+        for host in {_host_of(product_info) for product_info in shard.values()}:
+            shares[host] = shares.get(host, 0) + 1
+    return shares
+
+
+def scrape_worker(
+    worker_id: int,
+    products: Dict[str, Dict],
+    results,
+    seconds: Optional[float],
+    shares: Optional[Dict[str, int]] = None
+):
+    """ワーカープロセスの本体: 自分のブラウザで取得し、結果を1件ずつキューに送る
+
+    shares（ホスト -> 分担するシャード数）に応じてホスト別の制限をこのプロセスの取り分に縮小する。
+    メッセージ: ('result', 商品キー, 結果) / ('error', ワーカーID, 内容) / ('done', ワーカーID, None)
+    """
+    limiter = get_rate_limiter()
+    for host, count in (shares or {}).items():
+        limiter.share_host(host, count)
+
+    async def work():
+        # ブラウザ・Playwrightはこのプロセスのイベントループで起動する
+        from src.coin_scraper import CoinPriceScraper
+        from src.utils.browser_service import close_browser_service
+
+        scraper = CoinPriceScraper(workers=1)
+        # キューは別スレッドで後から pickle するため、取得後に書き換えられる前の内容を複製して送る
+        scraper.on_result = lambda product_key, result: results.put(('result', product_key, copy.deepcopy(result)))
+        try:
+            await scraper.scrape_multiple(products, Budget(seconds))
+        finally:
+            await scraper.cleanup()
+            await close_browser_service()
+
+    try:
+        asyncio.run(work())
+    except Exception as e:
+        results.put(('error', worker_id, str(e)))
+    finally:
+        results.put(('done', worker_id, None))
+
+
+async def scrape_in_processes(
+    products: Dict[str, Dict],
+    workers: int,
+    budget: Optional[Budget] = None,
+    on_result: Optional[Callable[[str, Dict], None]] = None,
+    target: Callable = scrape_worker
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """商品をシャードに分けてワーカープロセスで並列取得
+
+    ワーカーから届いた結果を順に on_result に渡しながら1つの辞書にまとめる。
+    予算を使い切ったワーカーは SHUTDOWN_GRACE 秒待って強制終了する。
+
+    Returns:
+        (商品キー -> 結果, 取得できなかった商品キー)
+    """
+    budget = budget or Budget()
+    shards = shard_products(products, workers)
+    shares = host_shares(shards)
+    # Playwrightのスレッドやイベントループを引き継がないよう spawn で起動
+    context = multiprocessing.get_context('spawn')
+    results_queue = context.Queue()
+    processes = [
+        context.Process(
+            target=target,
+            args=(worker_id, shard, results_queue, budget.remaining(), shares),
+            name=f"scrape-worker-{worker_id}",
+            daemon=True
+        )
+        for worker_id, shard in enumerate(shards)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(
+        f"Started {len(processes)} scraper workers for {len(products)} products "
+        f"(shards: {', '.join(str(len(shard)) for shard in shards)})"
+    )
+    split = {host: count for host, count in shares.items() if count > 1}
+    if split:
+        logger.info(f"Hosts split across workers (rate limits divided): {split}")
+
+    results: Dict[str, Dict] = {}
+    running = set(range(len(processes)))
+    stop_at = None if budget.deadline is None else budget.deadline + SHUTDOWN_GRACE
+    loop = asyncio.get_running_loop()
+    try:
+        while running and (stop_at is None or budget.clock() < stop_at):
+            try:
+                message = await loop.run_in_executor(None, results_queue.get, True, POLL_INTERVAL)
+            except queue_module.Empty:
+                # 'done' を送らずに落ちたワーカー
+                for worker_id in list(running):
+                    exitcode = processes[worker_id].exitcode
+                    if exitcode not in (0, None):
+                        logger.error(f"Scraper worker {worker_id} exited with code {exitcode}")
+                        running.discard(worker_id)
+                continue
+
+            kind, key, payload = message
+            if kind == 'result':
+                results[key] = payload
+                if on_result:
+                    on_result(key, payload)
+            elif kind == 'error':
+                logger.error(f"Scraper worker {key} failed: {payload}")
+            elif kind == 'done':
+                running.discard(key)
+    finally:
+        for worker_id, process in enumerate(processes):
+            if worker_id in running and process.is_alive():
+                process.terminate()
+            process.join(timeout=SHUTDOWN_GRACE)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        results_queue.close()
+
+    if running:
+        logger.warning(f"Terminated {len(running)} scraper workers that exceeded the time budget")
+
+    missing = [product_key for product_key in products if product_key not in results]
+    return results, missing
@@ -0,0 +1,87 @@
+"""
+応答の記録
+BullionStar API の応答と、ディーラーのページ（サブリソースを含む）を実サイトから取得して FixtureStore に保存する
+"""
+
+import logging
+from typing import Dict, Iterable, List
+
+import aiohttp
+from playwright.async_api import Request, Route, async_playwright
+
+from src.replay.store import FixtureStore
+from src.scrapers.bullionstar import BullionStarScraper
+from src.utils.browser_service import LAUNCH_ARGS, USER_AGENT
+from src.utils.deadline import client_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureRecorder:
+    """実サイトの応答を記録"""
+
+    def __init__(self, store: FixtureStore, page_timeout: float = 30000):
+        self.store = store
+        self.page_timeout = page_timeout
+
+    async def record_api(self, product_ids: Iterable, currencies: List[str], batch_size: int = 50) -> int:
+        """BullionStarScraper と同じバッチ・パラメーターで価格APIの応答を記録"""
+        product_ids = list(product_ids)
+        recorded = 0
+        async with aiohttp.ClientSession(timeout=client_timeout()) as session:
+            for currency in currencies:
+                for start in range(0, len(product_ids), batch_size):
+                    params = {
+                        "currency": currency,
+                        "locationId": 1,
+                        "productIds": ",".join(str(product_id) for product_id in product_ids[start:start + batch_size])
+                    }
+                    async with session.get(BullionStarScraper.API_URL, params=params) as response:
+                        body = await response.read()
+                        self.store.put('GET', str(response.url), response.status, dict(response.headers), body)
+                        recorded += 1
+        logger.info(f"Recorded {recorded} API responses")
+        return recorded
+
+    async def record_pages(self, urls: Iterable[str]) -> int:
+        """ページとそのサブリソースを全て記録（静的HTMLの経路もページ本体の記録を使う）"""
+        recorded = 0
+
+        async def capture(route: Route, request: Request):
+            nonlocal recorded
+            try:
+                response = await route.fetch()
+                body = await response.body()
+            except Exception as e:
+                logger.debug(f"Could not record {request.url}: {e}")
+                await route.abort('failed')
+                return
+            self.store.put(request.method, request.url, response.status, response.headers, body)
+            recorded += 1
+            await route.fulfill(response=response, body=body)
+
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            context = await browser.new_context(user_agent=USER_AGENT)
+            await context.route('**/*', capture)
+            try:
+                for url in urls:
+                    page = await context.new_page()
+                    try:
+                        await page.goto(url, wait_until='networkidle', timeout=self.page_timeout)
+                        logger.info(f"Recorded {url}")
+                    except Exception as e:
+                        logger.warning(f"Failed to record {url}: {e}")
+                    finally:
+                        await page.close()
+            finally:
+                await browser.close()
+        return recorded
+
+    async def record_products(self, products: Dict[str, Dict], currencies: List[str]) -> int:
+        """商品リストのAPI応答とページをまとめて記録し、index.json を保存"""
+        product_ids = [info['id'] for info in products.values() if info.get('id') not in (None, '')]
+        recorded = await self.record_api(product_ids, currencies) if product_ids else 0
+        recorded += await self.record_pages(info['url'] for info in products.values() if info.get('url'))
+        self.store.save()
+        return recorded
@@ -0,0 +1,67 @@
+"""
+リプレイサーバーへの振り向け
+SCRAPER_REPLAY_URL が設定されていれば、スクレイパーの全リクエスト（API・静的HTML・ブラウザのサブリソース）を
+元のURLを保ったままリプレイサーバーへ送る
+"""
+
+import logging
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Request, Route
+
+logger = logging.getLogger(__name__)
+
+
+def replay_base() -> Optional[str]:
+    """リプレイサーバーのURL（未設定ならNone）"""
+    base = os.getenv('SCRAPER_REPLAY_URL')
+    return base.rstrip('/') if base else None
+
+
+def to_replay(url: str, base: Optional[str] = None) -> str:
+    """元のURLをリプレイサーバーのURLに変換（https://host/path?q -> {base}/host/path?q）
+
+    base を省略すると SCRAPER_REPLAY_URL を使い、未設定なら元のURLのまま返す。
+    """
+    base = (base or replay_base() or '').rstrip('/')
+    if not base:
+        return url
+    parts = urlsplit(url)
+    return f"{base}/{parts.netloc}{parts.path or '/'}{'?' + parts.query if parts.query else ''}"
+
+
+def from_replay(path: str, query: str = '') -> str:
+    """リプレイサーバーへのリクエストのパスから元のURLを復元"""
+    return f"https://{path.lstrip('/')}{'?' + query if query else ''}"
+
+
+class ReplayRouter:
+    """ブラウザコンテキストのリクエストをリプレイサーバーから応答させる
+
+    ページのURLは元のままなので、サイト判定やリソースブロッカーはそのまま動く。
+    """
+
+    def __init__(self, base: str):
+        self.base = base.rstrip('/')
+
+    @classmethod
+    def from_env(cls) -> Optional['ReplayRouter']:
+        base = replay_base()
+        return cls(base) if base else None
+
+    async def install(self, context: BrowserContext):
+        """コンテキストの全リクエストにハンドラーを設定（ブロッカーより先に設定する）"""
+        await context.route('**/*', self._handle)
+
+    async def _handle(self, route: Route, request: Request):
+        if request.url.startswith(('data:', 'blob:')):
+            await route.fallback()
+            return
+        try:
+            response = await route.fetch(url=to_replay(request.url, self.base))
+            await route.fulfill(response=response)
+        except Exception as e:
+            logger.debug(f"Replay failed for {request.url}: {e}")
+            await route.abort('failed')
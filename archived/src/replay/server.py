@@ -0,0 +1,111 @@
+"""
+リプレイサーバー
+記録した応答をローカルのHTTPサーバーから返す。遅延・揺らぎ・エラーを指定した割合で注入できる
+"""
+
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+
+from src.replay.routing import from_replay
+from src.replay.store import FixtureStore
+
+logger = logging.getLogger(__name__)
+
+# 記録にないリクエストを処理するハンドラー（応答しなければNone）
+Fallback = Callable[[web.Request, str], Awaitable[Optional[web.StreamResponse]]]
+
+
+class ReplayServer:
+    """記録した応答を返すスタンドインサーバー
+
+    - 応答ごとに latency 秒 ±jitter 秒待つ
+    - error_rate の割合で error_status（既定 503、Retry-After 付き）を返す
+    - If-None-Match が記録した ETag と一致すれば 304
+    - 記録にないURLは fallback（合成データ等）に渡し、それもなければ 404
+    """
+
+    def __init__(
+        self,
+        store: Optional[FixtureStore] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+        fallback: Optional[Fallback] = None
+    ):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fallback = fallback
+        self.random = random.Random(seed)
+        self.stats: Dict[str, int] = {'requests': 0, 'hits': 0, 'misses': 0, 'errors': 0, 'not_modified': 0}
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/{path:.*}', self._handle)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """サーバーを起動してベースURLを返す（port=0 なら空いているポート）"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        logger.info(f"Replay server listening on {self.url}")
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'ReplayServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.stats['requests'] += 1
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.Response(status=self.error_status, headers={'Retry-After': '1'}, text='injected error')
+
+        url = from_replay(request.match_info['path'], request.query_string)
+        recorded = self.store.get(request.method, url) if self.store else None
+        if recorded is None:
+            response = await self.fallback(request, url) if self.fallback else None
+            if response is None:
+                self.stats['misses'] += 1
+                logger.debug(f"No recording for {request.method} {url}")
+                return web.Response(status=404, text='not recorded')
+            self.stats['hits'] += 1
+            return response
+
+        self.stats['hits'] += 1
+        etag = recorded.headers.get('etag')
+        if etag and request.headers.get('If-None-Match') == etag:
+            self.stats['not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+
+        # 記録したヘッダー（Content-Type を含む）をそのまま返す
+        return web.Response(status=recorded.status, body=self.store.body(recorded), headers=recorded.headers)
@@ -0,0 +1,130 @@
+"""
+記録した応答の保存先
+URL（メソッド + ホスト + パス + 正規化したクエリ）ごとにステータス・主要ヘッダー・本文を保存する。
+本文は内容のハッシュで1回だけ保存し、index.json から参照する
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 再生時に返すヘッダー（他は記録しない）
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'retry-after')
+
+# クエリで応答の内容が決まるAPI（同じパスの別の記録で代替すると別の通貨・商品の価格を返してしまう）
+EXACT_HOSTS = ('services.bullionstar.com',)
+EXACT_QUERY_PARAMS = ('currency', 'productids')
+
+
+def fixture_key(method: str, url: str) -> str:
+    """記録のキー（スキームとクエリの順序は区別しない）"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.netloc.lower()}{parts.path or '/'}{'?' + query if query else ''}"
+
+
+def _path_key(key: str) -> str:
+    return key.split('?', 1)[0]
+
+
+def exact_only(url: str) -> bool:
+    """完全一致の記録だけを返すURL（APIのホスト、または通貨・商品IDをクエリに持つもの）"""
+    parts = urlsplit(url)
+    if (parts.hostname or '').lower() in EXACT_HOSTS:
+        return True
+    return any(name.lower() in EXACT_QUERY_PARAMS for name, _ in parse_qsl(parts.query, keep_blank_values=True))
+
+
+@dataclass
+class RecordedResponse:
+    """記録した1件の応答"""
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body_file: str = ''
+
+
+class FixtureStore:
+    """記録した応答のディレクトリ（index.json と bodies/）"""
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RecordedResponse] = {}
+        self._by_path: Dict[str, str] = {}
+        # 再生中は本文をメモリに置く（ディスクから読むのは1回だけ）
+        self._bodies: Dict[str, bytes] = {}
+        self._load()
+
+    def _load(self):
+        index = self.root / self.INDEX_FILE
+        if not index.exists():
+            return
+        with open(index, 'r', encoding='utf-8') as f:
+            for key, entry in json.load(f).items():
+                self._add(key, RecordedResponse(**entry))
+
+    def _add(self, key: str, response: RecordedResponse):
+        self._entries[key] = response
+        # クエリ違いは最初に記録したものをパス単位の代替にする
+        self._by_path.setdefault(_path_key(key), key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def put(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> RecordedResponse:
+        """応答を記録（同じキーは上書き）"""
+        digest = hashlib.sha1(body).hexdigest()
+        body_path = self.root / 'bodies' / digest
+        kept = {name: value for name, value in ((k.lower(), v) for k, v in headers.items()) if name in KEPT_HEADERS}
+        response = RecordedResponse(url=url, status=status, headers=kept, body_file=f"bodies/{digest}")
+
+        with self._lock:
+            if not body_path.exists():
+                body_path.parent.mkdir(parents=True, exist_ok=True)
+                body_path.write_bytes(body)
+            self._add(fixture_key(method, url), response)
+        return response
+
+    def get(self, method: str, url: str, exact: bool = False) -> Optional[RecordedResponse]:
+        """記録した応答
+
+        完全一致がなければ同じパスの応答で代替する（ページ・サブリソース向け）。
+        exact、または exact_only に当たるAPIのURLは完全一致のみ。
+        """
+        key = fixture_key(method, url)
+        response = self._entries.get(key)
+        if response is None and not exact and not exact_only(url):
+            fallback = self._by_path.get(_path_key(key))
+            response = self._entries.get(fallback) if fallback else None
+        return response
+
+    def body(self, response: RecordedResponse) -> bytes:
+        body = self._bodies.get(response.body_file)
+        if body is None:
+            body = self._bodies[response.body_file] = (self.root / response.body_file).read_bytes()
+        return body
+
+    def save(self):
+        """index.json を書き出す"""
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            index = self.root / self.INDEX_FILE
+            tmp_path = index.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({key: asdict(entry) for key, entry in sorted(self._entries.items())}, f, indent=2)
+            os.replace(tmp_path, index)
+        logger.info(f"Saved {len(self._entries)} recorded responses to {self.root}")
@@ -4,12 +4,16 @@ BullionStar価格スクレイパー
 """
 
 import asyncio
-import re
 from typing import Dict, Optional
 from datetime import datetime
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import Page
 import logging
 
+from src.utils.browser_service import BrowserService, get_browser_service
+from src.utils.page_readiness import SITE_READINESS, navigate
+from src.utils.price_parser import parse_price
+from src.utils.rate_limiter import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 class BullionStarScraper:
@@ -31,37 +35,33 @@ class BullionStarScraper:
         }
     }
 
-    def __init__(self):
-        self.browser = None
+    def __init__(self, browser_service: Optional[BrowserService] = None):
+        self.browser_service = browser_service or get_browser_service()
         self.context = None
+        self._lease = None
+        self.limiter = get_rate_limiter()
+        self.blocker = self.browser_service.blocker
 
     async def initialize(self):
-        """ブラウザを初期化"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-        self.context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0 Safari/537.36'
-        )
-        logger.info("Browser initialized")
+        """共有ブラウザサービスからコンテキストを借りる"""
+        self._lease = self.browser_service.context()
+        self.context = await self._lease.__aenter__()
+        logger.info("Browser context borrowed")
 
     async def cleanup(self):
-        """リソースをクリーンアップ"""
-        if self.context:
-            await self.context.close()
-        if self.browser:
-            await self.browser.close()
-        logger.info("Browser cleaned up")
+        """リソースをクリーンアップ（コンテキストを返却）"""
+        if self._lease:
+            await self._lease.__aexit__(None, None, None)
+            self._lease = None
+            self.context = None
+        logger.info("Browser context returned")
 
     async def scrape_prices(self) -> Dict[str, Dict]:
-        """全商品の価格を取得"""
+        """全商品の価格を並行取得（速度はホスト別リミッターが調整）"""
         results = {}
-        page = await self.context.new_page()
 
-        for product_id, product_info in self.PRODUCTS.items():
+        async def scrape_one(product_id: str, product_info: Dict):
+            page = await self.context.new_page()
             try:
                 logger.info(f"Scraping {product_info['name']}")
                 price = await self._scrape_single_product(page, product_info['url'])
@@ -77,18 +77,27 @@ class BullionStarScraper:
                 else:
                     logger.warning(f"No price found for {product_info['name']}")
 
-                # レート制限対策
-                await asyncio.sleep(2)
-
             except Exception as e:
                 logger.error(f"Error scraping {product_id}: {e}")
-
-        await page.close()
+            finally:
+                if self.blocker:
+                    self.blocker.report(page, product_info['url'])
+                await page.close()
+
+        await asyncio.gather(*[
+            scrape_one(product_id, product_info)
+            for product_id, product_info in self.PRODUCTS.items()
+        ])
         return results
 
     async def _scrape_single_product(self, page: Page, url: str) -> Optional[float]:
         """単一商品の価格を取得"""
-        await page.goto(url, wait_until='networkidle')
+        # 価格APIの応答を待つ（networkidleまで待たない）
+        async with self.limiter.slot(url) as slot:
+            await navigate(
+                page, url, SITE_READINESS['bullionstar'],
+                on_response=lambda response: slot.record(response.status if response else None)
+            )
 
         # 価格取得の複数戦略
         price = None
@@ -108,33 +117,24 @@ class BullionStarScraper:
         # 戦略2: JavaScript評価
         if not price:
             try:
-                price = await page.evaluate("""
+                price_text = await page.evaluate("""
                     () => {
-                        // 価格要素を探す
+                        // 価格要素を探す（数値化はPython側で行う）
                         const priceEl = document.querySelector('[data-price]') ||
                                        document.querySelector('.price-value') ||
                                        document.querySelector('.product-price');
-                        if (priceEl) {
-                            const priceText = priceEl.textContent || priceEl.dataset.price;
-                            return parseFloat(priceText.replace(/[^0-9.]/g, ''));
-                        }
-                        return null;
+                        return priceEl ? (priceEl.textContent || priceEl.dataset.price) : null;
                     }
                 """)
+                price = self._parse_price(price_text)
             except:
                 pass
 
         return price
 
-    def _parse_price(self, price_text: str) -> float:
-        """価格テキストを数値に変換"""
-        # $記号、カンマ、空白を削除
-        cleaned = re.sub(r'[\$,\s]', '', price_text)
-        # 数値部分を抽出
-        match = re.search(r'(\d+\.?\d*)', cleaned)
-        if match:
-            return float(match.group(1))
-        raise ValueError(f"Cannot parse price: {price_text}")
+    def _parse_price(self, price_text: str) -> Optional[float]:
+        """価格テキストを数値に変換（解析できなければNone）"""
+        return parse_price(price_text, 'SGD')
 
     async def run(self) -> Dict[str, Dict]:
         """スクレイピングを実行"""
@@ -1,12 +1,20 @@
 import asyncio
 import aiohttp
 import json
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
 import logging
 import os
 from pathlib import Path
 
+from src.config import get_currencies
+from src.replay.routing import to_replay
+from src.utils.deadline import Budget, client_timeout, gather_within, product_budget
+from src.utils.fx import apply_fx, get_fx_rates
+from src.utils.price_cache import PriceCache, get_price_cache
+from src.utils.price_parser import format_price, parse_price
+from src.utils.rate_limiter import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 class BullionStarScraper:
@@ -35,12 +43,31 @@ class BullionStarScraper:
             }
         }
 
-    def __init__(self):
+    # 1リクエストにまとめる商品IDの最大数
+    DEFAULT_BATCH_SIZE = 50
+
+    def __init__(self, batch_size: Optional[int] = None, currencies: Optional[List[str]] = None):
         self.session = None
+        # SCRAPER_REPLAY_URL があればリプレイサーバーへ
+        self.api_url = to_replay(self.API_URL)
+        # 1回の取得で取得する通貨（先頭が主通貨）
+        self.currencies = currencies or get_currencies()
+        # 為替レート（設定時は主通貨のみ取得し、他の通貨は換算で求める）
+        self.fx = get_fx_rates()
+        # 直近の取得で時間切れ・失敗により価格が得られなかった商品キー
+        self.missing: List[str] = []
+        self.limiter = get_rate_limiter()
+        self.cache = get_price_cache()
+        self.batch_size = max(1, batch_size or int(os.getenv("BULLIONSTAR_BATCH_SIZE", self.DEFAULT_BATCH_SIZE)))
+
+    @property
+    def native_currencies(self) -> List[str]:
+        """APIから直接取得する通貨（為替レートがあれば主通貨のみ）"""
+        return self.currencies[:1] if self.fx else self.currencies
 
     async def initialize(self):
         """セッションを初期化"""
-        self.session = aiohttp.ClientSession()
+        self.session = aiohttp.ClientSession(timeout=client_timeout())
         logger.info("API session initialized")
 
     async def cleanup(self):
@@ -49,88 +76,176 @@ class BullionStarScraper:
             await self.session.close()
         logger.info("API session cleaned up")
 
-    async def scrape_prices(self) -> Dict[str, Dict]:
-        """全商品の価格をAPIから取得"""
+    async def __aenter__(self):
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.cleanup()
+        self.session = None
+
+    async def scrape_prices(
+        self,
+        budget: Optional[Budget] = None,
+        product_keys: Optional[Iterable[str]] = None
+    ) -> Dict[str, Dict]:
+        """全商品（product_keys を指定すればその商品のみ）の価格をAPIからバッチ取得
+
+        budget を使い切った場合はそれまでの結果を返し、取得できなかった商品を self.missing に残す。
+        """
         results = {}
+        self.missing = []
+        budget = budget or Budget()
 
         # 商品リストを読み込み
         products = self.load_products()
+        if product_keys is not None:
+            keys = set(product_keys)
+            products = {key: info for key, info in products.items() if key in keys}
 
         if not products:
             logger.warning("No products configured for monitoring")
             return results
 
-        # 通貨を設定から取得（デフォルト: JPY）
-        currency = os.getenv("CURRENCY", "JPY")
-
-        for product_key, product_info in products.items():
-            try:
-                logger.info(f"Fetching price for {product_info['name']} in {currency}")
+        # APIで取得できるのは商品IDのある商品のみ（他サイトの商品はバッチに含めない）
+        priced = [(key, info) for key, info in products.items() if info.get('id') not in (None, '')]
+        if len(priced) < len(products):
+            logger.warning(f"Skipping {len(products) - len(priced)} products without a BullionStar product ID")
+
+        # 全通貨・全商品で1つの観測時刻を共有
+        timestamp = datetime.now().isoformat()
+        batches = list(self._chunk(priced, self.batch_size))
+        logger.info(
+            f"Fetching {len(priced)} products in {len(batches)} batches ({', '.join(self.native_currencies)})"
+        )
+
+        # バッチを並行実行（ホスト別リミッターが速度を調整、各バッチは商品単位の予算内）
+        batch_results, _ = await gather_within(budget, {
+            str(index): budget.run(self._scrape_batch(batch, timestamp), product_budget())
+            for index, batch in enumerate(batches)
+        })
+        for batch_result in batch_results.values():
+            results.update(batch_result)
+
+        # 取得しなかった通貨は為替レートで換算
+        await apply_fx(self.fx, results, self.currencies)
+
+        self.missing = [product_key for product_key in products if product_key not in results]
+        if self.missing:
+            logger.warning(f"Partial results: {len(self.missing)} products missing: {', '.join(self.missing)}")
+        return results
 
-                # APIパラメータ
-                params = {
-                    "currency": currency,
-                    "locationId": 1,
-                    "productIds": product_info['id']
+    async def _scrape_batch(self, batch: List, timestamp: str) -> Dict[str, Dict]:
+        """1バッチ分の価格を全通貨で取得して結果に変換"""
+        results = {}
+        primary = self.currencies[0]
+        currencies = self.native_currencies
+        prices = await self.fetch_prices_multi([info['id'] for _, info in batch], currencies)
+
+        for product_key, product_info in batch:
+            product_id = str(product_info['id'])
+            product_prices = {
+                currency: prices[currency][product_id]
+                for currency in currencies
+                if product_id in prices[currency]
+            }
+            # 主通貨の価格が取れた商品のみ結果に含める
+            if primary in product_prices:
+                results[product_key] = {
+                    'name': product_info['name'],
+                    'price': product_prices[primary],
+                    'currency': primary,
+                    'prices': product_prices,
+                    'url': product_info['url'],
+                    'timestamp': timestamp
                 }
-
-                # APIコール
-                async with self.session.get(self.API_URL, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-
-                        # 価格を抽出
-                        price = self._extract_price_from_api(data)
-                        if price:
-                            results[product_key] = {
-                                'name': product_info['name'],
-                                'price': price,
-                                'url': product_info['url'],
-                                'timestamp': datetime.now().isoformat()
-                            }
-                            # 通貨に応じた表示
-                            if currency == "JPY":
-                                logger.info(f"Price found: ¥{price:,.0f}")
-                            else:
-                                logger.info(f"Price found: {currency} ${price:,.2f}")
-                        else:
-                            logger.warning(f"No price in API response for {product_info['name']}")
-                    else:
-                        logger.error(f"API error: HTTP {response.status}")
-
-            except Exception as e:
-                logger.error(f"Error fetching {product_key}: {e}")
-
-            # レート制限対策
-            await asyncio.sleep(1)
+                logger.info(f"Price found: {product_info['name']} {self._format_prices(product_prices)}")
+            else:
+                logger.warning(f"No price in API response for {product_info['name']}")
 
         return results
 
-    def _extract_price_from_api(self, data: Dict) -> Optional[float]:
-        """価格をAPIレスポンスから抽出"""
-        try:
-            if 'products' in data and len(data['products']) > 0:
-                product = data['products'][0]
-
-                # 価格文字列から数値を抽出
-                price_str = product.get('price', '')
-                if price_str:
-                    # "S$2,613.25" -> 2613.25
-                    import re
-                    match = re.search(r'([\d,]+\.?\d*)', price_str)
-                    if match:
-                        return float(match.group(1).replace(',', ''))
-
-                # lowestPriceを試す
-                lowest_price = product.get('lowestPrice', '')
-                if lowest_price:
-                    match = re.search(r'([\d,]+\.?\d*)', lowest_price)
-                    if match:
-                        return float(match.group(1).replace(',', ''))
-        except Exception as e:
-            logger.error(f"Error extracting price: {e}")
+    async def fetch_prices_multi(self, product_ids: List, currencies: List[str]) -> Dict[str, Dict[str, float]]:
+        """複数通貨の価格を並行取得（通貨 -> 商品ID文字列 -> 価格、失敗した通貨は空）"""
+        responses = await asyncio.gather(
+            *[self.fetch_prices(product_ids, currency) for currency in currencies],
+            return_exceptions=True
+        )
+        prices = {}
+        for currency, response in zip(currencies, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error fetching {currency} prices for {len(product_ids)} products: {response}")
+                response = {}
+            prices[currency] = response
+        return prices
+
+    @staticmethod
+    def _format_prices(prices: Dict[str, float]) -> str:
+        return ', '.join(format_price(price, currency) for currency, price in prices.items())
+
+    async def fetch_prices(self, product_ids: List, currency: str) -> Dict[str, float]:
+        """キャッシュにない商品だけをAPIから取得"""
+        keys = [PriceCache.key(product_id, currency) for product_id in product_ids]
+
+        async def fetch_missing(missing_keys: List) -> Dict:
+            prices = await self._fetch_batch([key[0] for key in missing_keys], currency)
+            return {key: prices[key[0]] for key in missing_keys if key[0] in prices}
+
+        cached = await self.cache.get_or_fetch_many(keys, fetch_missing)
+        return {key[0]: price for key, price in cached.items()}
+
+    async def _fetch_batch(self, product_ids: List, currency: str) -> Dict[str, float]:
+        """複数商品の価格を1リクエストで取得（商品ID文字列 -> 価格）"""
+        params = {
+            "currency": currency,
+            "locationId": 1,
+            "productIds": ",".join(str(product_id) for product_id in product_ids)
+        }
+
+        async with self.limiter.slot(self.api_url) as slot:
+            async with self.session.get(self.api_url, params=params) as response:
+                slot.record(response.status, response.headers.get('Retry-After'))
+                if response.status != 200:
+                    logger.error(f"API error: HTTP {response.status}")
+                    return {}
+                data = await response.json()
+
+        return self._map_prices(data, product_ids, currency)
+
+    def _map_prices(self, data: Dict, product_ids: List, currency: Optional[str] = None) -> Dict[str, float]:
+        """APIレスポンスの products[] を商品IDに対応付け"""
+        entries = (data.get('products') or []) if isinstance(data, dict) else []
+        prices = {}
+
+        for position, entry in enumerate(entries):
+            product_id = entry.get('productId', entry.get('id'))
+            # IDが含まれない場合はリクエスト順で対応付け
+            if product_id is None and len(entries) == len(product_ids):
+                product_id = product_ids[position]
+            if product_id is None:
+                continue
+
+            price = self._extract_price(entry, currency)
+            if price:
+                prices[str(product_id)] = price
+
+        return prices
+
+    def _extract_price(self, product: Dict, currency: Optional[str] = None) -> Optional[float]:
+        """products[] の1要素から価格を抽出"""
+        # "S$2,613.25" -> 2613.25、なければlowestPriceを試す
+        for field in ('price', 'lowestPrice'):
+            price = parse_price(product.get(field), currency)
+            if price:
+                return price
         return None
 
+    @staticmethod
+    def _chunk(items: List, size: int) -> Iterator[List]:
+        """リストを指定サイズごとに分割"""
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
     async def run(self) -> Dict[str, Dict]:
         """スクレイピングを実行"""
         try:
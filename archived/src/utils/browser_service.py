@@ -0,0 +1,370 @@
+"""
+共有ブラウザサービス
+常駐するChromiumと温めたコンテキストのプールを貸し出し、起動コストを1回に抑える
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+
+from src.replay.routing import ReplayRouter
+from src.utils.resource_blocker import ResourceBlocker
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0 Safari/537.36'
+
+
+@dataclass
+class WarmContext:
+    """貸し出し用のコンテキストと利用状況"""
+    context: BrowserContext
+    created: float = field(default_factory=time.monotonic)
+    # 開いたページ数（ページプールで使い回したナビゲーションを含む）
+    pages_opened: int = 0
+    closed: bool = False
+    # 貸し出し中に入れ替えた場合の新しいコンテキスト（返却時はこちらを戻す）
+    replacement: Optional['WarmContext'] = None
+
+
+def chromium_rss_mb() -> float:
+    """このプロセス配下のChromiumプロセスの合計RSS（MB）。/proc がない環境では0"""
+    if not os.path.isdir('/proc'):
+        return 0.0
+
+    parents: Dict[int, int] = {}
+    names: Dict[int, str] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # "pid (comm) state ppid ..." の comm は空白を含み得るため末尾の ')' で区切る
+        comm = stat[stat.find('(') + 1:stat.rfind(')')]
+        fields = stat[stat.rfind(')') + 2:].split()
+        parents[int(entry)] = int(fields[1])
+        names[int(entry)] = comm
+
+    root = os.getpid()
+    total_kb = 0
+    for pid, comm in names.items():
+        if 'chrom' not in comm and 'headless' not in comm:
+            continue
+        ancestor = parents.get(pid)
+        while ancestor and ancestor != root:
+            ancestor = parents.get(ancestor)
+        if ancestor != root:
+            continue
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class BrowserService:
+    """常駐ブラウザと温めたコンテキストのプール
+
+    - コンテキストは貸し出し前にヘルスチェックし、応答しなければ作り直す
+    - max_pages ページを開いたコンテキスト、またはChromiumのRSSが max_rss_mb を
+      超えた時点で返却されたコンテキストは閉じて新しいものに入れ替える
+    - 借りたまま使い続ける利用者（ページプール）は count_navigation / needs_recycle / renew で
+      貸し出し中に同じ上限を適用する
+    - ブラウザが落ちていれば次の貸し出し時に起動し直す
+
+    Playwrightのオブジェクトは作成したイベントループに属するため、
+    start() を呼んだループ上でのみ使用すること。
+    """
+
+    HEALTH_CHECK_TIMEOUT = 2.0
+    # 貸し出し中のRSS確認の間隔（秒、/proc の走査を毎回行わない）
+    RSS_CHECK_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        contexts: int = 2,
+        max_pages: int = 100,
+        max_rss_mb: float = 1024,
+        context_options: Optional[Dict] = None,
+        blocker: Optional[ResourceBlocker] = None,
+        replay: Optional[ReplayRouter] = None
+    ):
+        self.size = max(1, contexts)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.context_options = context_options or {}
+        self.blocker = blocker
+        self.replay = replay
+
+        self.launches = 0
+        self.recycled = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[WarmContext] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._rss_checked = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+            self._start_lock = asyncio.Lock()
+        elif self.loop is not loop:
+            raise RuntimeError("BrowserService is bound to another event loop")
+
+    async def start(self):
+        """ブラウザを起動してコンテキストを温める（起動済みなら何もしない）"""
+        self._check_loop()
+        async with self._start_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            await self._launch()
+
+    async def _launch(self):
+        if self._browser is not None:
+            # 落ちたブラウザの後始末
+            logger.warning("Browser disconnected, relaunching")
+            await self._shutdown()
+
+        started = time.monotonic()
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            await self._idle.put(await self._new_context())
+        self.launches += 1
+        logger.info(
+            f"Browser service started: {self.size} warm contexts in {time.monotonic() - started:.1f}s"
+        )
+
+    async def _new_context(self) -> WarmContext:
+        context = await self._browser.new_context(**self.context_options)
+        # 後から設定したルートが先に動くため、リプレイを先に設定してブロッカーの後ろに置く
+        if self.replay:
+            await self.replay.install(context)
+        if self.blocker:
+            await self.blocker.install(context)
+
+        warm = WarmContext(context)
+
+        def on_page(_page):
+            warm.pages_opened += 1
+
+        def on_close(_context):
+            warm.closed = True
+
+        context.on('page', on_page)
+        context.on('close', on_close)
+        self._all.append(warm)
+        return warm
+
+    async def _healthy(self, warm: WarmContext) -> bool:
+        if warm.closed or not self._browser.is_connected():
+            return False
+        try:
+            # 安価な往復でコンテキストが応答するか確認
+            await asyncio.wait_for(warm.context.cookies(), self.HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.warning(f"Browser context failed health check: {e}")
+            return False
+
+    def _needs_recycle(self, warm: WarmContext) -> bool:
+        if warm.pages_opened >= self.max_pages:
+            return True
+        rss = chromium_rss_mb()
+        if self.max_rss_mb and rss > self.max_rss_mb:
+            logger.info(f"Chromium RSS {rss:.0f} MB exceeds {self.max_rss_mb:.0f} MB")
+            return True
+        return False
+
+    def _warm(self, context: BrowserContext) -> Optional[WarmContext]:
+        for warm in self._all:
+            if warm.context is context:
+                return warm
+        return None
+
+    def count_navigation(self, context: BrowserContext):
+        """使い回したページでのナビゲーションを数える（page イベントが出ない分）"""
+        warm = self._warm(context)
+        if warm:
+            warm.pages_opened += 1
+
+    def needs_recycle(self, context: BrowserContext) -> bool:
+        """借りたままのコンテキストが入れ替えの上限に達したか（RSSは RSS_CHECK_INTERVAL 秒に1回確認）"""
+        warm = self._warm(context)
+        if warm is None:
+            return False
+        if warm.closed or warm.pages_opened >= self.max_pages:
+            return True
+        now = time.monotonic()
+        if self.max_rss_mb and now - self._rss_checked >= self.RSS_CHECK_INTERVAL:
+            self._rss_checked = now
+            rss = chromium_rss_mb()
+            if rss > self.max_rss_mb:
+                logger.info(f"Chromium RSS {rss:.0f} MB exceeds {self.max_rss_mb:.0f} MB")
+                return True
+        return False
+
+    async def renew(self, context: BrowserContext) -> BrowserContext:
+        """借りたままのコンテキストを閉じて新しいものに入れ替える（返却時は新しい方がプールに戻る）"""
+        warm = self._warm(context)
+        if warm is None:
+            raise ValueError("Context is not managed by this browser service")
+        logger.info(f"Recycling borrowed browser context after {warm.pages_opened} pages")
+        warm.replacement = await self._replace(warm)
+        return warm.replacement.context
+
+    async def _replace(self, warm: WarmContext) -> WarmContext:
+        """コンテキストを閉じて新しいものを作る"""
+        if warm in self._all:
+            self._all.remove(warm)
+        if not warm.closed:
+            try:
+                await warm.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
+        self.recycled += 1
+        return await self._new_context()
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[BrowserContext]:
+        """温めたコンテキストを借りる（返却時に開いたままのページは閉じる）"""
+        await self.start()
+        idle = self._idle
+        warm = await idle.get()
+        try:
+            if not self._browser.is_connected():
+                # 待機中にブラウザが落ちた場合は起動し直して借り直す
+                await idle.put(warm)
+                await self.start()
+                idle = self._idle
+                warm = await idle.get()
+            if not await self._healthy(warm):
+                warm = await self._replace(warm)
+        except BaseException:
+            await idle.put(warm)
+            raise
+
+        try:
+            yield warm.context
+        finally:
+            if idle is self._idle:
+                await idle.put(await self._release(warm))
+
+    async def _release(self, warm: WarmContext) -> WarmContext:
+        while warm.replacement:
+            warm = warm.replacement
+        if not warm.closed:
+            for page in list(warm.context.pages):
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+        if warm.closed or self._needs_recycle(warm):
+            logger.info(f"Recycling browser context after {warm.pages_opened} pages")
+            return await self._replace(warm)
+        return warm
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """コンテキストを借りて新しいページを1枚開く"""
+        async with self.context() as context:
+            page = await context.new_page()
+            try:
+                yield page
+            finally:
+                if not page.is_closed():
+                    await page.close()
+
+    def stats(self) -> Dict:
+        """プールの状態"""
+        return {
+            'contexts': len(self._all),
+            'idle': self._idle.qsize() if self._idle else 0,
+            'launches': self.launches,
+            'recycled': self.recycled,
+            'pages_opened': sum(warm.pages_opened for warm in self._all)
+        }
+
+    async def _shutdown(self):
+        for warm in self._all:
+            if not warm.closed:
+                try:
+                    await warm.context.close()
+                except Exception:
+                    pass
+        self._all = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def close(self):
+        """全コンテキストとブラウザを閉じる"""
+        if self._browser is None:
+            return
+        await self._shutdown()
+        self._idle = None
+        logger.info("Browser service closed")
+
+
+_service: Optional[BrowserService] = None
+
+
+def get_browser_service() -> BrowserService:
+    """プロセス全体で共有するブラウザサービスを取得（起動は最初の貸し出し時）"""
+    global _service
+    if _service is None:
+        currency = os.getenv('CURRENCY', 'JPY')
+        block = os.getenv('SCRAPER_BLOCK_RESOURCES', 'true').lower() == 'true'
+        _service = BrowserService(
+            contexts=int(os.getenv('BROWSER_CONTEXTS', '2')),
+            max_pages=int(os.getenv('BROWSER_RECYCLE_PAGES', '100')),
+            max_rss_mb=float(os.getenv('BROWSER_MAX_RSS_MB', '1024')),
+            context_options={
+                'viewport': {'width': 1920, 'height': 1080},
+                'user_agent': USER_AGENT,
+                'locale': 'ja-JP' if currency == 'JPY' else 'en-US'
+            },
+            # 価格抽出に不要なリソースの読み込みを中止
+            blocker=ResourceBlocker() if block else None,
+            # SCRAPER_REPLAY_URL があれば記録した応答で再生
+            replay=ReplayRouter.from_env()
+        )
+    return _service
+
+
+async def close_browser_service():
+    """共有ブラウザサービスを閉じる（ジョブの終了時に呼ぶ）"""
+    global _service
+    if _service is not None:
+        await _service.close()
+        _service = None
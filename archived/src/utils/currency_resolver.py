@@ -0,0 +1,174 @@
+"""
+通貨の判定
+ページ全体のHTMLではなく、価格要素とその周辺・サイトのメタデータ（priceCurrency・通貨Cookie・言語）から通貨を決める
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from playwright.async_api import Page
+
+from src.utils.price_parser import CODES, DOLLAR_CURRENCIES, parse_price_details
+
+logger = logging.getLogger(__name__)
+
+# 言語タグ -> 通貨（地域付きを優先し、なければ言語のみで照合）
+LOCALE_CURRENCIES = {
+    'ja': 'JPY', 'ja-jp': 'JPY',
+    'en-sg': 'SGD', 'zh-sg': 'SGD',
+    'en-us': 'USD', 'en-gb': 'GBP', 'en-au': 'AUD', 'en-ca': 'CAD', 'en-nz': 'NZD', 'zh-hk': 'HKD',
+    'de': 'EUR', 'fr': 'EUR', 'it': 'EUR', 'es': 'EUR', 'nl': 'EUR', 'ko': 'KRW',
+}
+
+# 数値を伴わない通貨表示（「通貨: SGD」等）。'$' 単独は曖昧なので含めない
+_LABEL_PATTERN = re.compile(
+    r"(?<![A-Z])(" + '|'.join(sorted(CODES)) + r")(?![A-Z])|(S\$|US\$|A\$|C\$|HK\$|NZ\$|[¥￥円€£₩])"
+)
+_LABEL_SYMBOLS = {
+    'S$': 'SGD', 'US$': 'USD', 'A$': 'AUD', 'C$': 'CAD', 'HK$': 'HKD', 'NZ$': 'NZD',
+    '¥': 'JPY', '￥': 'JPY', '円': 'JPY', '€': 'EUR', '£': 'GBP', '₩': 'KRW',
+}
+
+# 名前に currency を含むCookieの値
+_COOKIE_PATTERN = re.compile(r"(?:^|;\s*)[^=;]*currency[^=;]*=\s*([A-Za-z]{3})(?:;|$)", re.IGNORECASE)
+
+_LANG_PATTERN = re.compile(r"<html\b[^>]*\blang=[\"']?([A-Za-z-]+)", re.IGNORECASE)
+
+# 最初に一致した価格要素と、その周辺・サイトのメタデータだけを返す
+CURRENCY_CONTEXT_JS = """
+([selectors, maxLength]) => {
+    const clip = (text) => (text || '').replace(/\\s+/g, ' ').trim().slice(0, maxLength);
+    let el = null;
+    for (const selector of selectors) {
+        el = Array.from(document.querySelectorAll(selector)).find((node) => /\\d/.test(node.textContent || ''))
+            || document.querySelector(selector);
+        if (el) break;
+    }
+
+    const texts = [];
+    let declared = null;
+    if (el) {
+        texts.push(clip(el.textContent));
+        for (const attr of ['data-currency', 'data-price-currency', 'content']) {
+            if (el.getAttribute(attr)) texts.push(clip(el.getAttribute(attr)));
+        }
+        for (const sibling of [el.previousElementSibling, el.nextElementSibling]) {
+            if (sibling) texts.push(clip(sibling.textContent));
+        }
+        if (el.parentElement) {
+            texts.push(clip(el.parentElement.textContent));
+            if (el.parentElement.parentElement) texts.push(clip(el.parentElement.parentElement.textContent));
+        }
+        const scope = el.closest('[itemscope]');
+        const prop = scope && scope.querySelector('[itemprop="priceCurrency"]');
+        if (prop) declared = prop.getAttribute('content') || clip(prop.textContent);
+    }
+    if (!declared) {
+        const prop = document.querySelector('[itemprop="priceCurrency"]');
+        const meta = document.querySelector(
+            'meta[property="product:price:currency"], meta[property="og:price:currency"]'
+        );
+        declared = (prop && (prop.getAttribute('content') || clip(prop.textContent)))
+            || (meta && meta.getAttribute('content')) || null;
+    }
+
+    return {texts, declared, cookie: document.cookie || '', lang: document.documentElement.lang || null};
+}
+"""
+
+# 周辺テキスト1件の最大文字数
+CONTEXT_TEXT_LENGTH = 200
+
+
+@dataclass
+class CurrencyContext:
+    """通貨判定の材料（価格要素に近い順のテキストとサイトのメタデータ）"""
+    texts: List[str] = field(default_factory=list)
+    declared: Optional[str] = None   # priceCurrency / og:price:currency
+    cookie: Optional[str] = None     # document.cookie
+    lang: Optional[str] = None       # <html lang>
+
+
+def _code(value: Optional[str]) -> Optional[str]:
+    code = (value or '').strip().upper()
+    return code if re.fullmatch(r"[A-Z]{3}", code) else None
+
+
+def _label_currency(text: str) -> Optional[str]:
+    match = _LABEL_PATTERN.search(text)
+    if not match:
+        return None
+    return match.group(1) or _LABEL_SYMBOLS[match.group(2)]
+
+
+def explicit_currency(text: Optional[str]) -> Optional[str]:
+    """価格テキストの数値に付いた記号・コードの通貨（'$' 単独など曖昧ならNone）"""
+    parsed = parse_price_details(text) if text else None
+    if parsed and parsed.currency and parsed.symbol != '$':
+        return parsed.currency
+    return None
+
+
+def cookie_currency(cookie: Optional[str]) -> Optional[str]:
+    """Cookie（currency=SGD 等）から通貨を取得"""
+    match = _COOKIE_PATTERN.search(cookie or '')
+    return _code(match.group(1)) if match else None
+
+
+def locale_currency(lang: Optional[str]) -> Optional[str]:
+    """言語タグから通貨を推定"""
+    tag = (lang or '').strip().lower().replace('_', '-')
+    if not tag:
+        return None
+    return LOCALE_CURRENCIES.get(tag) or LOCALE_CURRENCIES.get(tag.split('-')[0])
+
+
+def resolve_currency(context: CurrencyContext, default: str = 'USD') -> str:
+    """価格要素に近いものから順に通貨を決める
+
+    1. 数値に付いた記号・コード（'$' 単独はサイトの通貨がドル建てならそちらを採用）
+    2. 周辺の通貨表示
+    3. priceCurrency 等の宣言 → 通貨Cookie → ページの言語
+    """
+    site = _code(context.declared) or cookie_currency(context.cookie) or locale_currency(context.lang)
+
+    bare_dollar = False
+    for text in context.texts:
+        currency = explicit_currency(text)
+        if currency:
+            return currency
+        if text and parse_price_details(text):
+            # 最も近い価格が '$' 単独か記号なし
+            bare_dollar = '$' in text
+            break
+
+    label = next((currency for currency in map(_label_currency, filter(None, context.texts)) if currency), None)
+    if bare_dollar:
+        return next((currency for currency in (label, site) if currency in DOLLAR_CURRENCIES), 'USD')
+    return label or site or default
+
+
+async def resolve_page_currency(page: Page, selectors: Sequence[str], default: str = 'USD') -> str:
+    """価格要素（selectors の最初の一致）の周辺とサイトのメタデータから通貨を判定（ページ内で1往復）"""
+    data = await page.evaluate(CURRENCY_CONTEXT_JS, [list(selectors), CONTEXT_TEXT_LENGTH])
+    return resolve_currency(
+        CurrencyContext(
+            texts=[text for text in data.get('texts') or [] if text],
+            declared=data.get('declared'),
+            cookie=data.get('cookie'),
+            lang=data.get('lang')
+        ),
+        default
+    )
+
+
+def html_currency_context(html: str, price_text: Optional[str], declared: Optional[str] = None) -> CurrencyContext:
+    """静的HTMLの価格テキストと <html lang> から判定材料を作る"""
+    match = _LANG_PATTERN.search(html[:4096])
+    return CurrencyContext(
+        texts=[price_text] if price_text else [],
+        declared=declared,
+        lang=match.group(1) if match else None
+    )
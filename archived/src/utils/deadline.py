@@ -0,0 +1,115 @@
+"""
+タイムアウトと時間予算
+リクエスト単位（接続・読み取り）、商品単位、監視サイクル単位の3層で処理時間の上限を管理
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def client_timeout() -> aiohttp.ClientTimeout:
+    """HTTPリクエスト1回あたりのタイムアウト（接続・読み取り・全体）"""
+    return aiohttp.ClientTimeout(
+        total=float(os.getenv('HTTP_TOTAL_TIMEOUT', '30')),
+        connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+        sock_read=float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+    )
+
+
+def product_budget() -> float:
+    """商品1件（APIはバッチ1件）に使える最大秒数"""
+    return float(os.getenv('PRODUCT_BUDGET', '45'))
+
+
+class BudgetExceeded(asyncio.TimeoutError):
+    """時間予算を使い切った"""
+
+
+class Budget:
+    """期限付きの時間予算（seconds=None は無制限）"""
+
+    def __init__(self, seconds: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+        self.deadline = None if seconds is None else clock() + seconds
+
+    @classmethod
+    def from_env(cls, name: str, default: Optional[float] = None) -> 'Budget':
+        """環境変数の秒数から作成（未設定・0以下は default）"""
+        value = float(os.getenv(name, '0') or 0)
+        return cls(value if value > 0 else default)
+
+    def remaining(self) -> Optional[float]:
+        """残り秒数（無制限ならNone）"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """残り時間と cap の小さい方（どちらも無制限ならNone）"""
+        remaining = self.remaining()
+        if cap is None:
+            return remaining
+        return cap if remaining is None else min(cap, remaining)
+
+    def child(self, seconds: Optional[float]) -> 'Budget':
+        """この予算の範囲内に収まる子予算"""
+        return Budget(self.timeout(seconds), self.clock)
+
+    async def run(self, awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+        """残り時間内に完了しなければ BudgetExceeded"""
+        timeout = self.timeout(cap)
+        if timeout is not None and timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise BudgetExceeded("time budget exhausted")
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError as e:
+            raise BudgetExceeded(f"time budget of {timeout:.1f}s exhausted") from e
+
+
+async def gather_within(
+    budget: Budget,
+    tasks: Dict[str, Awaitable]
+) -> Tuple[Dict[str, object], Iterable[str]]:
+    """キーごとの処理を予算内で並行実行
+
+    Returns:
+        (完了した処理の結果, 期限までに終わらず取り消したキー)
+    """
+    if not tasks:
+        return {}, []
+
+    futures = {asyncio.ensure_future(awaitable): key for key, awaitable in tasks.items()}
+    done, pending = await asyncio.wait(futures, timeout=budget.remaining())
+
+    for future in pending:
+        future.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"Time budget exhausted: cancelled {len(pending)} unfinished tasks")
+
+    results = {}
+    for future in done:
+        if future.cancelled():
+            continue
+        if future.exception() is not None:
+            logger.error(f"Task {futures[future]} failed: {future.exception()}")
+            continue
+        results[futures[future]] = future.result()
+    return results, [futures[future] for future in pending]
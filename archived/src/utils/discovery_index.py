@@ -0,0 +1,150 @@
+"""
+商品ID検出インデックス
+ブラウザで検出した URL -> 商品ID の対応を永続化し、再検出を省く
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse, urlunparse
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックなし
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ProductDiscoveryIndex:
+    """正規化URLをキーに商品ID・商品名・検出日時を保存
+
+    - revalidate_after を過ぎたエントリは利用前に再検証（価格APIで確認）する
+    - expire_after を過ぎたエントリは存在しないものとして扱う
+    - 保存時はファイルロックを取ってファイルを読み直し、このプロセスの変更だけを反映する
+      （web_app とスクレイパーが同時に書いても互いのエントリを消さない）
+    """
+
+    DEFAULT_FILE = Path("data/product_ids.json")
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        revalidate_after: timedelta = timedelta(days=7),
+        expire_after: timedelta = timedelta(days=90)
+    ):
+        self.path = Path(path) if path else self.DEFAULT_FILE
+        self.revalidate_after = revalidate_after
+        self.expire_after = expire_after
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        # 保存していない変更（正規化URL -> エントリ、削除はNone）
+        self._changes: Dict[str, Optional[Dict]] = {}
+
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        """比較用にURLを正規化（ホスト小文字化、クエリ・フラグメント・末尾スラッシュ除去）"""
+        parsed = urlparse(url.strip())
+        host = (parsed.hostname or '').lower()
+        if parsed.port:
+            host = f"{host}:{parsed.port}"
+        path = parsed.path.rstrip('/') or '/'
+        return urlunparse(((parsed.scheme or 'https').lower(), host, path, '', '', ''))
+
+    def _modified_elsewhere(self) -> bool:
+        try:
+            return self.path.stat().st_mtime_ns != self._loaded_mtime
+        except FileNotFoundError:
+            return False
+
+    def _load(self) -> Dict[str, Dict]:
+        self._loaded_mtime = self.path.stat().st_mtime_ns if self.path.exists() else None
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load discovery index: {e}")
+        return {}
+
+    def _save(self):
+        """他のプロセスの変更を読み直して、このプロセスの変更を重ねて保存"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix('.lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = self._load()
+                for key, entry in self._changes.items():
+                    if entry is None:
+                        entries.pop(key, None)
+                    else:
+                        entries[key] = entry
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._entries = entries
+        self._changes = {}
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """有効なエントリを返す（期限切れ・未登録はNone）"""
+        key = self.canonical_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry and self._modified_elsewhere():
+                # 他のプロセスが登録したエントリを読み込む
+                self._entries = self._load()
+                entry = self._entries.get(key)
+        if not entry:
+            return None
+        if datetime.now() - datetime.fromisoformat(entry['validated_at']) > self.expire_after:
+            return None
+        return entry
+
+    def needs_revalidation(self, entry: Dict) -> bool:
+        """最後の検証から revalidate_after を過ぎているか"""
+        return datetime.now() - datetime.fromisoformat(entry['validated_at']) > self.revalidate_after
+
+    def record(self, url: str, product_id, name: Optional[str] = None) -> Dict:
+        """検出結果を保存"""
+        now = datetime.now().isoformat()
+        entry = {
+            'product_id': int(product_id) if str(product_id).isdigit() else product_id,
+            'name': name,
+            'discovered_at': now,
+            'validated_at': now
+        }
+        key = self.canonical_url(url)
+        with self._lock:
+            self._entries[key] = self._changes[key] = entry
+            self._save()
+        return entry
+
+    def mark_validated(self, url: str):
+        """再検証できたエントリの検証日時を更新"""
+        with self._lock:
+            key = self.canonical_url(url)
+            entry = self._entries.get(key)
+            if entry:
+                entry = {**entry, 'validated_at': datetime.now().isoformat()}
+                self._entries[key] = self._changes[key] = entry
+                self._save()
+
+    def forget(self, url: str):
+        """無効になったエントリを削除"""
+        key = self.canonical_url(url)
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._changes[key] = None
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
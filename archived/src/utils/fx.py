@@ -0,0 +1,227 @@
+"""
+為替レート
+サイクルごとに1回取得したレートのスナップショットから、取得しなかった通貨の価格を換算で求める
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from src.utils.deadline import client_timeout
+from src.utils.price_parser import ZERO_DECIMAL
+
+logger = logging.getLogger(__name__)
+
+# 価格の由来
+NATIVE = 'native'
+DERIVED = 'derived'
+
+
+@dataclass
+class RateSnapshot:
+    """ある時点の為替レート（1 base あたりの各通貨の額）"""
+    base: str
+    rates: Dict[str, float]
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    source: str = ''
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: str = '') -> 'RateSnapshot':
+        """{"base": "USD", "rates": {...}, "timestamp": ...} 形式（base_code / conversion_rates も可）から作成"""
+        base = (data.get('base') or data.get('base_code') or '').upper()
+        rates = data.get('rates') or data.get('conversion_rates') or {}
+        if not base or not rates:
+            raise ValueError("rate snapshot needs base and rates")
+        normalized = {code.upper(): float(rate) for code, rate in rates.items() if rate}
+        normalized[base] = 1.0
+        return cls(
+            base=base,
+            rates=normalized,
+            timestamp=str(data.get('timestamp') or data.get('time_last_update_utc') or datetime.now().isoformat()),
+            source=source
+        )
+
+    def cross(self, source: str, target: str) -> Optional[float]:
+        """source 1単位あたりの target の額（どちらかのレートがなければNone）"""
+        if source == target:
+            return 1.0
+        if source not in self.rates or target not in self.rates:
+            return None
+        return self.rates[target] / self.rates[source]
+
+    def matrix(self, sources: Iterable[str], targets: Iterable[str]) -> Dict[Tuple[str, str], float]:
+        """通貨の組ごとの換算係数（換算できない組は含まない）"""
+        targets = list(targets)
+        factors = {}
+        for source in set(sources):
+            for target in targets:
+                factor = self.cross(source, target)
+                if factor is not None and source != target:
+                    factors[(source, target)] = factor
+        return factors
+
+
+class RateSource(ABC):
+    """為替レートの取得元"""
+
+    @abstractmethod
+    async def fetch(self) -> RateSnapshot:
+        """最新のスナップショットを取得（失敗時は例外）"""
+
+
+class FileRateSource(RateSource):
+    """ローカルのJSONファイルから読み込む"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    async def fetch(self) -> RateSnapshot:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return RateSnapshot.from_dict(json.load(f), source=str(self.path))
+
+
+class HttpRateSource(RateSource):
+    """HTTPでJSONを取得（テスト用のスタンドインサーバーにも使う）"""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def fetch(self) -> RateSnapshot:
+        async with aiohttp.ClientSession(timeout=client_timeout()) as session:
+            async with session.get(self.url) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status} from {self.url}")
+                data = await response.json(content_type=None)
+        return RateSnapshot.from_dict(data, source=self.url)
+
+
+def rate_source_from(spec: Optional[str]) -> Optional[RateSource]:
+    """URLならHTTP、それ以外はファイルパスとして取得元を作成（空ならNone）"""
+    if not spec:
+        return None
+    if spec.startswith(('http://', 'https://')):
+        return HttpRateSource(spec)
+    return FileRateSource(Path(spec))
+
+
+class FxRates:
+    """TTL付きでスナップショットを保持（期限切れ時のみ取得し直す）
+
+    取得に失敗した場合は期限切れでも直前のスナップショットを使い続ける。
+    """
+
+    def __init__(self, source: RateSource, ttl: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.ttl = ttl
+        self.clock = clock
+        self.fetches = 0
+        self._snapshot: Optional[RateSnapshot] = None
+        self._fetched_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self._fetched_at is not None and self.clock() - self._fetched_at < self.ttl
+
+    async def snapshot(self) -> Optional[RateSnapshot]:
+        """有効なスナップショット（一度も取得できていなければNone）"""
+        if self.fresh:
+            return self._snapshot
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # 待っている間に他のタスクが取得済みなら再取得しない
+            if self.fresh:
+                return self._snapshot
+            try:
+                self._snapshot = await self.source.fetch()
+                self._fetched_at = self.clock()
+                self.fetches += 1
+                logger.info(
+                    f"FX rates loaded from {self._snapshot.source}: "
+                    f"{len(self._snapshot.rates)} currencies, base {self._snapshot.base}"
+                )
+            except Exception as e:
+                if self._snapshot is None:
+                    logger.error(f"Failed to load FX rates: {e}")
+                else:
+                    logger.warning(f"Failed to refresh FX rates, using snapshot from {self._snapshot.timestamp}: {e}")
+        return self._snapshot
+
+
+def _round(amount: float, currency: str) -> float:
+    return float(round(amount)) if currency in ZERO_DECIMAL else round(amount, 2)
+
+
+def derive_prices(results: Dict[str, Dict], currencies: List[str], snapshot: RateSnapshot) -> int:
+    """取得結果に足りない通貨の価格を換算して追加（結果をその場で更新）
+
+    換算係数は通貨の組ごとに1回だけ求め、全商品を1パスで換算する。
+    各結果の price_origin に通貨ごとの由来（native / derived）を記録し、
+    取得した価格は換算値で上書きしない。
+
+    Returns:
+        追加した換算価格の数
+    """
+    rows = []
+    for result in results.values():
+        prices = result.setdefault('prices', {result['currency']: result['price']})
+        origin = result.setdefault('price_origin', {})
+        for currency in prices:
+            origin.setdefault(currency, NATIVE)
+        rows.append((result, prices, origin))
+
+    factors = snapshot.matrix((row[0]['currency'] for row in rows), currencies)
+
+    derived = 0
+    for result, prices, origin in rows:
+        native = result['currency']
+        amount = prices.get(native, result['price'])
+        added = False
+        for target in currencies:
+            factor = factors.get((native, target))
+            if factor is None or target in prices:
+                continue
+            prices[target] = _round(amount * factor, target)
+            origin[target] = DERIVED
+            added = True
+            derived += 1
+        if added:
+            result['fx_timestamp'] = snapshot.timestamp
+    return derived
+
+
+async def apply_fx(fx: Optional[FxRates], results: Dict[str, Dict], currencies: List[str]) -> int:
+    """スナップショットを取得して換算価格を追加（為替が無効・未取得なら何もしない）"""
+    if fx is None or not results:
+        return 0
+    snapshot = await fx.snapshot()
+    if snapshot is None:
+        return 0
+    derived = derive_prices(results, currencies, snapshot)
+    if derived:
+        logger.info(f"Derived {derived} prices from FX rates ({snapshot.timestamp})")
+    return derived
+
+
+_fx: Optional[FxRates] = None
+
+
+def get_fx_rates() -> Optional[FxRates]:
+    """プロセス全体で共有する為替レート（FX_SOURCE 未設定ならNone）"""
+    global _fx
+    source = rate_source_from(os.getenv('FX_SOURCE'))
+    if source is None:
+        return None
+    if _fx is None:
+        _fx = FxRates(source, ttl=float(os.getenv('FX_TTL', '3600')))
+    return _fx
@@ -0,0 +1,122 @@
+"""
+共有非同期HTTPクライアント
+バックグラウンドスレッドの常駐イベントループ上でkeep-aliveコネクションプールを共有
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+import aiohttp
+
+from src.utils.deadline import client_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPClient:
+    """常駐イベントループとaiohttpセッション（コネクションプール・DNSキャッシュ付き）"""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 60.0
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.RLock()
+
+    @property
+    def running(self) -> bool:
+        """ループスレッドが稼働中か"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ループスレッドとセッションを起動（起動済みなら何もしない）"""
+        with self._lock:
+            if self.running:
+                return
+
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="async-http-client", daemon=True)
+            self._thread.start()
+            self._session = self.run(self._create_session())
+            logger.info(
+                f"HTTP client started (pool={self.limit}, per_host={self.limit_per_host}, "
+                f"dns_ttl={self.dns_cache_ttl}s)"
+            )
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        # 接続・読み取りのタイムアウトで、応答しない上流にループを占有させない
+        return aiohttp.ClientSession(connector=connector, timeout=client_timeout())
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共有セッション（常駐ループ上のコルーチンからのみ使用すること）"""
+        self.start()
+        return self._session
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """コルーチンを常駐ループで実行し結果を待つ（同期コード用）"""
+        self.start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncHTTPClient.run() cannot be called from the client loop")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def close(self):
+        """セッションを閉じてループを停止"""
+        with self._lock:
+            if not self.running:
+                return
+
+            if self._session:
+                self.run(self._session.close())
+                self._session = None
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
+            self._thread = None
+            logger.info("HTTP client closed")
+
+
+_client: Optional[AsyncHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> AsyncHTTPClient:
+    """アプリ全体で共有するHTTPクライアントを取得"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncHTTPClient(
+                limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+                limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")),
+                dns_cache_ttl=int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+            )
+            atexit.register(_client.close)
+        return _client
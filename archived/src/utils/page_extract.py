@@ -0,0 +1,117 @@
+"""
+ページ内テキスト抽出
+1回の page.evaluate で商品名・セレクターの値・価格マーカー付近のテキストをまとめて取得
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Union
+
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+# 1ページあたりに返す候補テキストの上限と1件の最大文字数
+MAX_CANDIDATES = 200
+MAX_TEXT_LENGTH = 200
+
+EXTRACT_JS = """
+([markers, selectors, nameSelectors, limit, maxLength]) => {
+    const clip = (text) => (text || '').replace(/\\s+/g, ' ').trim().slice(0, maxLength);
+    const textOf = (el) => el ? clip(el.getAttribute('content') || el.innerText || el.textContent) : null;
+
+    let name = null;
+    for (const selector of nameSelectors) {
+        const el = document.querySelector(selector);
+        if (el && textOf(el)) {
+            name = textOf(el);
+            break;
+        }
+    }
+
+    const selected = {};
+    for (const selector of selectors) {
+        selected[selector] = textOf(document.querySelector(selector));
+    }
+
+    // マーカーを含むテキストノードの親要素（数字が兄弟要素にある場合は祖父要素）のテキスト
+    const candidates = [];
+    const seen = new Set();
+    if (markers.length && document.body) {
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        let node;
+        while ((node = walker.nextNode()) && candidates.length < limit) {
+            const value = node.nodeValue;
+            if (!value || !markers.some((marker) => value.includes(marker))) continue;
+
+            let el = node.parentElement;
+            if (!el || el.closest('script, style, noscript')) continue;
+            let text = clip(el.innerText || value);
+            if (!/\\d/.test(text) && el.parentElement) {
+                el = el.parentElement;
+                text = clip(el.innerText);
+            }
+            if (text && !seen.has(text)) {
+                seen.add(text);
+                candidates.push(text);
+            }
+        }
+    }
+
+    return {name, selected, candidates};
+}
+"""
+
+
+@dataclass
+class PageText:
+    """1回の抽出で得たページのテキスト"""
+    name: Optional[str] = None
+    selected: Dict[str, Optional[str]] = field(default_factory=dict)
+    candidates: List[str] = field(default_factory=list)
+
+    def first_selected(self, selectors: Iterable[str]) -> Optional[str]:
+        """指定順で最初に見つかったセレクターのテキスト"""
+        for selector in selectors:
+            text = self.selected.get(selector)
+            if text:
+                return text
+        return None
+
+
+async def extract_page_text(
+    page: Page,
+    markers: Sequence[str] = (),
+    selectors: Sequence[str] = (),
+    name_selectors: Sequence[str] = (),
+    limit: int = MAX_CANDIDATES
+) -> PageText:
+    """ページのテキストを1往復で取得
+
+    Args:
+        markers: 価格の目印となる文字列（'¥', 'JPY' 等）。含むテキストの周辺を候補として返す
+        selectors: 最初の一致要素のテキストを返すCSSセレクター
+        name_selectors: 商品名として最初に見つかった要素のテキストを返すセレクター
+    """
+    data = await page.evaluate(
+        EXTRACT_JS,
+        [list(markers), list(selectors), list(name_selectors), limit, MAX_TEXT_LENGTH]
+    )
+    return PageText(
+        name=data.get('name'),
+        selected=data.get('selected') or {},
+        candidates=data.get('candidates') or []
+    )
+
+
+def first_match(texts: Iterable[Optional[str]], patterns: Sequence[Union[str, Pattern]]) -> Optional[re.Match]:
+    """パターンの優先順に、テキストを文書順で照合して最初の一致を返す"""
+    texts = [text for text in texts if text]
+    for pattern in patterns:
+        regex = re.compile(pattern) if isinstance(pattern, str) else pattern
+        for text in texts:
+            match = regex.search(text)
+            if match:
+                return match
+    return None
@@ -0,0 +1,167 @@
+"""
+Playwrightページプール
+複数のブラウザコンテキストにまたがるページを使い回す
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from playwright.async_api import BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+
+class PagePool:
+    """N枚のページをM個のコンテキストに分散して保持し、貸し出す
+
+    service（BrowserService）を渡すと、返却ごとにナビゲーションを数え、入れ替えの上限に達した
+    コンテキストは新しいページを渡さずに空け、全ページが戻った時点で入れ替えてページを作り直す。
+    contexts のリストは入れ替えた新しいコンテキストで更新する。
+    返却時のリセット・作り直し・入れ替えに失敗しても、他のコンテキストでページを開いて size 枚を保つ
+    （どのコンテキストでも開けなかった分は次の貸し出し時に作り直す）。
+    """
+
+    def __init__(self, contexts: List[BrowserContext], size: int, service=None):
+        if not contexts:
+            raise ValueError("PagePool requires at least one browser context")
+        self.contexts = contexts
+        self.size = max(1, size)
+        self.service = service
+        self.reused = 0
+        self.renewed = 0
+
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._owner: Dict[Page, BrowserContext] = {}
+        # コンテキストごとのページ数（貸し出し中を含む）
+        self._live: Dict[BrowserContext, int] = {}
+        # 入れ替え待ちのコンテキスト -> 作り直すページ数
+        self._draining: Dict[BrowserContext, int] = {}
+        # 開けずに欠けているページ数
+        self._missing = 0
+
+    async def open(self):
+        """ページを作成してプールに入れる（コンテキストにラウンドロビンで割り当て）"""
+        for index in range(self.size):
+            context = self.contexts[index % len(self.contexts)]
+            await self._idle.put(await self._new_page(context))
+        logger.info(f"Page pool opened: {self.size} pages across {len(self.contexts)} contexts")
+
+    async def _new_page(self, context: BrowserContext) -> Page:
+        page = await context.new_page()
+        self._owner[page] = context
+        self._live[context] = self._live.get(context, 0) + 1
+        return page
+
+    async def _open_pages(self, count: int, contexts: List[BrowserContext]) -> List[Page]:
+        """count 枚のページを contexts の順に開けるコンテキストで作る（開けなかった分は _missing に数える）"""
+        pages = []
+        for _ in range(count):
+            for context in contexts:
+                try:
+                    pages.append(await self._new_page(context))
+                    break
+                except Exception as e:
+                    logger.warning(f"Failed to open page: {e}")
+            else:
+                self._missing += 1
+        if len(pages) < count:
+            logger.error(f"Page pool is short of {count - len(pages)} pages")
+        return pages
+
+    def _others(self, context: BrowserContext) -> List[BrowserContext]:
+        """context 以外のコンテキスト"""
+        return [c for c in self.contexts if c is not context]
+
+    async def _close_page(self, page: Page):
+        if not page.is_closed():
+            try:
+                await page.close()
+            except Exception as e:
+                logger.debug(f"Error closing page: {e}")
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """ページを借りる（返却時に次の利用者向けにリセット）"""
+        if self._missing:
+            missing, self._missing = self._missing, 0
+            for fresh in await self._open_pages(missing, self.contexts):
+                await self._idle.put(fresh)
+        page = await self._idle.get()
+        try:
+            yield page
+        finally:
+            try:
+                returned = await self._return(page)
+            except Exception as e:
+                logger.warning(f"Failed to return page to the pool: {e}")
+                returned = await self._replace(page)
+            for fresh in returned:
+                await self._idle.put(fresh)
+
+    async def _replace(self, page: Page) -> List[Page]:
+        """戻せなかったページを捨て、他のコンテキストで開いたページに置き換える"""
+        context = self._owner.pop(page, None)
+        if context is None:
+            return []
+        if self._live.get(context):
+            self._live[context] -= 1
+        await self._close_page(page)
+        return await self._open_pages(1, self._others(context) + [context])
+
+    async def _return(self, page: Page) -> List[Page]:
+        """返却されたページを戻す（入れ替え中のコンテキストなら閉じ、揃えば作り直したページを戻す）"""
+        context = self._owner[page]
+        if self.service:
+            self.service.count_navigation(context)
+            if context in self._draining or self.service.needs_recycle(context):
+                return await self._drain(page, context)
+        return await self._recycle(page)
+
+    async def _drain(self, page: Page, context: BrowserContext) -> List[Page]:
+        self._draining.setdefault(context, self._live[context])
+        self._owner.pop(page)
+        await self._close_page(page)
+        self._live[context] -= 1
+        if self._live[context]:
+            # 他の利用者が同じコンテキストのページを返すまで待つ
+            return []
+
+        del self._live[context]
+        count = self._draining.pop(context)
+        try:
+            renewed = await self.service.renew(context)
+        except Exception as e:
+            # 入れ替えられなければ他のコンテキストでページを作り直す
+            logger.warning(f"Failed to renew browser context: {e}")
+            return await self._open_pages(count, self._others(context) + [context])
+        self.contexts[self.contexts.index(context)] = renewed
+        self.renewed += 1
+        return await self._open_pages(count, [renewed] + self._others(renewed))
+
+    async def _recycle(self, page: Page) -> List[Page]:
+        context = self._owner.pop(page)
+        if not page.is_closed():
+            try:
+                # 前のページのDOMとタイマーを破棄してメモリを解放
+                await page.goto('about:blank')
+                self._owner[page] = context
+                self.reused += 1
+                return [page]
+            except Exception as e:
+                logger.warning(f"Discarding broken page: {e}")
+                await self._close_page(page)
+        self._live[context] -= 1
+        return await self._open_pages(1, [context] + self._others(context))
+
+    async def close(self):
+        """プール内の全ページを閉じる"""
+        for page in list(self._owner):
+            if not page.is_closed():
+                await page.close()
+        self._owner.clear()
+        self._live.clear()
+        self._draining.clear()
+        self._missing = 0
+        self._idle = asyncio.Queue()
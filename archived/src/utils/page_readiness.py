@@ -0,0 +1,137 @@
+"""
+ページ準備完了の判定
+固定待機の代わりに価格XHR・価格要素・DOM変化の収束をデッドライン付きで待つ
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Tuple
+
+from playwright.async_api import Page, Response, TimeoutError as PlaywrightTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# 価格要素が空でない数値を持つまで待つ
+NUMERIC_SELECTOR_JS = """
+(selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    const text = el.getAttribute('content') || el.dataset.price || el.textContent || '';
+    const value = parseFloat(text.replace(/[^0-9.]/g, ''));
+    return Number.isFinite(value) && value > 0;
+}
+"""
+
+# 一定時間DOM変化がなくなるまで待つ（最大 deadline ミリ秒）
+DOM_SETTLE_JS = """
+([quietMs, deadlineMs]) => new Promise((resolve) => {
+    let timer = null;
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(hardStop);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(() => finish(true), quietMs);
+    const hardStop = setTimeout(() => finish(false), deadlineMs);
+})
+"""
+
+
+@dataclass
+class ReadinessStrategy:
+    """サイトごとの準備完了条件"""
+    kind: str                 # 'response' | 'selector' | 'settle'
+    target: str = ''          # 'response' はURLの部分文字列、'selector' はCSSセレクター
+    deadline: float = 8.0     # 待機の上限（秒）
+    quiet_ms: int = 500       # 'settle' でDOM変化が止まったとみなす時間
+
+
+SITE_READINESS = {
+    'bullionstar': ReadinessStrategy('response', 'services.bullionstar.com/product/v2/prices'),
+    'goldsilver': ReadinessStrategy('selector', '.price-now, .product-price, [itemprop="price"]'),
+    'apmex': ReadinessStrategy('selector', '.price-value, .product-price'),
+    'jmbullion': ReadinessStrategy('selector', '.price-per-unit, .product-price'),
+    'generic': ReadinessStrategy('settle', deadline=5.0),
+}
+
+
+async def navigate(
+    page: Page,
+    url: str,
+    strategy: ReadinessStrategy,
+    timeout: float = 30000,
+    on_response: Optional[Callable[[Optional[Response]], None]] = None
+) -> Tuple[Optional[Response], bool]:
+    """DOMContentLoadedまで読み込み、戦略に従って準備完了を待つ
+
+    Returns:
+        (ナビゲーションのレスポンス, デッドライン内に準備完了したか)
+    """
+    if strategy.kind == 'response':
+        response, ready = await wait_for_response_during(
+            page,
+            lambda: page.goto(url, wait_until='domcontentloaded', timeout=timeout),
+            strategy.target,
+            strategy.deadline,
+            on_done=on_response
+        )
+    else:
+        response = await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+        if on_response:
+            on_response(response)
+
+        if strategy.kind == 'selector':
+            ready = await wait_for_numeric_selector(page, strategy.target, strategy.deadline)
+        else:
+            ready = await wait_for_dom_settle(page, strategy.quiet_ms, strategy.deadline)
+
+    if not ready:
+        logger.debug(f"Readiness '{strategy.kind}' not reached within {strategy.deadline}s: {url}")
+    return response, ready
+
+
+async def wait_for_response_during(
+    page: Page,
+    action: Callable[[], Awaitable],
+    url_part: str,
+    deadline: float,
+    on_done: Optional[Callable] = None
+) -> Tuple[Optional[object], bool]:
+    """action 実行中に url_part を含むレスポンスが届くまで待つ
+
+    action 自体の失敗はそのまま送出し、レスポンス待ちのタイムアウトのみ False として返す。
+    """
+    result = None
+    finished = False
+    try:
+        async with page.expect_response(lambda r: url_part in r.url, timeout=deadline * 1000) as info:
+            result = await action()
+            finished = True
+            if on_done:
+                on_done(result)
+        await info.value
+        return result, True
+    except PlaywrightTimeoutError:
+        if not finished:
+            raise
+        return result, False
+
+
+async def wait_for_numeric_selector(page: Page, selector: str, deadline: float) -> bool:
+    """セレクターの要素が数値を持つまで待つ"""
+    try:
+        await page.wait_for_function(NUMERIC_SELECTOR_JS, arg=selector, timeout=deadline * 1000)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_for_dom_settle(page: Page, quiet_ms: int, deadline: float) -> bool:
+    """DOM変化が quiet_ms 止まるまで待つ"""
+    return await page.evaluate(DOM_SETTLE_JS, [quiet_ms, int(deadline * 1000)])
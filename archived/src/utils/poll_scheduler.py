@@ -0,0 +1,198 @@
+"""
+価格変動に応じたポーリングスケジューラー
+商品ごとの次回取得時刻をヒープで管理し、最近の変動が大きい商品ほど短い間隔で取得する
+"""
+
+import heapq
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """商品ごとの取得間隔を変動の大きさで調整
+
+    - 間隔 = base_interval × (reference_volatility / 直近の変動率の標準偏差) を
+      [min_interval, max_interval] に収める（変動がなければ max_interval）
+    - 履歴が足りない商品は base_interval
+    - 直近1時間の取得数が hourly_budget に達したら、期限の古い商品から順に次の枠を待つ
+    """
+
+    WINDOW = 3600.0
+
+    def __init__(
+        self,
+        min_interval: float = 300,
+        max_interval: float = 6 * 3600,
+        base_interval: float = 3600,
+        reference_volatility: float = 0.005,
+        hourly_budget: Optional[int] = None,
+        history_size: int = 20,
+        clock: Callable[[], float] = time.time
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        self.reference_volatility = reference_volatility
+        self.hourly_budget = hourly_budget or None
+        self.history_size = history_size
+        self.clock = clock
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._in_flight: Set[str] = set()
+        self._history: Dict[str, Deque[float]] = {}
+        self._fetches: Deque[float] = deque()
+        self._sequence = 0
+
+    @classmethod
+    def from_env(cls, base_interval: float = 3600) -> 'PollScheduler':
+        """POLL_* 環境変数から作成"""
+        return cls(
+            min_interval=float(os.getenv('POLL_MIN_INTERVAL', '300')),
+            max_interval=float(os.getenv('POLL_MAX_INTERVAL', str(6 * 3600))),
+            base_interval=base_interval,
+            reference_volatility=float(os.getenv('POLL_REFERENCE_VOLATILITY', '0.005')),
+            hourly_budget=int(os.getenv('POLL_HOURLY_BUDGET', '0'))
+        )
+
+    def __len__(self) -> int:
+        return len(self._due) + len(self._in_flight)
+
+    def __contains__(self, key: str) -> bool:
+        # 取得中（due で返して record 待ち）の商品も含む
+        return key in self._due or key in self._in_flight
+
+    def _push(self, key: str, due: float):
+        # 古いエントリはヒープに残し、取り出し時に _due と一致しなければ捨てる
+        self._due[key] = due
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, key))
+
+    def add(self, key: str, due: Optional[float] = None, prices: Iterable[float] = ()):
+        """商品を登録（既定はすぐに取得、prices は古い順の既知の価格）
+
+        登録済み（取得中を含む）の商品は何もしない（履歴も追加しない）。
+        """
+        if key in self:
+            return
+        history = self._history.setdefault(key, deque(maxlen=self.history_size))
+        history.extend(price for price in prices if price)
+        self._push(key, self.clock() if due is None else due)
+
+    def remove(self, key: str):
+        """商品を外す"""
+        self._due.pop(key, None)
+        self._in_flight.discard(key)
+        self._history.pop(key, None)
+
+    def sync(self, keys: Iterable[str]):
+        """監視対象を keys に合わせる（新しい商品はすぐに取得）"""
+        keys = set(keys)
+        for key in list(self._due) + list(self._in_flight):
+            if key not in keys:
+                self.remove(key)
+        for key in keys:
+            self.add(key)
+
+    def volatility(self, key: str) -> Optional[float]:
+        """直近の価格の変動率（前回比）の標準偏差（履歴が3件未満ならNone）"""
+        prices = self._history.get(key) or ()
+        if len(prices) < 3:
+            return None
+        prices = list(prices)
+        returns = [current / previous - 1 for previous, current in zip(prices, prices[1:]) if previous]
+        if len(returns) < 2:
+            return None
+        mean = sum(returns) / len(returns)
+        return math.sqrt(sum((value - mean) ** 2 for value in returns) / len(returns))
+
+    def interval(self, key: str) -> float:
+        """次回までの間隔（秒）"""
+        volatility = self.volatility(key)
+        if volatility is None:
+            return self.base_interval
+        if volatility <= 0:
+            return self.max_interval
+        interval = self.base_interval * self.reference_volatility / volatility
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _trim_fetches(self, now: float):
+        while self._fetches and self._fetches[0] <= now - self.WINDOW:
+            self._fetches.popleft()
+
+    def budget_remaining(self) -> Optional[int]:
+        """直近1時間で使える残りの取得数（無制限ならNone）"""
+        if self.hourly_budget is None:
+            return None
+        self._trim_fetches(self.clock())
+        return max(0, self.hourly_budget - len(self._fetches))
+
+    def due(self, limit: Optional[int] = None) -> List[str]:
+        """取得時刻を過ぎた商品を期限の古い順に返す（1時間あたりの取得数の範囲内）
+
+        返した商品は取得中として扱い、record / record_failure で次回時刻が決まる
+        （取得に失敗しても必ずどちらかを呼ぶこと）。
+        """
+        now = self.clock()
+        allowance = self.budget_remaining()
+        if allowance is not None:
+            limit = allowance if limit is None else min(limit, allowance)
+
+        keys = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(keys) < limit):
+            due, _, key = heapq.heappop(self._heap)
+            if self._due.get(key) != due:
+                continue
+            del self._due[key]
+            self._in_flight.add(key)
+            keys.append(key)
+            self._fetches.append(now)
+
+        if self._heap and allowance is not None and len(keys) == allowance and self._heap[0][0] <= now:
+            logger.warning(f"Hourly fetch budget of {self.hourly_budget} reached, deferring due products")
+        return keys
+
+    def _finish(self, key: str) -> bool:
+        """取得中の状態を解除し、まだ監視対象なら True（取得中に外された商品は予約しない）"""
+        if key in self._in_flight:
+            self._in_flight.discard(key)
+            return True
+        return key in self._due
+
+    def record(self, key: str, price: Optional[float]):
+        """取得結果を記録し、変動に応じた間隔で次回を予約"""
+        if not self._finish(key):
+            return
+        if price:
+            self._history.setdefault(key, deque(maxlen=self.history_size)).append(price)
+        interval = self.interval(key)
+        self._push(key, self.clock() + interval)
+        logger.debug(f"Next poll for {key} in {interval:.0f}s")
+
+    def record_failure(self, key: str):
+        """取得に失敗した商品は最短間隔で再試行"""
+        if not self._finish(key):
+            return
+        self._push(key, self.clock() + self.min_interval)
+
+    def next_due(self) -> Optional[float]:
+        """次に取得できる時刻（予算切れなら枠が空く時刻まで遅らせる）"""
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        due = self._heap[0][0]
+        if self.budget_remaining() == 0:
+            due = max(due, self._fetches[0] + self.WINDOW)
+        return due
+
+    def seconds_until_next(self) -> Optional[float]:
+        """次の取得までの秒数"""
+        due = self.next_due()
+        return None if due is None else max(0.0, due - self.clock())
@@ -0,0 +1,156 @@
+"""
+価格レスポンスキャッシュ
+(商品ID, 通貨, ロケーションID) 単位のTTL・LRUキャッシュと同時ミスの単一化
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PriceKey = Tuple[str, str, int]
+
+
+class PriceCache:
+    """TTL付きLRUキャッシュ（同じキーへの同時取得は1回の上流呼び出しにまとめる）"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(product_id, currency: str, location_id: int = 1) -> PriceKey:
+        """キャッシュキーを生成"""
+        return (str(product_id), currency.upper(), int(location_id))
+
+    def get(self, key: Hashable) -> Optional[float]:
+        """有効期限内の値を返す（なければNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: float):
+        """値を保存（容量超過時は最も古く使われたものから削除）"""
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """指定キー（省略時は全体）を破棄"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Optional[float]]]) -> Optional[float]:
+        """キャッシュになければ取得して保存"""
+        async def fetch_one(keys: List[Hashable]) -> Dict[Hashable, float]:
+            value = await fetch()
+            return {} if value is None else {keys[0]: value}
+
+        return (await self.get_or_fetch_many([key], fetch_one)).get(key)
+
+    async def get_or_fetch_many(
+        self,
+        keys: List[Hashable],
+        fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, float]]]
+    ) -> Dict[Hashable, float]:
+        """複数キーをまとめて解決
+
+        キャッシュヒットはそのまま返し、他のタスクが取得中のキーはその結果を待ち、
+        残りのキーだけを1回の fetch(keys) で取得する。取得できなかった値は保存しない。
+        """
+        loop = asyncio.get_running_loop()
+        results: Dict[Hashable, float] = {}
+        waiting: Dict[Hashable, asyncio.Future] = {}
+        owned: Dict[Hashable, asyncio.Future] = {}
+
+        for key in dict.fromkeys(keys):
+            value = self.get(key)
+            if value is not None:
+                results[key] = value
+                self.hits += 1
+                continue
+
+            with self._lock:
+                inflight = self._inflight.get(key)
+                # 別ループのFutureは待てないため、そのループでは独自に取得する
+                if inflight and inflight[0] is loop:
+                    waiting[key] = inflight[1]
+                else:
+                    future = loop.create_future()
+                    self._inflight[key] = (loop, future)
+                    owned[key] = future
+            self.misses += 1
+
+        if owned:
+            try:
+                fetched = await fetch(list(owned))
+            except BaseException:
+                # 待機中のタスクには「取得失敗」として通知
+                for key, future in owned.items():
+                    self._finish(key, future)
+                raise
+
+            for key, future in owned.items():
+                value = fetched.get(key)
+                if value is not None:
+                    self.set(key, value)
+                    results[key] = value
+                self._finish(key, future, value=value)
+
+        for key, future in waiting.items():
+            value = await asyncio.shield(future)
+            if value is not None:
+                results[key] = value
+
+        return results
+
+    def _finish(self, key: Hashable, future: asyncio.Future, value: Optional[float] = None):
+        with self._lock:
+            if self._inflight.get(key, (None, None))[1] is future:
+                del self._inflight[key]
+        if not future.done():
+            future.set_result(value)
+
+
+_cache: Optional[PriceCache] = None
+
+
+def get_price_cache() -> PriceCache:
+    """全ての取得経路で共有する価格キャッシュを取得"""
+    global _cache
+    if _cache is None:
+        _cache = PriceCache(
+            ttl=float(os.getenv("PRICE_CACHE_TTL", "60")),
+            max_entries=int(os.getenv("PRICE_CACHE_SIZE", "1024"))
+        )
+    return _cache
@@ -0,0 +1,415 @@
+"""
+価格ログ
+価格履歴を改行区切りJSON（NDJSON）のセグメントファイルに追記する。直近の記録はメモリ上の末尾から返す
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックなし
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.ndjson'
+
+
+class PriceLog:
+    """追記専用の価格ログ
+
+    - 記録はバッファに溜める。sync_every 件ごと、または sync_interval 秒ごとにまとめて書き込み、fsync する
+    - 書き込み中のセグメントが segment_bytes を超えたら、次のセグメントに切り替える
+    - 閉じたセグメントが compact_after 個溜まると、バックグラウンドで compacted_bytes までまとめる
+      （retention より古い記録は削除）
+    - 書き込み済みの直近 tail_size 件はメモリに保持する。他のプロセスが追記した分は読み取り時に取り込む
+    """
+
+    DEFAULT_DIR = Path("data/price_log")
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        segment_bytes: int = 4 * 1024 * 1024,
+        sync_every: int = 100,
+        sync_interval: float = 1.0,
+        tail_size: int = 5000,
+        compact_after: int = 4,
+        compacted_bytes: int = 64 * 1024 * 1024,
+        retention: Optional[timedelta] = None,
+        legacy_file: Optional[Path] = None
+    ):
+        self.path = Path(path) if path else self.DEFAULT_DIR
+        self.segment_bytes = segment_bytes
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.compacted_bytes = compacted_bytes
+        self.retention = retention
+        # 旧形式の price_history.json（ログが空なら初回に取り込む）
+        self.legacy_file = Path(legacy_file) if legacy_file else self.path.parent / "price_history.json"
+
+        self._lock = threading.RLock()
+        self._pending: List[Dict] = []
+        self._last_sync = time.monotonic()
+        self._tail: Deque[Dict] = deque(maxlen=tail_size)
+        # 末尾に収まらない古い記録があるか
+        self._truncated = False
+        # 取り込み済みの位置（セグメント番号, inode, オフセット）
+        self._follow: Tuple[int, int, int] = (0, 0, 0)
+        self._compactor: Optional[threading.Thread] = None
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._import_legacy()
+        self._load_tail()
+
+    # --- セグメント ---
+
+    def _segments(self) -> List[Tuple[int, Path]]:
+        """セグメントを番号順に返す"""
+        segments = []
+        for segment in self.path.glob(f"*{SEGMENT_SUFFIX}"):
+            if segment.stem.isdigit():
+                segments.append((int(segment.stem), segment))
+        return sorted(segments)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.path / f"{seq:08d}{SEGMENT_SUFFIX}"
+
+    @contextmanager
+    def _locked(self):
+        """スレッド間・プロセス間で書き込みとセグメントの入れ替えを排他する"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path / 'LOCK', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse(data: bytes) -> List[Dict]:
+        """NDJSONを解析（クラッシュで途中まで書かれた行は読み飛ばす）"""
+        records = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping corrupt price log line: {line[:80]!r}")
+        return records
+
+    @staticmethod
+    def _read_complete(segment: Path, offset: int = 0) -> Tuple[List[Dict], int]:
+        """offset から最後の改行までを読み、記録と読み終えた位置を返す"""
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        return PriceLog._parse(data[:end]), offset + end
+
+    # --- 末尾 ---
+
+    def _load_tail(self):
+        """新しいセグメントから順に読み、直近 tail_size 件を末尾に載せる"""
+        with self._lock:
+            self._tail.clear()
+            self._truncated = False
+            segments = self._segments()
+            self._follow = (0, 0, 0)
+            loaded: List[List[Dict]] = []
+            count = 0
+            for seq, segment in reversed(segments):
+                if count >= self._tail.maxlen:
+                    self._truncated = True
+                    break
+                try:
+                    records, end = self._read_complete(segment)
+                except FileNotFoundError:
+                    # 他のプロセスが統合中
+                    continue
+                if not loaded:
+                    self._follow = (seq, segment.stat().st_ino, end)
+                loaded.append(records)
+                count += len(records)
+            if count > self._tail.maxlen:
+                self._truncated = True
+            for records in reversed(loaded):
+                self._tail.extend(records)
+
+    def _catch_up(self):
+        """他のプロセスが追記した記録を末尾に取り込む"""
+        with self._lock:
+            seq, inode, offset = self._follow
+            segments = self._segments()
+            if seq and seq not in {segment_seq for segment_seq, _ in segments}:
+                # 取り込み中のセグメントが統合で他のセグメントにまとめられた
+                self._load_tail()
+                return
+            for segment_seq, segment in segments:
+                if segment_seq < seq:
+                    continue
+                try:
+                    current_inode = segment.stat().st_ino
+                    if segment_seq == seq and current_inode != inode:
+                        # 取り込み中のセグメントが統合で置き換えられた
+                        self._load_tail()
+                        return
+                    start = offset if segment_seq == seq else 0
+                    records, end = self._read_complete(segment, start)
+                except FileNotFoundError:
+                    self._load_tail()
+                    return
+                self._extend_tail(records)
+                self._follow = (segment_seq, current_inode, end)
+
+    def _extend_tail(self, records: Iterable[Dict]):
+        for record in records:
+            if len(self._tail) == self._tail.maxlen:
+                self._truncated = True
+            self._tail.append(record)
+
+    # --- 書き込み ---
+
+    def append(self, record: Dict):
+        """記録を追加（バッファが sync_every 件または sync_interval 秒を超えたら書き込む）"""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict]):
+        """複数の記録を追加"""
+        with self._lock:
+            self._pending.extend(records)
+            due = (
+                len(self._pending) >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """バッファの記録を書き込み、fsync する"""
+        with self._lock:
+            if not self._pending:
+                self._last_sync = time.monotonic()
+                return
+            # 書き込みに失敗した場合はバッファに残す
+            pending = self._pending
+            data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in pending).encode('utf-8')
+
+            with self._locked():
+                # 先に他のプロセスの追記を取り込み、自分の書き込みを二重に読まないようにする
+                self._catch_up()
+                segments = self._segments()
+                seq, segment = segments[-1] if segments else (1, self._segment_path(1))
+                rolled = False
+                if segment.exists() and segment.stat().st_size >= self.segment_bytes:
+                    seq, segment = seq + 1, self._segment_path(seq + 1)
+                    rolled = True
+
+                with open(segment, 'ab') as f:
+                    if f.tell() and not self._ends_with_newline(segment):
+                        # 前回途中で止まった行と繋がらないようにする
+                        data = b'\n' + data
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    end = f.tell()
+                self._pending = []
+                self._follow = (seq, segment.stat().st_ino, end)
+                self._extend_tail(pending)
+                sealed = len(segments) if rolled else len(segments) - 1
+
+            self._last_sync = time.monotonic()
+
+        if rolled and sealed >= self.compact_after:
+            self._start_compaction()
+
+    @staticmethod
+    def _ends_with_newline(segment: Path) -> bool:
+        with open(segment, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def close(self):
+        """残りの記録を書き込み、統合の終了を待つ"""
+        self.flush()
+        compactor = self._compactor
+        if compactor:
+            compactor.join()
+
+    def __enter__(self) -> 'PriceLog':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 読み取り ---
+
+    def recent(self, limit: Optional[int] = None, product_key: Optional[str] = None) -> List[Dict]:
+        """直近 limit 件を古い順に返す（limit なしは全件、末尾に収まらなければセグメントを読む）"""
+        self._catch_up()
+        with self._lock:
+            records = [
+                r for r in [*self._tail, *self._pending]
+                if not product_key or r.get('product_key') == product_key
+            ]
+            truncated = self._truncated
+        if limit and len(records) >= limit:
+            return records[-limit:]
+        if not truncated:
+            return records
+        return list(deque(self.read(product_key), maxlen=limit or None))
+
+    def read(self, product_key: Optional[str] = None, since: Optional[str] = None) -> List[Dict]:
+        """全ての記録を古い順に返す（since はISO形式の時刻）"""
+        records = []
+        with self._locked():
+            for _, segment in self._segments():
+                segment_records, _ = self._read_complete(segment)
+                records.extend(segment_records)
+            records.extend(self._pending)
+        return [
+            r for r in records
+            if (not product_key or r.get('product_key') == product_key)
+            and (not since or r.get('timestamp', '') >= since)
+        ]
+
+    def history(self, limit: Optional[int] = None, product_key: Optional[str] = None) -> Dict:
+        """旧 price_history.json と同じ形（prices, last_update）で返す"""
+        prices = self.recent(limit, product_key)
+        with self._lock:
+            newest = self._pending[-1] if self._pending else (self._tail[-1] if self._tail else None)
+            last_update = newest.get('timestamp') if newest else None
+        return {'prices': prices, 'last_update': last_update}
+
+    def __len__(self) -> int:
+        return len(self.read())
+
+    # --- 統合 ---
+
+    def _start_compaction(self):
+        with self._lock:
+            if self._compactor and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self._compact_safely, name='price-log-compactor', daemon=True)
+            self._compactor.start()
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Price log compaction failed: {e}")
+
+    def compact(self) -> int:
+        """閉じたセグメントを compacted_bytes までまとめ、保持期間より古い記録を削除（削除したセグメント数を返す）"""
+        sealed = self._segments()[:-1]
+        cutoff = (datetime.now() - self.retention).isoformat() if self.retention else None
+
+        # 番号が連続するセグメントを compacted_bytes 以内のグループに分ける
+        groups: List[List[Tuple[int, Path]]] = []
+        size = 0
+        for seq, segment in sealed:
+            segment_size = segment.stat().st_size
+            if not groups or size + segment_size > self.compacted_bytes:
+                groups.append([])
+                size = 0
+            groups[-1].append((seq, segment))
+            size += segment_size
+
+        removed = 0
+        for group in groups:
+            if len(group) < 2 and not (cutoff and self._oldest(group[0][1]) < cutoff):
+                continue
+            records = []
+            for _, segment in group:
+                records.extend(self._read_complete(segment)[0])
+            if cutoff:
+                records = [r for r in records if r.get('timestamp', '') >= cutoff]
+
+            target = group[0][1]
+            tmp_path = target.with_suffix('.tmp')
+            if records:
+                with open(tmp_path, 'wb') as f:
+                    f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            with self._locked():
+                if not all(segment.exists() for _, segment in group):
+                    # 他のプロセスが先に統合した
+                    if tmp_path.exists():
+                        tmp_path.unlink()
+                    continue
+                if records:
+                    os.replace(tmp_path, target)
+                else:
+                    target.unlink()
+                for _, segment in group[1:]:
+                    segment.unlink()
+            removed += len(group) - (1 if records else 0)
+
+        if removed:
+            logger.info(f"Compacted price log: removed {removed} segments")
+        return removed
+
+    def _oldest(self, segment: Path) -> str:
+        """セグメントの最初の記録の時刻"""
+        with open(segment, 'rb') as f:
+            records = self._parse(f.readline())
+        return records[0].get('timestamp', '') if records else ''
+
+    # --- 旧形式からの移行 ---
+
+    def _import_legacy(self):
+        """ログが空で price_history.json があれば、その記録を取り込む（元のファイルはそのまま残す）"""
+        if not self.legacy_file.exists():
+            return
+        with self._locked():
+            if self._segments():
+                return
+            try:
+                with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                    prices = json.load(f).get('prices', [])
+            except Exception as e:
+                logger.error(f"Failed to import {self.legacy_file}: {e}")
+                return
+            if prices:
+                data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in prices).encode('utf-8')
+                with open(self._segment_path(1), 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                logger.info(f"Imported {len(prices)} records from {self.legacy_file}")
+
+
+_log: Optional[PriceLog] = None
+
+
+def get_price_log() -> PriceLog:
+    """プロセスで共有する価格ログを取得（終了時に残りを書き込む）"""
+    global _log
+    if _log is None:
+        retention_days = os.getenv("PRICE_LOG_RETENTION_DAYS")
+        _log = PriceLog(
+            Path(os.getenv("PRICE_LOG_DIR", str(PriceLog.DEFAULT_DIR))),
+            segment_bytes=int(float(os.getenv("PRICE_LOG_SEGMENT_MB", "4")) * 1024 * 1024),
+            sync_every=int(os.getenv("PRICE_LOG_SYNC_EVERY", "100")),
+            tail_size=int(os.getenv("PRICE_LOG_TAIL", "5000")),
+            retention=timedelta(days=float(retention_days)) if retention_days else None
+        )
+        atexit.register(_log.close)
+    return _log
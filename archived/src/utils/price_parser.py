@@ -0,0 +1,206 @@
+"""
+価格文字列パーサー
+通貨記号・通貨コード・桁区切りの慣習を考慮して価格文字列を数値化（正規表現はモジュール読み込み時に1回だけコンパイル）
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 通貨記号 -> 通貨コード（長いものから照合する）
+SYMBOLS = {
+    'S$': 'SGD', 'US$': 'USD', 'A$': 'AUD', 'AU$': 'AUD', 'C$': 'CAD', 'CA$': 'CAD',
+    'HK$': 'HKD', 'NZ$': 'NZD', '$': 'USD',
+    '¥': 'JPY', '￥': 'JPY', '円': 'JPY', '€': 'EUR', '£': 'GBP', '₩': 'KRW', 'CHF': 'CHF',
+}
+
+CODES = {'JPY', 'SGD', 'USD', 'EUR', 'GBP', 'AUD', 'CAD', 'CHF', 'HKD', 'NZD', 'CNY', 'KRW', 'MYR'}
+
+# 小数を使わない通貨（区切り記号は常に桁区切り）
+ZERO_DECIMAL = {'JPY', 'KRW'}
+
+# 小数点にカンマを使う通貨
+COMMA_DECIMAL = {'EUR'}
+
+# '$' 単独のときに既定通貨として扱うドル建て通貨
+DOLLAR_CURRENCIES = {'USD', 'SGD', 'AUD', 'CAD', 'HKD', 'NZD'}
+
+# 桁区切りに使われる文字（カンマ・ピリオド・アポストロフィ・ノーブレークスペース類）
+_SEPARATORS = ",.'\u00a0\u202f\u2009"
+
+# 数字で始まり数字・区切り記号が続く部分（末尾の区切り記号は解析時に除く）
+NUMBER_PATTERN = re.compile(f"\\d[\\d{_SEPARATORS}]*")
+
+# 記号・コード -> 通貨コード
+MARKERS = {**SYMBOLS, **{code: code for code in CODES}}
+MARKER_SIZES = sorted({len(marker) for marker in MARKERS}, reverse=True)
+# 記号の先頭・末尾の文字（ここに含まれなければ記号の照合を省く）
+MARKER_FIRST_CHARS = frozenset(marker[0] for marker in MARKERS)
+MARKER_LAST_CHARS = frozenset(marker[-1] for marker in MARKERS)
+
+# 数字を取り除いて区切り記号だけを残す変換表
+_DROP_DIGITS = str.maketrans('', '', '0123456789')
+_DROP_SEPARATORS = str.maketrans('', '', _SEPARATORS)
+
+# 数値の前後で記号を探す文字数
+MARKER_WINDOW = 8
+
+
+class ParsedPrice(NamedTuple):
+    """解析結果"""
+    amount: float
+    currency: Optional[str]         # 検出した通貨（なければ指定された既定通貨）
+    symbol: Optional[str] = None    # 文字列中で見つかった記号・コード
+
+
+def _currency_of(marker: str, default: Optional[str]) -> str:
+    # '$' 単独は既定通貨がドル建てならそちらを採用
+    if marker == '$' and default in DOLLAR_CURRENCIES:
+        return default
+    return MARKERS[marker]
+
+
+def _marker_before(text: str, start: int) -> Optional[str]:
+    head = text[max(0, start - MARKER_WINDOW):start].rstrip()
+    if not head or head[-1] not in MARKER_LAST_CHARS:
+        return None
+    for size in MARKER_SIZES:
+        marker = head[-size:]
+        # 通貨コードは単語の一部（"XJPY" 等）でないこと
+        if marker in MARKERS and (marker not in CODES or not head[-size - 1:-size].isalpha()):
+            return marker
+    return None
+
+
+def _marker_after(text: str, end: int) -> Optional[str]:
+    tail = text[end:end + MARKER_WINDOW + 1].lstrip()
+    if not tail or tail[0] not in MARKER_FIRST_CHARS:
+        return None
+    for size in MARKER_SIZES:
+        marker = tail[:size]
+        if marker in MARKERS and (marker not in CODES or not tail[size:size + 1].isalpha()):
+            # 記号の後ろに数字が続く場合は次の数値の記号（"2024 S$3,500" の S$ は 3,500 のもの）
+            if tail[size:].lstrip()[:1].isdigit():
+                return None
+            return marker
+    return None
+
+
+def _to_float(number: str, currency: Optional[str]) -> float:
+    """区切り記号の慣習に従って数値化"""
+    separators = number.translate(_DROP_DIGITS)
+    if not separators:
+        return float(number)
+
+    last = separators[-1]
+    if separators.count(last) != len(separators):
+        # 2種類あれば最後の記号が小数点（"1.234,56" / "1,234.56"）
+        decimal = last
+    elif len(separators) > 1 or currency in ZERO_DECIMAL or last not in ',.':
+        # 同じ記号の繰り返し・小数のない通貨・アポストロフィ等は桁区切り
+        decimal = None
+    elif currency in COMMA_DECIMAL:
+        decimal = ',' if last == ',' else None
+    else:
+        # 1つだけなら、3桁続く場合は桁区切り（"1,234"）、それ以外は小数点（"12.50" / "12,50"）
+        decimal = last if len(number) - number.rindex(last) != 4 else None
+
+    if decimal is None:
+        return float(number.translate(_DROP_SEPARATORS))
+    head, _, tail = number.rpartition(decimal)
+    return float(head.translate(_DROP_SEPARATORS) + '.' + tail)
+
+
+@lru_cache(maxsize=8192)
+def _parse(text: str, currency: Optional[str]) -> Optional[ParsedPrice]:
+    first = None
+    trailing = None
+    for match in NUMBER_PATTERN.finditer(text):
+        number = match.group(0).rstrip(_SEPARATORS)
+        start = match.start()
+        # 前置きの記号を優先（"Qty 1 $2,450.00" は 2,450.00）
+        marker = _marker_before(text, start)
+        if marker:
+            detected = _currency_of(marker, currency)
+            try:
+                return ParsedPrice(_to_float(number, detected), detected, marker)
+            except ValueError:
+                continue
+        if trailing is None:
+            marker = _marker_after(text, start + len(number))
+            if marker:
+                detected = _currency_of(marker, currency)
+                try:
+                    trailing = ParsedPrice(_to_float(number, detected), detected, marker)
+                except ValueError:
+                    pass
+        if first is None:
+            first = number
+
+    if trailing:
+        return trailing
+    if first is None:
+        return None
+    try:
+        return ParsedPrice(_to_float(first, currency), currency)
+    except ValueError:
+        return None
+
+
+def parse_price_details(text, currency: Optional[str] = None) -> Optional[ParsedPrice]:
+    """価格文字列を解析して金額と通貨を返す（解析できなければNone）
+
+    記号・コードが前にある数値、後ろにある数値（"12,50 €"）の順に優先し（"1 oz ¥ 412,345" -> 412345）、
+    なければ最初の数値を使う。
+    currency は記号のない文字列や '$' の解釈に使う既定通貨。
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return ParsedPrice(float(text), currency) if text > 0 else None
+    if not text:
+        return None
+    return _parse(str(text), currency.upper() if currency else None)
+
+
+def parse_price(text, currency: Optional[str] = None) -> Optional[float]:
+    """価格文字列を数値化（"S$2,613.25" -> 2613.25、"¥245,300" -> 245300.0）"""
+    parsed = parse_price_details(text, currency)
+    return parsed.amount if parsed else None
+
+
+def parse_prices(texts: Iterable, currency: Optional[str] = None) -> List[Optional[float]]:
+    """複数の価格文字列をまとめて数値化（入力と同じ順序、解析できないものはNone）"""
+    code = currency.upper() if currency else None
+    parse = _parse
+    results = []
+    append = results.append
+    for text in texts:
+        if text.__class__ is str and text:
+            parsed = parse(text, code)
+            append(parsed.amount if parsed else None)
+        else:
+            parsed = parse_price_details(text, code)
+            append(parsed.amount if parsed else None)
+    return results
+
+
+def detect_currency(text: str, default: Optional[str] = None) -> Optional[str]:
+    """文字列中の価格の通貨を推定"""
+    parsed = parse_price_details(text, default)
+    return parsed.currency if parsed else default
+
+
+# 表示用の通貨記号
+DISPLAY_SYMBOLS = {'JPY': '¥', 'SGD': 'S$', 'USD': 'US$', 'EUR': '€', 'GBP': '£'}
+
+
+def format_price(amount: float, currency: str) -> str:
+    """通貨に応じた表示（"¥412,345" / "S$3,500.00"）"""
+    symbol = DISPLAY_SYMBOLS.get(currency, f"{currency} ")
+    if currency in ZERO_DECIMAL:
+        return f"{symbol}{amount:,.0f}"
+    return f"{symbol}{amount:,.2f}"
@@ -0,0 +1,239 @@
+"""
+ホスト別アダプティブレートリミッター
+トークンバケットとAIMD（加算増加・乗算減少）で各サイトの許容速度に追従
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostPolicy:
+    """ホストごとの制限ポリシー"""
+    rate: float = 1.0                # 初期リクエストレート（req/s）
+    max_rate: float = 5.0            # レートの上限
+    min_rate: float = 0.2            # レートの下限
+    burst: int = 2                   # バケット容量
+    concurrency: float = 2.0         # 初期同時接続数
+    max_concurrency: int = 8
+    min_concurrency: int = 1
+    target_latency: float = 3.0      # これを超える応答は混雑とみなす（秒）
+    backoff: float = 0.5             # 混雑時の乗算係数
+    rate_step: float = 0.1           # 成功時のレート加算量
+
+
+# 監視対象ディーラーの既定ポリシー
+DEFAULT_POLICIES: Dict[str, HostPolicy] = {
+    'bullionstar.com': HostPolicy(rate=2.0, max_rate=10.0, burst=4, concurrency=3, max_concurrency=8),
+    'apmex.com': HostPolicy(rate=0.5, max_rate=2.0, concurrency=1, max_concurrency=4, target_latency=8.0),
+    'jmbullion.com': HostPolicy(rate=0.5, max_rate=2.0, concurrency=1, max_concurrency=4, target_latency=8.0),
+    'goldsilver.com': HostPolicy(rate=0.5, max_rate=2.0, concurrency=1, max_concurrency=4, target_latency=8.0),
+}
+
+
+class HostLimiter:
+    """1ホスト分のトークンバケットと同時接続数の管理"""
+
+    # 同時接続数の空き待ちのポーリング間隔（秒）
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, host: str, policy: HostPolicy, clock: Callable[[], float] = time.monotonic):
+        self.host = host
+        self.policy = policy
+        self.clock = clock
+
+        self.rate = policy.rate
+        self.concurrency = float(policy.concurrency)
+        self.tokens = float(policy.burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+        self._updated = clock()
+        self._last_backoff = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.policy.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """枠を確保できれば0、できなければ次に試すまでの待機秒数を返す"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                return self.POLL_INTERVAL
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+
+            self.tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    async def acquire(self):
+        """枠が空くまで待機して確保"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, latency: float, status: Optional[int] = None, error: bool = False):
+        """枠を返却し、結果に応じて制限を調整"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+            congested = error or status == 429 or (status is not None and status >= 500)
+            if congested or latency > self.policy.target_latency:
+                self._back_off()
+            else:
+                # 加算増加: 1ウィンドウ分の成功で同時接続数+1
+                self.concurrency = min(self.policy.max_concurrency, self.concurrency + 1 / self.concurrency)
+                self.rate = min(self.policy.max_rate, self.rate + self.policy.rate_step)
+
+    def _back_off(self):
+        # 同じ混雑で何度も縮小しないよう、1回の縮小後は目標レイテンシ分だけ猶予
+        now = self.clock()
+        if now - self._last_backoff < self.policy.target_latency:
+            return
+        self._last_backoff = now
+
+        self.concurrency = max(self.policy.min_concurrency, self.concurrency * self.policy.backoff)
+        self.rate = max(self.policy.min_rate, self.rate * self.policy.backoff)
+        logger.info(f"Backing off {self.host}: concurrency={self.concurrency:.1f}, rate={self.rate:.2f}/s")
+
+    def penalize(self, seconds: float):
+        """Retry-After等で指定された期間、新規リクエストを止める"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class RequestSlot:
+    """確保した枠。応答ステータスを記録して返却時の調整に使う"""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.retry_after: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.started = time.monotonic()
+
+    def begin(self):
+        """レイテンシ計測の起点をリクエスト直前に合わせる"""
+        self.started = time.monotonic()
+
+    def record(self, status: Optional[int], retry_after: Optional[str] = None):
+        self.status = status
+        self.latency = time.monotonic() - self.started
+        if retry_after:
+            try:
+                self.retry_after = float(retry_after)
+            except ValueError:
+                pass
+
+
+class AdaptiveRateLimiter:
+    """全スクレイパーで共有するホスト別リミッター"""
+
+    def __init__(self, policies: Optional[Dict[str, HostPolicy]] = None, default_policy: Optional[HostPolicy] = None):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.default_policy = default_policy or HostPolicy()
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host_key(self, url_or_host: str) -> str:
+        """URLまたはホスト名をポリシーのキーに正規化（サブドメインは親ドメインにまとめる）"""
+        host = urlparse(url_or_host).hostname if '://' in url_or_host else url_or_host
+        host = (host or '').lower()
+        for domain in self.policies:
+            if host == domain or host.endswith('.' + domain):
+                return domain
+        return host
+
+    def share_host(self, url_or_host: str, shares: int):
+        """ホストを shares 個のプロセスで分担する場合に、このプロセスの取り分までポリシーを縮小
+
+        レートは shares で割るので合計は元のポリシーと同じ。同時接続数は1未満にできないため、
+        合計は最大で max(元の同時接続数, shares) になる。リミッターを作る前に呼ぶこと。
+        """
+        if shares <= 1:
+            return
+        key = self.host_key(url_or_host)
+        policy = self.policies.get(key, self.default_policy)
+        with self._lock:
+            self._limiters.pop(key, None)
+            self.policies[key] = replace(
+                policy,
+                rate=policy.rate / shares,
+                max_rate=policy.max_rate / shares,
+                min_rate=policy.min_rate / shares,
+                rate_step=policy.rate_step / shares,
+                burst=max(1, policy.burst // shares),
+                concurrency=max(policy.min_concurrency, policy.concurrency // shares),
+                max_concurrency=max(policy.min_concurrency, policy.max_concurrency // shares)
+            )
+
+    def limiter_for(self, url_or_host: str) -> HostLimiter:
+        key = self.host_key(url_or_host)
+        with self._lock:
+            if key not in self._limiters:
+                policy = self.policies.get(key, self.default_policy)
+                self._limiters[key] = HostLimiter(key, policy)
+            return self._limiters[key]
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[RequestSlot]:
+        """ホストの枠を確保して処理を実行
+
+        使用例:
+            async with limiter.slot(url) as slot:
+                async with session.get(url) as response:
+                    slot.record(response.status)
+        """
+        limiter = self.limiter_for(url)
+        await limiter.acquire()
+
+        slot = RequestSlot()
+        error = False
+        try:
+            yield slot
+        except (asyncio.TimeoutError, OSError):
+            error = True
+            raise
+        finally:
+            latency = slot.latency if slot.latency is not None else time.monotonic() - slot.started
+            limiter.release(latency, slot.status, error)
+            if slot.retry_after:
+                limiter.penalize(slot.retry_after)
+
+    def stats(self) -> Dict[str, Dict]:
+        """ホストごとの現在の制限値"""
+        return {
+            host: {
+                'rate': round(limiter.rate, 2),
+                'concurrency': round(limiter.concurrency, 2),
+                'in_flight': limiter.in_flight
+            }
+            for host, limiter in self._limiters.items()
+        }
+
+
+_limiter: Optional[AdaptiveRateLimiter] = None
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """プロセス全体で共有するリミッターを取得"""
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveRateLimiter()
+    return _limiter
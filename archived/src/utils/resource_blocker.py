@@ -0,0 +1,138 @@
+"""
+Playwrightのリソースブロッカー
+価格抽出に不要な画像・フォント・CSS・動画・解析タグの読み込みを中止
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Page, Request, Route
+
+logger = logging.getLogger(__name__)
+
+# 既定でブロックするリソースタイプ
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+# 既定でブロックするサードパーティドメイン（解析・広告・トラッキング）
+BLOCKED_DOMAINS = {
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'doubleclick.net',
+    'facebook.net', 'facebook.com', 'connect.facebook.net', 'hotjar.com', 'clarity.ms',
+    'bat.bing.com', 'analytics.tiktok.com', 'criteo.com', 'criteo.net', 'segment.io',
+    'nr-data.net', 'newrelic.com', 'intercom.io', 'trustpilot.com', 'klaviyo.com',
+}
+
+# ブロックしたリクエストの推定サイズ（バイト）。中止した応答の実サイズは分からないため概算で集計する
+ESTIMATED_BYTES = {
+    'image': 60_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 30_000,
+    'script': 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+@dataclass
+class SiteAllowlist:
+    """サイトごとに読み込みを許可するリソースタイプとドメイン"""
+    resource_types: Set[str] = field(default_factory=set)
+    domains: Set[str] = field(default_factory=set)
+
+
+# 価格抽出に必要なためサイト別に許可するもの（キーはページのドメイン）
+SITE_ALLOWLISTS: Dict[str, SiteAllowlist] = {}
+
+
+@dataclass
+class PageStats:
+    """ページ単位のブロック集計"""
+    blocked_requests: int = 0
+    allowed_requests: int = 0
+    bytes_saved: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+
+def _matches(host: str, domains: Set[str]) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class ResourceBlocker:
+    """ブラウザコンテキストにルーティングを設定して不要なリクエストを中止"""
+
+    def __init__(
+        self,
+        resource_types: Optional[Set[str]] = None,
+        domains: Optional[Set[str]] = None,
+        allowlists: Optional[Dict[str, SiteAllowlist]] = None
+    ):
+        self.resource_types = set(BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types)
+        self.domains = set(BLOCKED_DOMAINS if domains is None else domains)
+        self.allowlists = dict(SITE_ALLOWLISTS if allowlists is None else allowlists)
+        self._stats: Dict[Page, PageStats] = {}
+
+    async def install(self, context: BrowserContext):
+        """コンテキストの全リクエストにハンドラーを設定"""
+        await context.route('**/*', self._handle)
+
+    async def _handle(self, route: Route, request: Request):
+        page = self._page_of(request)
+        stats = self._stats.setdefault(page, PageStats()) if page else None
+
+        if self.should_block(request.url, request.resource_type, self._site_of(request)):
+            if stats:
+                stats.blocked_requests += 1
+                stats.bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+                stats.blocked_by_type[request.resource_type] = stats.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort('blockedbyclient')
+        else:
+            if stats:
+                stats.allowed_requests += 1
+            # 他のルーティング（リプレイ等）に処理を委ねる
+            await route.fallback()
+
+    def should_block(self, url: str, resource_type: str, site: str = '') -> bool:
+        """リクエストを中止すべきか判定"""
+        # ページ本体は常に読み込む
+        if resource_type == 'document':
+            return False
+
+        host = (urlparse(url).hostname or '').lower()
+        allow = next(
+            (allowlist for domain, allowlist in self.allowlists.items() if _matches(site, {domain})),
+            None
+        )
+        if allow and (resource_type in allow.resource_types or _matches(host, allow.domains)):
+            return False
+
+        return resource_type in self.resource_types or _matches(host, self.domains)
+
+    @staticmethod
+    def _page_of(request: Request) -> Optional[Page]:
+        try:
+            return request.frame.page
+        except Exception:
+            # Service Worker等のフレームを持たないリクエスト
+            return None
+
+    @staticmethod
+    def _site_of(request: Request) -> str:
+        try:
+            return (urlparse(request.frame.page.main_frame.url).hostname or '').lower()
+        except Exception:
+            return ''
+
+    def pop_stats(self, page: Page) -> PageStats:
+        """ページの集計を取り出してリセット（プールで再利用するページ向け）"""
+        return self._stats.pop(page, PageStats())
+
+    def report(self, page: Page, url: str) -> PageStats:
+        """ページの節約量をログに出して集計を返す"""
+        stats = self.pop_stats(page)
+        if stats.blocked_requests:
+            logger.info(
+                f"Blocked {stats.blocked_requests} requests (~{stats.bytes_saved / 1024:,.0f} KB) "
+                f"on {url}; allowed {stats.allowed_requests}"
+            )
+        return stats
@@ -0,0 +1,225 @@
+"""
+静的HTMLの高速経路
+条件付きGET（ETag / If-Modified-Since）で取得したサーバー描画のHTMLをスレッドプールで解析し、
+価格が取れたホストではブラウザを起動しない
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from src.utils.page_extract import MAX_TEXT_LENGTH, PageText
+from src.utils.rate_limiter import RequestSlot
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # 未インストールなら静的経路は使わずブラウザのみ
+    BeautifulSoup = None
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+logger = logging.getLogger(__name__)
+
+# 取得経路
+STATIC = 'static'
+BROWSER = 'browser'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def static_parsing_available() -> bool:
+    """HTMLパーサーが使えるか"""
+    return BeautifulSoup is not None
+
+
+def get_parse_executor() -> ThreadPoolExecutor:
+    """HTML解析用のスレッドプール（イベントループを解析で止めない）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('STATIC_PARSE_THREADS', str(min(4, os.cpu_count() or 1)))),
+                thread_name_prefix='html-parse'
+            )
+        return _executor
+
+
+def _clip(text: Optional[str]) -> str:
+    return ' '.join((text or '').split())[:MAX_TEXT_LENGTH]
+
+
+def extract_static_text(html: str, selectors: Sequence[str] = (), name_selectors: Sequence[str] = ()) -> PageText:
+    """HTMLから商品名とセレクターの値を取得（ブラウザ経路の extract_page_text と同じ形）"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+
+    def text_of(element) -> Optional[str]:
+        if element is None:
+            return None
+        return _clip(element.get('content') or element.get_text(' ', strip=True)) or None
+
+    name = None
+    for selector in name_selectors:
+        name = text_of(soup.select_one(selector))
+        if name:
+            break
+
+    return PageText(
+        name=name,
+        selected={selector: text_of(soup.select_one(selector)) for selector in selectors}
+    )
+
+
+@dataclass
+class StaticPage:
+    """取得したHTML（not_modified なら前回の本文）"""
+    url: str
+    status: int
+    html: str
+    not_modified: bool = False
+
+
+class ConditionalFetcher:
+    """URLごとの ETag / Last-Modified を覚えて条件付きGETを送る（304なら前回の本文を返す）"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.not_modified = 0
+        self._validators: "OrderedDict[str, Tuple[Optional[str], Optional[str], str]]" = OrderedDict()
+
+    def _headers(self, url: str) -> Dict[str, str]:
+        headers = {}
+        entry = self._validators.get(url)
+        if entry:
+            etag, last_modified, _ = entry
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    async def fetch(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        slot: Optional[RequestSlot] = None
+    ) -> Optional[StaticPage]:
+        """HTMLを取得（200/304以外はNone）"""
+        if slot:
+            slot.begin()
+        async with session.get(url, headers=self._headers(url)) as response:
+            if slot:
+                slot.record(response.status, response.headers.get('Retry-After'))
+
+            if response.status == 304 and url in self._validators:
+                self._validators.move_to_end(url)
+                self.not_modified += 1
+                return StaticPage(url, 304, self._validators[url][2], not_modified=True)
+            if response.status != 200:
+                logger.debug(f"Static fetch of {url} returned HTTP {response.status}")
+                return None
+
+            html = await response.text(errors='replace')
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._validators[url] = (etag, last_modified, html)
+                self._validators.move_to_end(url)
+                while len(self._validators) > self.max_entries:
+                    self._validators.popitem(last=False)
+            return StaticPage(url, 200, html)
+
+
+async def run_parser(func: Callable, *args):
+    """解析関数をスレッドプールで実行"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_executor(), func, *args)
+
+
+async def parse_in_thread(html: str, selectors: Sequence[str], name_selectors: Sequence[str]) -> PageText:
+    """HTMLの解析をスレッドプールで実行"""
+    return await run_parser(extract_static_text, html, list(selectors), list(name_selectors))
+
+
+class HostPathMemory:
+    """ホストごとに価格が取れた経路（static / browser）を記録して永続化
+
+    browser と記録したホストでも reprobe_after を過ぎれば静的経路を試し直す。
+    """
+
+    DEFAULT_FILE = Path("data/host_paths.json")
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        reprobe_after: timedelta = timedelta(days=1),
+        now: Callable[[], datetime] = datetime.now
+    ):
+        self.path = Path(path) if path else self.DEFAULT_FILE
+        self.reprobe_after = reprobe_after
+        self.now = now
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @staticmethod
+    def host(url: str) -> str:
+        return (urlparse(url).hostname or '').lower()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load host path memory: {e}")
+        return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def path_for(self, url: str) -> Optional[str]:
+        """記録済みの経路（未記録ならNone）"""
+        entry = self._entries.get(self.host(url))
+        return entry['path'] if entry else None
+
+    def _reprobe_due(self, entry: Dict) -> bool:
+        return self.now() - datetime.fromisoformat(entry['checked_at']) >= self.reprobe_after
+
+    def use_static(self, url: str) -> bool:
+        """静的経路を試すか（未記録・static・再確認の時期を過ぎた browser）"""
+        entry = self._entries.get(self.host(url))
+        return entry is None or entry['path'] == STATIC or self._reprobe_due(entry)
+
+    def record(self, url: str, path: str):
+        """価格が取れた経路を記録（経路が変わったとき・browser の再確認後のみ書き込む）"""
+        host = self.host(url)
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry['path'] == path and (path == STATIC or not self._reprobe_due(entry)):
+                return
+            if entry is None or entry['path'] != path:
+                logger.info(f"Price path for {host}: {path}")
+            self._entries[host] = {'path': path, 'checked_at': self.now().isoformat()}
+            try:
+                self._save()
+            except Exception as e:
+                logger.error(f"Failed to save host path memory: {e}")
@@ -0,0 +1,272 @@
+"""
+構造化データからの価格抽出
+JSON-LD（schema.org の Product / Offer）・microdata（itemprop="price"）・OpenGraph（og:price:amount）から
+価格と通貨を取得する。セレクターの探索より先に試す
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Union
+
+from playwright.async_api import Page
+
+logger = logging.getLogger(__name__)
+
+# 抽出元
+JSON_LD = 'json-ld'
+MICRODATA = 'microdata'
+OPENGRAPH = 'opengraph'
+
+# 価格・通貨・商品名を表す meta タグ（先にあるものを優先）
+PRICE_META = ('product:price:amount', 'og:price:amount')
+CURRENCY_META = ('product:price:currency', 'og:price:currency')
+NAME_META = ('og:title',)
+
+# 収集する itemprop
+ITEMPROPS = ('price', 'lowPrice', 'priceCurrency', 'name')
+
+OFFER_TYPES = {'Offer', 'AggregateOffer'}
+
+# ページ内で構造化データだけを集める（DOM全体は転送しない）
+STRUCTURED_DATA_JS = """
+([itemprops]) => {
+    const jsonLd = Array.from(
+        document.querySelectorAll('script[type="application/ld+json"]'),
+        (el) => el.textContent || ''
+    );
+
+    const meta = {};
+    for (const el of document.querySelectorAll('meta[property], meta[name]')) {
+        const key = (el.getAttribute('property') || el.getAttribute('name') || '').toLowerCase();
+        const content = el.getAttribute('content');
+        if (key && content && !(key in meta)) meta[key] = content;
+    }
+
+    const props = {};
+    for (const prop of itemprops) {
+        const el = document.querySelector(`[itemprop="${prop}"]`);
+        if (!el) continue;
+        const value = el.getAttribute('content') || (el.textContent || '').replace(/\\s+/g, ' ').trim();
+        if (value) props[prop] = value;
+    }
+
+    return {jsonLd, meta, itemprops: props};
+}
+"""
+
+
+@dataclass
+class StructuredPrice:
+    """構造化データから得た価格"""
+    price: float
+    currency: Optional[str]
+    name: Optional[str]
+    source: str
+
+
+@dataclass
+class StructuredData:
+    """ページの構造化データ（JSON-LDの本文・meta タグ・itemprop の最初の値）"""
+    json_ld: List[str] = field(default_factory=list)
+    meta: Dict[str, str] = field(default_factory=dict)
+    itemprops: Dict[str, str] = field(default_factory=dict)
+
+    def offer(self) -> Optional[StructuredPrice]:
+        """JSON-LD → microdata → OpenGraph の順で最初に見つかった価格"""
+        for text in self.json_ld:
+            offer = _json_ld_offer(text)
+            if offer:
+                return offer
+
+        price = to_amount(self.itemprops.get('price') or self.itemprops.get('lowPrice'))
+        if price:
+            return StructuredPrice(
+                price=price,
+                currency=_currency(self.itemprops.get('priceCurrency') or self._first_meta(CURRENCY_META)),
+                name=self.itemprops.get('name') or self._first_meta(NAME_META),
+                source=MICRODATA
+            )
+
+        price = to_amount(self._first_meta(PRICE_META))
+        if price:
+            return StructuredPrice(
+                price=price,
+                currency=_currency(self._first_meta(CURRENCY_META)),
+                name=self._first_meta(NAME_META),
+                source=OPENGRAPH
+            )
+        return None
+
+    def declared_currency(self) -> Optional[str]:
+        """価格がなくてもページが宣言している通貨（priceCurrency・og:price:currency）"""
+        return _currency(self.itemprops.get('priceCurrency') or self._first_meta(CURRENCY_META))
+
+    def _first_meta(self, keys) -> Optional[str]:
+        return next((self.meta[key] for key in keys if self.meta.get(key)), None)
+
+
+_THOUSANDS = re.compile(r"^\d{1,3}(,\d{3})+$")
+
+
+def to_amount(value: Union[str, int, float, None]) -> Optional[float]:
+    """schema.org の価格（数値または "1234.56" / "1,234.56" 形式の文字列）を数値化（0以下はNone）"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        amount = float(value)
+    else:
+        text = re.sub(r"[^\d.,]", '', str(value))
+        if ',' in text and ('.' in text or _THOUSANDS.match(text)):
+            text = text.replace(',', '')
+        else:
+            text = text.replace(',', '.')
+        try:
+            amount = float(text)
+        except ValueError:
+            return None
+    return amount if amount > 0 else None
+
+
+def _currency(value) -> Optional[str]:
+    code = str(value or '').strip().upper()
+    return code if re.fullmatch(r"[A-Z]{3}", code) else None
+
+
+def _types(node: Dict) -> List[str]:
+    value = node.get('@type') or []
+    return [str(item).rsplit('/', 1)[-1] for item in (value if isinstance(value, list) else [value])]
+
+
+def _nodes(data) -> Iterator[Dict]:
+    """JSON-LD の全ノードを文書順に列挙（@graph・入れ子を含む）"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from _nodes(value)
+
+
+def _offer_price(offer: Dict) -> Optional[float]:
+    price = to_amount(offer.get('price'))
+    if price is None and 'AggregateOffer' in _types(offer):
+        price = to_amount(offer.get('lowPrice'))
+    if price is None:
+        spec = offer.get('priceSpecification')
+        for item in spec if isinstance(spec, list) else [spec]:
+            if isinstance(item, dict):
+                price = to_amount(item.get('price'))
+                if price:
+                    break
+    return price
+
+
+def _json_ld_offer(text: str) -> Optional[StructuredPrice]:
+    try:
+        # CMSによってはコメントやCDATAで囲まれている
+        data = json.loads(re.sub(r"^\s*(<!--|<!\[CDATA\[)|(-->|\]\]>)\s*$", '', text))
+    except ValueError:
+        logger.debug("Skipping malformed JSON-LD block")
+        return None
+
+    names = {}
+    for node in _nodes(data):
+        if 'Product' in _types(node) and node.get('name'):
+            offers = node.get('offers')
+            for offer in offers if isinstance(offers, list) else [offers]:
+                if isinstance(offer, dict):
+                    names[id(offer)] = str(node['name'])
+
+    for node in _nodes(data):
+        if not OFFER_TYPES.intersection(_types(node)):
+            continue
+        price = _offer_price(node)
+        if price:
+            currency = node.get('priceCurrency')
+            if not currency and isinstance(node.get('priceSpecification'), dict):
+                currency = node['priceSpecification'].get('priceCurrency')
+            return StructuredPrice(price, _currency(currency), names.get(id(node)), JSON_LD)
+    return None
+
+
+class _StructuredDataParser(HTMLParser):
+    """HTMLから JSON-LD・meta タグ・itemprop を集める"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.data = StructuredData()
+        self._in_json_ld = False
+        self._json_chunks: List[str] = []
+        self._prop_chunks: List[str] = []
+        # テキストを集めている itemprop 要素（名前, タグ, 入れ子の深さ）
+        self._prop: Optional[List] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and (attrs.get('type') or '').lower() == 'application/ld+json':
+            self._in_json_ld = True
+            self._json_chunks = []
+        elif tag == 'meta':
+            key = (attrs.get('property') or attrs.get('name') or '').lower()
+            if key and attrs.get('content') and key not in self.data.meta:
+                self.data.meta[key] = attrs['content']
+
+        if self._prop and tag == self._prop[1]:
+            self._prop[2] += 1
+
+        prop = attrs.get('itemprop')
+        if prop in ITEMPROPS and prop not in self.data.itemprops:
+            if attrs.get('content'):
+                self.data.itemprops[prop] = attrs['content']
+            elif self._prop is None and tag not in ('meta', 'link'):
+                self._prop = [prop, tag, 1]
+                self._prop_chunks = []
+
+    def handle_endtag(self, tag):
+        if self._in_json_ld and tag == 'script':
+            self.data.json_ld.append(''.join(self._json_chunks))
+            self._in_json_ld = False
+        elif self._prop and tag == self._prop[1]:
+            self._prop[2] -= 1
+            if self._prop[2] == 0:
+                text = ' '.join(''.join(self._prop_chunks).split())
+                if text:
+                    self.data.itemprops[self._prop[0]] = text
+                self._prop = None
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self._json_chunks.append(data)
+        elif self._prop:
+            self._prop_chunks.append(data)
+
+
+def collect_structured_data(html: str) -> StructuredData:
+    """HTML文字列から構造化データを集める"""
+    parser = _StructuredDataParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logger.debug(f"Structured data parse error: {e}")
+    return parser.data
+
+
+def extract_structured_price(html: str) -> Optional[StructuredPrice]:
+    """HTML文字列から構造化データの価格を取得"""
+    return collect_structured_data(html).offer()
+
+
+async def extract_structured_data(page: Page) -> StructuredData:
+    """ページの構造化データを1往復で取得"""
+    data = await page.evaluate(STRUCTURED_DATA_JS, [list(ITEMPROPS)])
+    return StructuredData(
+        json_ld=data.get('jsonLd') or [],
+        meta=data.get('meta') or {},
+        itemprops=data.get('itemprops') or {}
+    )
@@ -0,0 +1,16 @@
+import pytest
+
+
+class FakeClock:
+    """テスト用の時計（now を進めて時間の経過を再現）"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
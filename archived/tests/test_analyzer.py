@@ -2,12 +2,19 @@ import pytest
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
+from src.analyzers.history_store import JSONHistoryStore, get_history_store
 from src.analyzers.price_analyzer import PriceAnalyzer, PriceAlert, PricePoint
-
-@pytest.fixture
-def analyzer(tmp_path):
-    """テスト用のアナライザーインスタンス"""
-    return PriceAnalyzer(data_dir=str(tmp_path))
+from src.analyzers.sqlite_history import SQLiteHistoryStore
+
+@pytest.fixture(params=["json", "sqlite"])
+def analyzer(request, tmp_path):
+    """テスト用のアナライザーインスタンス（JSON・SQLiteの両方のストア）"""
+    if request.param == "sqlite":
+        store = SQLiteHistoryStore(tmp_path / "price_history.db")
+        yield PriceAnalyzer(data_dir=str(tmp_path), store=store)
+        store.close()
+    else:
+        yield PriceAnalyzer(data_dir=str(tmp_path))
 
 def test_price_point_creation():
     """PricePointデータクラスのテスト"""
@@ -101,4 +108,65 @@ def test_alert_cooldown(analyzer):
     assert analyzer.should_send_alert("test_alert", cooldown_hours=1) is False
 
     # 別のタイプは送信可能
-    assert analyzer.should_send_alert("other_alert", cooldown_hours=1) is True
\ No newline at end of file
+    assert analyzer.should_send_alert("other_alert", cooldown_hours=1) is True
+
+def _point(product_name, price, timestamp):
+    return {"timestamp": timestamp, "price": price, "product_name": product_name, "source": "Test"}
+
+def test_extremes_and_window(analyzer):
+    """期間内の最安値・最高値・最初と最後の価格は時刻順で集計する"""
+    now = datetime.now()
+    for hours, price in [(200, 2500.0), (48, 3000.0), (10, 3100.0), (5, 2900.0), (1, 3050.0)]:
+        analyzer.store.add_point(_point("Gold Bar", price, (now - timedelta(hours=hours)).isoformat()))
+    analyzer.store.add_point(_point("Silver Bar", 30.0, (now - timedelta(hours=2)).isoformat()))
+
+    stats = analyzer.store.window("Gold Bar", after=(now - timedelta(days=7)).isoformat())
+    assert (stats.count, stats.first, stats.last, stats.min, stats.max) == (4, 3000.0, 3050.0, 2900.0, 3100.0)
+    assert analyzer.store.first_price("Gold Bar", before=(now - timedelta(hours=24)).isoformat()) == 2500.0
+    assert analyzer.store.window("Platinum Bar", after=(now - timedelta(days=7)).isoformat()) is None
+
+    assert analyzer.check_new_extremes("Gold Bar", 2800.0).type == "new_low"
+    assert analyzer.check_new_extremes("Gold Bar", 3200.0).type == "new_high"
+    assert analyzer.check_new_extremes("Gold Bar", 3000.0) is None
+
+def test_sqlite_window_uses_primary_key(tmp_path):
+    """期間の集計は (商品, 時刻) の主キーの範囲走査で行う"""
+    store = SQLiteHistoryStore(tmp_path / "price_history.db")
+    plan = " ".join(
+        row["detail"] for row in store._query(
+            "EXPLAIN QUERY PLAN SELECT MIN(price) FROM price_points WHERE product = ? AND ts > ?", ("x", "y")
+        )
+    )
+    assert "USING PRIMARY KEY (product=? AND ts>?)" in plan
+    assert store._query("PRAGMA journal_mode")[0][0] == "wal"
+    store.close()
+
+def test_sqlite_backend_imports_json_history(tmp_path, monkeypatch):
+    """PRICE_HISTORY_BACKEND=sqlite では、空のDBに既存の price_history.json を取り込む"""
+    timestamp = datetime.now().isoformat()
+    JSONHistoryStore(tmp_path / "price_history.json").save(
+        {"prices": [_point("Gold Bar", 3000.0, timestamp)], "alerts": []}
+    )
+    monkeypatch.setenv("PRICE_HISTORY_BACKEND", "sqlite")
+
+    analyzer = PriceAnalyzer(data_dir=str(tmp_path))
+    assert isinstance(analyzer.store, SQLiteHistoryStore)
+    assert analyzer.load_history()["prices"] == [_point("Gold Bar", 3000.0, timestamp)]
+
+    analyzer.add_price_point("Gold Bar", 3100.0)
+    analyzer.store.close()
+    reopened = get_history_store(tmp_path)
+    assert len(reopened.load()["prices"]) == 2
+    reopened.close()
+
+def test_sqlite_retention_covers_all_products(tmp_path):
+    """保持期間の削除は、取得しなくなった商品の古いポイントにも及ぶ"""
+    store = SQLiteHistoryStore(tmp_path / "price_history.db", prune_interval=0)
+    now = datetime.now()
+    old = (now - timedelta(days=40)).isoformat()
+    store.add_point(_point("Retired Coin", 100.0, old))
+    store.add_point(_point("Gold Bar", 3000.0, old))
+
+    store.add_point(_point("Gold Bar", 3100.0, now.isoformat()), retain_after=(now - timedelta(days=30)).isoformat())
+    assert [p["product_name"] for p in store.load()["prices"]] == ["Gold Bar"]
+    store.close()
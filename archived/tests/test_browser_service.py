@@ -0,0 +1,257 @@
+import asyncio
+import pytest
+from src.utils import browser_service as service_module
+from src.utils.browser_service import BrowserService
+from src.utils.page_pool import PagePool
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url):
+        pass
+
+    async def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.handlers = {}
+        self.closed = False
+        self.healthy = True
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        self.handlers['page'](page)
+        return page
+
+    async def cookies(self):
+        if not self.healthy:
+            raise RuntimeError("Target closed")
+        return []
+
+    async def close(self):
+        self.closed = True
+        self.handlers['close'](self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(service_module, 'async_playwright', lambda: fake)
+    monkeypatch.setattr(service_module, 'chromium_rss_mb', lambda: 0.0)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_browser_is_launched_once(playwright):
+    """複数回の貸し出しでもブラウザの起動は1回"""
+    service = BrowserService(contexts=2)
+
+    for _ in range(3):
+        async with service.page():
+            pass
+
+    assert len(playwright.browsers) == 1
+    assert len(playwright.browsers[0].contexts) == 2
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_pages_closed_on_return(playwright):
+    """返却時に開いたままのページは閉じる"""
+    service = BrowserService(contexts=1)
+
+    async with service.context() as context:
+        await context.new_page()
+        await context.new_page()
+
+    assert context.pages == []
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_context_recycled_after_max_pages(playwright):
+    """max_pages ページを開いたコンテキストは入れ替え"""
+    service = BrowserService(contexts=1, max_pages=2)
+
+    async with service.page():
+        pass
+    async with service.page() as page:
+        first = page.context
+
+    assert first.closed
+    async with service.page() as page:
+        assert page.context is not first
+    assert service.recycled == 1
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_context_recycled_over_memory_threshold(playwright, monkeypatch):
+    """ChromiumのRSSが閾値を超えたら返却されたコンテキストを入れ替え"""
+    service = BrowserService(contexts=1, max_rss_mb=500)
+
+    async with service.context() as context:
+        monkeypatch.setattr(service_module, 'chromium_rss_mb', lambda: 800.0)
+
+    assert context.closed
+    assert service.recycled == 1
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_pages_recycle_borrowed_context(playwright):
+    """ページプールで使い回すナビゲーションも数え、借りたままのコンテキストを入れ替える"""
+    service = BrowserService(contexts=1, max_pages=4)
+
+    async with service.context() as context:
+        pool = PagePool([context], 2, service=service)
+        await pool.open()
+        for _ in range(3):
+            async with pool.page():
+                pass
+
+        # 上限に達したコンテキストの全ページが戻った時点で入れ替え、ページを作り直す
+        assert context.closed
+        renewed = pool.contexts[0]
+        assert renewed is not context
+        assert len(renewed.pages) == 2
+        async with pool.page() as page:
+            assert page.context is renewed
+
+    assert service.recycled == 1
+    async with service.context() as returned:
+        assert returned is renewed
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_pages_check_memory(playwright, monkeypatch):
+    """ChromiumのRSSが閾値を超えたら返却を待たずに借りたままのコンテキストを入れ替える"""
+    service = BrowserService(contexts=1, max_rss_mb=500)
+
+    async with service.context() as context:
+        pool = PagePool([context], 1, service=service)
+        await pool.open()
+        monkeypatch.setattr(service_module, 'chromium_rss_mb', lambda: 800.0)
+        async with pool.page():
+            pass
+        assert context.closed
+        assert pool.renewed == 1
+
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_context_replaced(playwright):
+    """ヘルスチェックに失敗したコンテキストは貸し出し前に作り直す"""
+    service = BrowserService(contexts=1)
+    await service.start()
+    broken = playwright.browsers[0].contexts[0]
+    broken.healthy = False
+
+    async with service.context() as context:
+        assert context is not broken
+    assert broken.closed
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_relaunch_after_disconnect(playwright):
+    """ブラウザが落ちていれば次の貸し出しで起動し直す"""
+    service = BrowserService(contexts=1)
+    await service.start()
+    playwright.browsers[0].connected = False
+
+    async with service.context() as context:
+        assert context in playwright.browsers[1].contexts
+    assert service.launches == 2
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_scraper_borrows_and_returns_contexts(playwright, tmp_path):
+    """スクレイパーはコンテキストを借りて返却し、ブラウザは閉じない"""
+    from src.coin_scraper import CoinPriceScraper
+
+    service = BrowserService(contexts=1)
+    scraper = CoinPriceScraper(max_pages=2, contexts=2, browser_service=service)
+
+    await scraper._ensure_browser()
+    assert len(scraper.contexts) == 1
+    await scraper.cleanup()
+
+    assert service.started
+    assert service.stats()['idle'] == 1
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_pages_survive_failed_renew(playwright, monkeypatch):
+    """コンテキストの入れ替えに失敗してもページ数は減らない"""
+    service = BrowserService(contexts=2, max_pages=2)
+
+    async def broken_renew(context):
+        raise RuntimeError("Browser closed")
+
+    async with service.context() as first, service.context() as second:
+        pool = PagePool([first, second], 2, service=service)
+        await pool.open()
+        monkeypatch.setattr(service, 'renew', broken_renew)
+        for _ in range(20):
+            page = await asyncio.wait_for(pool._idle.get(), 1)
+            await pool._idle.put(page)
+            async with pool.page():
+                pass
+
+        assert pool.renewed == 0
+        assert pool._missing == 0
+
+    await service.close()
@@ -0,0 +1,175 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from src.scrapers.bullionstar import BullionStarScraper
+from src.utils.deadline import Budget
+from src.utils.price_cache import PriceCache
+from src.utils.rate_limiter import AdaptiveRateLimiter
+
+
+def _mock_response(status=200, data=None):
+    """session.get() が返す非同期コンテキストマネージャーのモック"""
+    response = MagicMock()
+    response.status = status
+    response.headers = {}
+    response.json = AsyncMock(return_value=data)
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return context
+
+
+def _products(count):
+    return {
+        f"product-{i}": {"id": 1000 + i, "url": f"https://example.com/{i}", "name": f"Product {i}"}
+        for i in range(count)
+    }
+
+
+@pytest.mark.asyncio
+async def test_scrape_prices_batches_product_ids(monkeypatch):
+    """商品IDをバッチサイズごとにまとめて取得"""
+    scraper = BullionStarScraper(batch_size=2)
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    monkeypatch.setattr(scraper, "load_products", lambda: _products(5))
+
+    def fake_get(url, params):
+        ids = params["productIds"].split(",")
+        return _mock_response(data={
+            "products": [{"productId": int(i), "price": f"S${i},000.50"} for i in ids]
+        })
+
+    scraper.session = MagicMock()
+    scraper.session.get = MagicMock(side_effect=fake_get)
+
+    results = await scraper.scrape_prices()
+
+    assert scraper.session.get.call_count == 3
+    batches = sorted(call.kwargs["params"]["productIds"] for call in scraper.session.get.call_args_list)
+    assert batches == ["1000,1001", "1002,1003", "1004"]
+    assert len(results) == 5
+    assert results["product-3"]["price"] == 1003000.50
+
+
+def test_map_prices_by_position_without_ids():
+    """IDのないレスポンスはリクエスト順で対応付け"""
+    scraper = BullionStarScraper()
+    data = {"products": [{"price": "¥123,456"}, {"lowestPrice": "¥7,890"}]}
+
+    assert scraper._map_prices(data, [628, 629]) == {"628": 123456.0, "629": 7890.0}
+
+
+def test_map_prices_skips_unknown_entries():
+    """対応付けできない要素は無視"""
+    scraper = BullionStarScraper()
+    data = {"products": [{"price": "S$1.00"}]}
+
+    assert scraper._map_prices(data, [1, 2]) == {}
+    assert scraper._map_prices({}, [1]) == {}
+
+
+@pytest.mark.asyncio
+async def testfetch_prices_skips_cached_ids():
+    """キャッシュ済みの商品IDはAPIに問い合わせない"""
+    scraper = BullionStarScraper()
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    scraper.cache.set(PriceCache.key(1, "JPY"), 100.0)
+    scraper.session = MagicMock()
+    scraper.session.get = MagicMock(return_value=_mock_response(data={
+        "products": [{"productId": 2, "price": "¥200"}]
+    }))
+
+    prices = await scraper.fetch_prices([1, 2], "JPY")
+
+    assert prices == {"1": 100.0, "2": 200.0}
+    assert scraper.session.get.call_args.kwargs["params"]["productIds"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_hung_batch_is_flagged_missing(monkeypatch):
+    """応答しないバッチは予算切れで打ち切り、その商品を missing に残す"""
+    scraper = BullionStarScraper(batch_size=1)
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    monkeypatch.setattr(scraper, "load_products", lambda: _products(2))
+
+    async def fetch_batch(product_ids, currency):
+        if product_ids == ["1001"]:
+            await asyncio.sleep(5)
+        return {"1000": 1234.0}
+
+    monkeypatch.setattr(scraper, "_fetch_batch", fetch_batch)
+
+    results = await scraper.scrape_prices(Budget(0.2))
+
+    assert list(results) == ["product-0"]
+    assert scraper.missing == ["product-1"]
+
+
+@pytest.mark.asyncio
+async def test_scrape_prices_all_currencies_in_one_pass(monkeypatch):
+    """全通貨を並行取得し、1つの観測時刻で主通貨と通貨別価格を返す"""
+    scraper = BullionStarScraper(batch_size=10, currencies=["JPY", "SGD"])
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    monkeypatch.setattr(scraper, "load_products", lambda: _products(2))
+
+    async def fetch_batch(product_ids, currency):
+        if currency == "SGD":
+            return {"1000": 2600.0}
+        return {"1000": 412345.0, "1001": 7000.0}
+
+    monkeypatch.setattr(scraper, "_fetch_batch", fetch_batch)
+
+    results = await scraper.scrape_prices()
+
+    assert results["product-0"]["price"] == 412345.0
+    assert results["product-0"]["currency"] == "JPY"
+    assert results["product-0"]["prices"] == {"JPY": 412345.0, "SGD": 2600.0}
+    assert results["product-1"]["prices"] == {"JPY": 7000.0}
+    assert results["product-0"]["timestamp"] == results["product-1"]["timestamp"]
+
+
+@pytest.mark.asyncio
+async def test_missing_primary_currency_is_missing(monkeypatch):
+    """主通貨の価格が取れない商品は他通貨があっても missing"""
+    scraper = BullionStarScraper(currencies=["JPY", "SGD"])
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    monkeypatch.setattr(scraper, "load_products", lambda: _products(1))
+
+    async def fetch_batch(product_ids, currency):
+        if currency == "JPY":
+            raise RuntimeError("HTTP 503")
+        return {"1000": 2600.0}
+
+    monkeypatch.setattr(scraper, "_fetch_batch", fetch_batch)
+
+    results = await scraper.scrape_prices()
+
+    assert results == {}
+    assert scraper.missing == ["product-0"]
+
+
+@pytest.mark.asyncio
+async def test_products_without_id_are_skipped(monkeypatch):
+    """商品IDのない商品（他サイト）はバッチに含めず missing に残す"""
+    scraper = BullionStarScraper(currencies=["SGD"])
+    scraper.fx = None
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.cache = PriceCache()
+    products = _products(2)
+    products["dealer"] = {"url": "https://dealer.example/coin", "name": "Dealer"}
+    monkeypatch.setattr(scraper, "load_products", lambda: products)
+    scraper.session = MagicMock()
+    scraper.session.get = MagicMock(return_value=_mock_response(data={
+        "products": [{"productId": 1000, "price": "S$10.00"}, {"productId": 1001, "price": "S$11.00"}]
+    }))
+
+    results = await scraper.scrape_prices()
+
+    assert set(results) == {"product-0", "product-1"}
+    assert scraper.missing == ["dealer"]
+    assert scraper.session.get.call_args.kwargs["params"]["productIds"] == "1000,1001"
@@ -0,0 +1,186 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from src.coin_scraper import CoinPriceScraper
+from src.utils.deadline import Budget
+from src.utils.discovery_index import ProductDiscoveryIndex
+from src.utils.fx import FxRates, RateSnapshot
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.static_fetch import BROWSER, STATIC, HostPathMemory
+
+
+class FakePagePool:
+    @asynccontextmanager
+    async def page(self):
+        yield MagicMock()
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    scraper = CoinPriceScraper()
+    scraper.discovery = ProductDiscoveryIndex(tmp_path / "product_ids.json")
+    scraper.currencies = ["JPY"]
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.api.session = MagicMock()
+    scraper.api.fetch_prices = AsyncMock(return_value={})
+    scraper._ensure_browser = AsyncMock()
+    scraper.page_pool = FakePagePool()
+    scraper.scrape_price = AsyncMock(return_value=None)
+    scraper.static_first = False
+    scraper.host_paths = HostPathMemory(tmp_path / "host_paths.json")
+    return scraper
+
+
+PRODUCTS = {
+    "gold": {"id": 628, "url": "https://www.bullionstar.com/buy/product/gold", "name": "Gold"},
+    "silver": {"id": 630, "url": "https://www.bullionstar.com/buy/product/silver", "name": "Silver"},
+    "no-id": {"url": "https://www.bullionstar.com/buy/product/other", "name": "Other"},
+    "apmex": {"id": 1, "url": "https://www.apmex.com/product/1", "name": "Eagle"},
+}
+
+
+@pytest.mark.asyncio
+async def test_api_products_skip_browser(scraper):
+    """APIで全商品が取れればブラウザを起動しない"""
+    scraper.api.fetch_prices.return_value = {"628": 500000.0, "630": 7000.0}
+    products = {key: PRODUCTS[key] for key in ("gold", "silver")}
+
+    results = await scraper.scrape_multiple(products)
+
+    assert {key: r["price"] for key, r in results.items()} == {"gold": 500000.0, "silver": 7000.0}
+    assert scraper.routes == {"gold": "api", "silver": "api"}
+    scraper.api.fetch_prices.assert_awaited_once_with(["628", "630"], "JPY")
+    scraper._ensure_browser.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_all_currencies_share_one_observation(scraper):
+    """全通貨を1回の取得で集め、API・ブラウザの結果とも同じ観測時刻にする"""
+    scraper.currencies = ["JPY", "SGD"]
+
+    async def fetch_prices(product_ids, currency):
+        return {"628": 500000.0} if currency == "JPY" else {"628": 4300.0}
+
+    async def browser(url, selectors=None, page=None, slot=None):
+        return {"url": url, "name": "x", "price": 1.0, "currency": "USD", "timestamp": "later"}
+
+    scraper.api.fetch_prices = AsyncMock(side_effect=fetch_prices)
+    scraper.scrape_price = AsyncMock(side_effect=browser)
+
+    results = await scraper.scrape_multiple({key: PRODUCTS[key] for key in ("gold", "apmex")})
+
+    assert results["gold"]["prices"] == {"JPY": 500000.0, "SGD": 4300.0}
+    assert results["gold"]["currency"] == "JPY"
+    assert results["gold"]["timestamp"] == results["apmex"]["timestamp"] == scraper.observed_at
+
+
+@pytest.mark.asyncio
+async def test_fx_derives_secondary_currencies(scraper):
+    """為替レートがあれば主通貨だけを取得し、他の通貨は換算"""
+    class Source:
+        async def fetch(self):
+            return RateSnapshot(base="USD", rates={"JPY": 150.0, "USD": 1.0})
+
+    scraper.currencies = ["JPY", "USD"]
+    scraper.fx = FxRates(Source())
+    scraper.api.fetch_prices.return_value = {"628": 450000.0}
+
+    results = await scraper.scrape_multiple({"gold": PRODUCTS["gold"]})
+
+    scraper.api.fetch_prices.assert_awaited_once_with(["628"], "JPY")
+    assert results["gold"]["prices"] == {"JPY": 450000.0, "USD": 3000.0}
+    assert results["gold"]["price_origin"] == {"JPY": "native", "USD": "derived"}
+
+
+@pytest.mark.asyncio
+async def test_unknown_id_and_api_miss_fall_back_to_browser(scraper):
+    """IDが不明な商品・API対象外のサイト・APIで取れなかった商品はブラウザで取得"""
+    scraper.api.fetch_prices.return_value = {"628": 500000.0}
+
+    async def browser(url, selectors=None, page=None, slot=None):
+        return {"url": url, "name": "x", "price": 1.0, "currency": "USD"}
+
+    scraper.scrape_price = AsyncMock(side_effect=browser)
+
+    results = await scraper.scrape_multiple(PRODUCTS)
+
+    assert len(results) == 4
+    assert scraper.routes == {"gold": "api", "silver": "browser", "no-id": "browser", "apmex": "browser"}
+    assert results["silver"]["source"] == "browser"
+    scraper._ensure_browser.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_api_failure_falls_back_to_browser(scraper):
+    """APIエラー時はブラウザにフォールバック"""
+    scraper.api.fetch_prices.side_effect = RuntimeError("HTTP 503")
+
+    results = await scraper.scrape_multiple({"gold": PRODUCTS["gold"]})
+
+    assert results == {}
+    scraper.scrape_price.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_discovery_index_supplies_missing_id(scraper):
+    """商品情報にIDがなくても検出インデックスにあればAPIで取得"""
+    scraper.discovery.record(PRODUCTS["no-id"]["url"], 777, "Other")
+    scraper.api.fetch_prices.return_value = {"777": 1234.0}
+
+    results = await scraper.scrape_multiple({"no-id": PRODUCTS["no-id"]})
+
+    assert results["no-id"]["source"] == "api"
+    scraper._ensure_browser.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cycle_budget_returns_partial_results(scraper):
+    """サイクルの予算を使い切ったら取得済みの分だけ返し、残りを missing に記録"""
+    scraper.api.fetch_prices.return_value = {"628": 500000.0}
+
+    async def browser(url, selectors=None, page=None, slot=None):
+        await asyncio.sleep(5)
+
+    scraper.scrape_price = AsyncMock(side_effect=browser)
+
+    results = await scraper.scrape_multiple(
+        {key: PRODUCTS[key] for key in ("gold", "apmex")},
+        budget=Budget(0.2)
+    )
+
+    assert list(results) == ["gold"]
+    assert scraper.missing == ["apmex"]
+
+
+@pytest.mark.asyncio
+async def test_static_path_skips_browser_and_remembers_host(scraper):
+    """静的HTMLで取れたホストはブラウザを使わず、取れなかったホストは browser と記録"""
+    scraper.static_first = True
+    products = {
+        "apmex": PRODUCTS["apmex"],
+        "spa": {"url": "https://spa.example.com/coin", "name": "SPA"},
+    }
+
+    async def static(url, selectors=None):
+        if "apmex" in url:
+            return {"url": url, "name": "x", "price": 30.0, "currency": "USD", "timestamp": "t"}
+        return None
+
+    async def browser(url, selectors=None, page=None, slot=None):
+        return {"url": url, "name": "x", "price": 2.0, "currency": "USD"}
+
+    scraper.scrape_static = AsyncMock(side_effect=static)
+    scraper.scrape_price = AsyncMock(side_effect=browser)
+
+    results = await scraper.scrape_multiple(products)
+
+    assert scraper.routes == {"apmex": "static", "spa": "browser"}
+    assert results["apmex"]["name"] == "Eagle"
+    assert scraper.host_paths.path_for(PRODUCTS["apmex"]["url"]) == STATIC
+    assert scraper.host_paths.path_for("https://spa.example.com/other") == BROWSER
+
+    # 次のサイクルでは browser のホストに静的取得を試さない
+    scraper.scrape_static.reset_mock()
+    await scraper.scrape_multiple(products)
+    assert [call.args[0] for call in scraper.scrape_static.await_args_list] == [PRODUCTS["apmex"]["url"]]
@@ -0,0 +1,16 @@
+from src.config import get_currencies
+
+
+def test_currencies_default_to_currency(monkeypatch):
+    """CURRENCIES 未設定なら CURRENCY のみ"""
+    monkeypatch.delenv("CURRENCIES", raising=False)
+    monkeypatch.setenv("CURRENCY", "sgd")
+
+    assert get_currencies() == ["SGD"]
+
+
+def test_currencies_parsed_in_order(monkeypatch):
+    """カンマ区切りを順序どおりに正規化し、重複は除く"""
+    monkeypatch.setenv("CURRENCIES", " jpy, SGD,,usd,JPY ")
+
+    assert get_currencies() == ["JPY", "SGD", "USD"]
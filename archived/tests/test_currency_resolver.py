@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.utils.currency_resolver import (
+    CurrencyContext, cookie_currency, explicit_currency, html_currency_context, locale_currency,
+    resolve_currency, resolve_page_currency
+)
+
+
+def test_explicit_marker_on_price_wins():
+    context = CurrencyContext(texts=["€ 1.234,50", "¥ banner elsewhere"], declared="USD")
+    assert resolve_currency(context) == "EUR"
+
+
+def test_mixed_currency_page_uses_price_node_not_page_order():
+    """ページの他の場所に ¥ があっても、価格要素が S$ なら SGD"""
+    context = CurrencyContext(texts=["S$ 3,120.00", "Price S$ 3,120.00 (approx ¥ 340,000)"])
+    assert resolve_currency(context) == "SGD"
+
+
+def test_bare_dollar_uses_nearby_label_or_site_currency():
+    assert resolve_currency(CurrencyContext(texts=["$45.10", "Prices in SGD"])) == "SGD"
+    assert resolve_currency(CurrencyContext(texts=["$45.10"], cookie="session=x; shop_currency=AUD")) == "AUD"
+    # ドル建てでないサイト通貨は '$' に当てはめない
+    assert resolve_currency(CurrencyContext(texts=["$45.10"], lang="ja-JP")) == "USD"
+
+
+def test_number_without_marker_falls_back_to_metadata():
+    assert resolve_currency(CurrencyContext(texts=["245,300"], declared="jpy")) == "JPY"
+    assert resolve_currency(CurrencyContext(texts=["245,300"], lang="ja")) == "JPY"
+    assert resolve_currency(CurrencyContext(texts=["245,300"]), default="GBP") == "GBP"
+
+
+def test_helpers():
+    assert explicit_currency("$5") is None
+    assert explicit_currency("5 SGD") == "SGD"
+    assert cookie_currency("a=1; currency=eur; b=2") == "EUR"
+    assert cookie_currency("a=1") is None
+    assert locale_currency("en_SG") == "SGD"
+    assert locale_currency("de-AT") == "EUR"
+    assert locale_currency(None) is None
+
+
+def test_html_context_reads_lang():
+    context = html_currency_context('<!doctype html><html class="x" lang="en-GB"><body>', "1,000")
+    assert context.lang == "en-GB"
+    assert resolve_currency(context) == "GBP"
+
+
+@pytest.mark.asyncio
+async def test_page_resolution_is_one_small_evaluate():
+    """ページ全体の HTML は取得しない"""
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={
+        "texts": ["$1,999.00", ""], "declared": None, "cookie": "currency=SGD", "lang": "en"
+    })
+    page.content = AsyncMock()
+
+    assert await resolve_page_currency(page, [".price"]) == "SGD"
+    page.evaluate.assert_awaited_once()
+    page.content.assert_not_awaited()
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from src.utils.deadline import Budget, BudgetExceeded, gather_within
+
+
+def test_budget_remaining_and_child(clock):
+    """子予算は親の残り時間を超えない"""
+    budget = Budget(10, clock)
+    clock.now += 7
+
+    assert budget.remaining() == pytest.approx(3)
+    assert budget.timeout(5) == pytest.approx(3)
+    assert budget.child(1).remaining() == pytest.approx(1)
+    assert budget.child(60).remaining() == pytest.approx(3)
+
+    clock.now += 5
+    assert budget.expired
+    assert budget.remaining() == 0
+
+
+def test_unlimited_budget():
+    budget = Budget()
+
+    assert budget.remaining() is None
+    assert budget.timeout(5) == 5
+    assert not budget.expired
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("CYCLE_BUDGET", "120")
+    assert Budget.from_env("CYCLE_BUDGET", 600).seconds == 120
+
+    monkeypatch.delenv("CYCLE_BUDGET")
+    assert Budget.from_env("CYCLE_BUDGET", 600).seconds == 600
+
+
+@pytest.mark.asyncio
+async def test_run_raises_when_exhausted():
+    """予算内に終わらない処理は BudgetExceeded（asyncio.TimeoutError の一種）"""
+    with pytest.raises(BudgetExceeded):
+        await Budget(0.05).run(asyncio.sleep(1))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await Budget(10).run(asyncio.sleep(1), cap=0.05)
+
+    assert await Budget(1).run(asyncio.sleep(0, result="ok")) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_gather_within_returns_partial_results():
+    """期限までに終わった結果だけを返し、残りは取り消す"""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    results, pending = await gather_within(Budget(0.1), {
+        "fast": asyncio.sleep(0, result=1),
+        "slow": slow(),
+        "failing": failing()
+    })
+
+    assert results == {"fast": 1}
+    assert list(pending) == ["slow"]
+    assert cancelled == ["slow"]
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timedelta
+from src.utils.discovery_index import ProductDiscoveryIndex
+
+
+def _age(index, url, days):
+    """エントリの検証日時を過去にずらす"""
+    entry = index._entries[index.canonical_url(url)]
+    entry['validated_at'] = (datetime.now() - timedelta(days=days)).isoformat()
+
+
+def test_canonical_url():
+    """ホストの大文字小文字・クエリ・末尾スラッシュの違いは同じURLとみなす"""
+    canonical = ProductDiscoveryIndex.canonical_url
+    expected = "https://www.bullionstar.com/buy/product/gold-maple-1oz"
+
+    assert canonical("https://WWW.BullionStar.com/buy/product/gold-maple-1oz/") == expected
+    assert canonical("https://www.bullionstar.com/buy/product/gold-maple-1oz?currency=JPY#top") == expected
+
+
+def test_record_and_lookup_persist(tmp_path):
+    """記録した商品IDはファイル経由で次回も使える"""
+    path = tmp_path / "product_ids.json"
+    index = ProductDiscoveryIndex(path)
+    index.record("https://www.bullionstar.com/buy/product/x", "628", "Gold Maple")
+
+    reloaded = ProductDiscoveryIndex(path)
+    entry = reloaded.lookup("https://www.bullionstar.com/buy/product/x/")
+
+    assert entry["product_id"] == 628
+    assert entry["name"] == "Gold Maple"
+    assert "https://www.bullionstar.com/buy/product/x" in json.loads(path.read_text())
+
+
+def test_revalidation_and_expiry(tmp_path):
+    """再検証期限と有効期限"""
+    index = ProductDiscoveryIndex(
+        tmp_path / "ids.json", revalidate_after=timedelta(days=7), expire_after=timedelta(days=30)
+    )
+    url = "https://www.bullionstar.com/buy/product/x"
+    index.record(url, 628)
+    assert not index.needs_revalidation(index.lookup(url))
+
+    _age(index, url, 10)
+    assert index.needs_revalidation(index.lookup(url))
+
+    index.mark_validated(url)
+    assert not index.needs_revalidation(index.lookup(url))
+
+    _age(index, url, 31)
+    assert index.lookup(url) is None
+
+
+def test_forget(tmp_path):
+    index = ProductDiscoveryIndex(tmp_path / "ids.json")
+    index.record("https://example.com/a", 1)
+    index.forget("https://example.com/a")
+
+    assert index.lookup("https://example.com/a") is None
+    assert len(ProductDiscoveryIndex(tmp_path / "ids.json")) == 0
+
+
+def test_concurrent_writers_merge(tmp_path):
+    """別々のプロセス（インスタンス）の登録・削除は互いのエントリを消さない"""
+    path = tmp_path / "product_ids.json"
+    web_app = ProductDiscoveryIndex(path)
+    scraper = ProductDiscoveryIndex(path)
+
+    web_app.record("https://www.bullionstar.com/buy/product/a", "1", "A")
+    scraper.record("https://www.bullionstar.com/buy/product/b", "2", "B")
+    web_app.forget("https://www.bullionstar.com/buy/product/a")
+    web_app.record("https://www.bullionstar.com/buy/product/c", "3", "C")
+
+    saved = json.loads(path.read_text())
+    assert sorted(entry["product_id"] for entry in saved.values()) == [2, 3]
+
+    # 他のインスタンスが登録したエントリも見つかる
+    assert scraper.lookup("https://www.bullionstar.com/buy/product/c")["product_id"] == 3
@@ -0,0 +1,144 @@
+import pytest
+from aiohttp import web
+from pathlib import Path
+from src.notifiers.email_notifier import EmailNotifier
+from src.utils.fx import (
+    DERIVED, NATIVE, FileRateSource, FxRates, HttpRateSource, RateSnapshot,
+    apply_fx, derive_prices, rate_source_from
+)
+
+RATES_FILE = Path(__file__).parent / "fixtures" / "fx_rates.json"
+
+
+class CountingSource:
+    def __init__(self, snapshot=None, error=None):
+        self.snapshot = snapshot
+        self.error = error
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.snapshot
+
+
+SNAPSHOT = RateSnapshot(base="USD", rates={"USD": 1.0, "JPY": 150.0, "SGD": 1.35}, timestamp="t0")
+
+
+def test_cross_rates():
+    assert SNAPSHOT.cross("USD", "JPY") == 150.0
+    assert SNAPSHOT.cross("SGD", "JPY") == pytest.approx(150.0 / 1.35)
+    assert SNAPSHOT.cross("JPY", "JPY") == 1.0
+    assert SNAPSHOT.cross("USD", "CHF") is None
+
+
+def test_derive_prices_marks_native_and_derived():
+    """取得した通貨は native、足りない通貨は換算して derived"""
+    results = {
+        "gold": {"price": 450000.0, "currency": "JPY", "prices": {"JPY": 450000.0, "SGD": 4000.0}},
+        "eagle": {"price": 30.0, "currency": "USD"},
+    }
+
+    derived = derive_prices(results, ["JPY", "SGD", "USD"], SNAPSHOT)
+
+    assert derived == 3
+    # 取得済みのSGDは換算値で上書きしない
+    assert results["gold"]["prices"] == {"JPY": 450000.0, "SGD": 4000.0, "USD": 3000.0}
+    assert results["gold"]["price_origin"] == {"JPY": NATIVE, "SGD": NATIVE, "USD": DERIVED}
+    assert results["eagle"]["prices"] == {"USD": 30.0, "JPY": 4500, "SGD": 40.5}
+    assert results["eagle"]["price_origin"]["USD"] == NATIVE
+    assert results["eagle"]["fx_timestamp"] == "t0"
+
+
+def test_unknown_currency_left_out():
+    results = {"x": {"price": 10.0, "currency": "CHF"}}
+
+    assert derive_prices(results, ["JPY"], SNAPSHOT) == 0
+    assert results["x"]["prices"] == {"CHF": 10.0}
+    assert "fx_timestamp" not in results["x"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_cached_for_ttl(clock):
+    """TTLの間は取得元に問い合わせない"""
+    source = CountingSource(SNAPSHOT)
+    fx = FxRates(source, ttl=60, clock=clock)
+
+    await fx.snapshot()
+    clock.now = 59
+    await fx.snapshot()
+    assert source.calls == 1
+
+    clock.now = 61
+    await fx.snapshot()
+    assert source.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_kept_on_failure(clock):
+    """再取得に失敗したら直前のスナップショットを使い続ける"""
+    source = CountingSource(SNAPSHOT)
+    fx = FxRates(source, ttl=60, clock=clock)
+    await fx.snapshot()
+
+    source.error = RuntimeError("HTTP 503")
+    clock.now = 120
+
+    assert await fx.snapshot() is SNAPSHOT
+
+
+@pytest.mark.asyncio
+async def test_file_source():
+    snapshot = await FileRateSource(RATES_FILE).fetch()
+
+    assert snapshot.base == "USD"
+    assert snapshot.rates["USD"] == 1.0
+    assert snapshot.cross("USD", "SGD") == 1.35
+    assert isinstance(rate_source_from(str(RATES_FILE)), FileRateSource)
+    assert rate_source_from("") is None
+
+
+@pytest.mark.asyncio
+async def test_http_source_against_stand_in_server():
+    """スタンドインサーバーから取得し、apply_fx で換算する"""
+    async def rates(request):
+        return web.json_response({"base_code": "SGD", "conversion_rates": {"JPY": 111.0, "USD": 0.74}})
+
+    app = web.Application()
+    app.router.add_get("/rates", rates)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        source = rate_source_from(f"http://127.0.0.1:{port}/rates")
+        assert isinstance(source, HttpRateSource)
+
+        results = {"bar": {"price": 100.0, "currency": "SGD"}}
+        derived = await apply_fx(FxRates(source), results, ["SGD", "JPY"])
+    finally:
+        await runner.cleanup()
+
+    assert derived == 1
+    assert results["bar"]["prices"] == {"SGD": 100.0, "JPY": 11100}
+
+
+def test_email_shows_currencies_side_by_side(monkeypatch):
+    """メールは通貨を列に並べ、換算値に印を付ける"""
+    monkeypatch.setenv("CURRENCIES", "JPY,SGD")
+    notifier = EmailNotifier("from@example.com", "password")
+    prices = {"gold": {
+        "name": "Gold Maple", "price": 450000.0, "currency": "JPY",
+        "prices": {"JPY": 450000.0, "SGD": 4050.0},
+        "price_origin": {"JPY": NATIVE, "SGD": DERIVED},
+        "timestamp": "2024-06-01T09:30:00"
+    }}
+
+    body = notifier._create_alert_body(prices)
+
+    assert "価格 (JPY)" in body and "価格 (SGD)" in body
+    assert "¥450,000" in body
+    assert "S$4,050.00 *" in body
+    assert "09:30:00" in body
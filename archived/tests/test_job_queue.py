@@ -0,0 +1,198 @@
+import asyncio
+import time
+import pytest
+from src.jobs.base import DEAD, DONE, QUEUED
+from src.jobs.scrape import ScrapeJobWorker, enqueue_products, scrape_via_queue, wait_for_batch
+from src.jobs.sqlite_queue import SQLiteJobQueue
+from src.utils.deadline import Budget
+
+
+class FakeScraper:
+    """'fail' を含むURL以外は価格を返す"""
+
+    def __init__(self):
+        self.calls = []
+        self.cleaned = False
+
+    async def scrape_multiple(self, products, budget=None):
+        self.calls.append(dict(products))
+        return {
+            key: {"name": info["name"], "price": 100.0, "currency": "JPY"}
+            for key, info in products.items()
+            if "fail" not in info["url"]
+        }
+
+    async def cleanup(self):
+        self.cleaned = True
+
+
+class HungScraper(FakeScraper):
+    """予算を無視して応答しない"""
+
+    async def scrape_multiple(self, products, budget=None):
+        self.calls.append(budget)
+        await asyncio.sleep(60)
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = SQLiteJobQueue(tmp_path / "jobs.db", clock=clock)
+    yield queue
+    queue.close()
+
+
+def test_claimed_jobs_hidden_until_lease_expires(queue, clock):
+    """リース中のジョブは他のワーカーから見えず、期限切れで再取得できる"""
+    queue.enqueue("b1", {"gold": {"url": "u"}, "silver": {"url": "v"}})
+
+    first = queue.claim("w1", limit=1, lease_seconds=60)
+    assert [job.key for job in first] == ["gold"]
+    assert [job.key for job in queue.claim("w2", limit=5, lease_seconds=60)] == ["silver"]
+    assert queue.claim("w3", limit=5) == []
+
+    clock.now += 61
+    reclaimed = queue.claim("w3", limit=5)
+    assert sorted(job.key for job in reclaimed) == ["gold", "silver"]
+    assert reclaimed[0].attempts == 2
+    # 元のワーカーはリースを失っている
+    assert queue.ack("w1", first[0].id, {"price": 1}) is False
+
+
+def test_heartbeat_extends_lease(queue, clock):
+    queue.enqueue("b1", {"gold": {}})
+    job = queue.claim("w1", lease_seconds=60)[0]
+
+    clock.now += 50
+    assert queue.heartbeat("w1", [job.id], lease_seconds=60) == [job.id]
+    clock.now += 50
+    assert queue.claim("w2") == []
+    assert queue.heartbeat("w2", [job.id]) == []
+
+
+def test_ack_stores_result(queue):
+    queue.enqueue("b1", {"gold": {}})
+    job = queue.claim("w1")[0]
+
+    assert queue.ack("w1", job.id, {"price": 123.0})
+    assert queue.batch_status("b1") == {DONE: 1}
+    assert queue.results("b1") == {"gold": {"price": 123.0}}
+    assert queue.pending("b1") == 0
+
+
+def test_nack_retries_then_dead_letters(queue, clock):
+    """失敗は待ち時間後に再試行し、試行回数を使い切ると dead letter"""
+    queue.enqueue("b1", {"gold": {"url": "u"}}, max_attempts=2)
+
+    job = queue.claim("w1")[0]
+    assert queue.nack("w1", job.id, "no price", retry_delay=30) is True
+    assert queue.claim("w1") == []
+    clock.now += 31
+
+    job = queue.claim("w1")[0]
+    assert job.attempts == 2
+    assert queue.nack("w1", job.id, "no price") is False
+    assert queue.batch_status("b1") == {DEAD: 1}
+    dead = queue.dead_letters("b1")
+    assert dead[0]["key"] == "gold"
+    assert dead[0]["payload"] == {"url": "u"}
+    assert dead[0]["attempts"] == 2
+
+
+def test_expired_final_lease_dead_letters(queue, clock):
+    """最後の試行でワーカーが落ちた場合もリース切れで dead letter"""
+    queue.enqueue("b1", {"gold": {}}, max_attempts=1)
+    queue.claim("w1", lease_seconds=10)
+
+    clock.now += 11
+    assert queue.claim("w2") == []
+    assert queue.dead_letters()[0]["error"].startswith("lease expired")
+
+
+def test_cancel_only_queued(queue):
+    queue.enqueue("b1", {"gold": {}, "silver": {}})
+    queue.claim("w1")
+
+    assert queue.cancel("b1") == 1
+    assert queue.claim("w2") == []
+    assert queue.pending("b1") == 1
+
+
+def test_two_connections_share_queue(tmp_path):
+    """別プロセス相当の2つの接続でジョブを重複取得しない"""
+    first = SQLiteJobQueue(tmp_path / "jobs.db")
+    second = SQLiteJobQueue(tmp_path / "jobs.db")
+    first.enqueue("b1", {f"p{i}": {} for i in range(10)})
+
+    claimed = [job.key for job in first.claim("w1", limit=6)] + [job.key for job in second.claim("w2", limit=6)]
+
+    assert sorted(claimed) == sorted(f"p{i}" for i in range(10))
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_acks_and_retries(queue, clock):
+    """ワーカーは価格が取れた商品を ack、取れなかった商品を再試行に戻す"""
+    products = {
+        "gold": {"url": "https://a.com/gold", "name": "Gold"},
+        "bad": {"url": "https://a.com/fail", "name": "Bad"},
+        "off": {"url": "https://a.com/off", "name": "Off", "enabled": False},
+    }
+    batch = enqueue_products(queue, products, batch="cycle-1")
+    scraper = FakeScraper()
+    worker = ScrapeJobWorker(queue, scraper=scraper, owner="w1", retry_delay=10)
+
+    assert await worker.run_once() == 2
+    assert queue.results(batch) == {"gold": {"name": "Gold", "price": 100.0, "currency": "JPY"}}
+    assert queue.batch_status(batch) == {DONE: 1, QUEUED: 1}
+    assert worker.completed == 1 and worker.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_for_batch_collects_results(queue):
+    """プロデューサーは全ジョブの完了を待って商品キーごとの結果を受け取る"""
+    products = {
+        "gold": {"url": "https://a.com/gold", "name": "Gold"},
+        "silver": {"url": "https://b.com/silver", "name": "Silver"},
+    }
+    batch = enqueue_products(queue, products, batch="cycle-1")
+    worker = ScrapeJobWorker(queue, scraper=FakeScraper(), owner="w1", idle_sleep=0.01)
+    worker_task = asyncio.create_task(worker.run(exit_when_idle=True))
+
+    results, missing = await wait_for_batch(queue, batch, list(products), Budget(5), poll_interval=0.01)
+    await worker_task
+
+    assert set(results) == {"gold", "silver"}
+    assert missing == []
+    assert worker.scraper.cleaned
+
+
+@pytest.mark.asyncio
+async def test_wait_for_batch_cancels_on_budget(queue):
+    """予算切れなら未着手のジョブを取り消し、取得できなかった商品を返す"""
+    batch = enqueue_products(queue, {"gold": {"url": "https://a.com/gold", "name": "Gold"}}, batch="cycle-1")
+
+    results, missing = await wait_for_batch(queue, batch, ["gold"], Budget(0.05), poll_interval=0.01)
+
+    assert results == {}
+    assert missing == ["gold"]
+    assert queue.claim("w1") == []
+
+
+@pytest.mark.asyncio
+async def test_scrape_via_queue_bounds_local_worker(tmp_path, monkeypatch):
+    """ローカルワーカーにはサイクルの予算を渡し、猶予を過ぎても終わらなければ取り消す"""
+    monkeypatch.setattr("src.jobs.scrape.SHUTDOWN_GRACE", 0.2)
+    scraper = HungScraper()
+    monkeypatch.setattr("src.coin_scraper.CoinPriceScraper", lambda workers: scraper)
+    queue = SQLiteJobQueue(tmp_path / "jobs.db")
+    budget = Budget(0.3)
+
+    started = time.monotonic()
+    results, missing = await scrape_via_queue(queue, {"gold": {"url": "https://a.com/gold", "name": "Gold"}}, budget)
+
+    assert time.monotonic() - started < 2
+    assert results == {} and missing == ["gold"]
+    assert scraper.calls == [budget]
+    assert scraper.cleaned
+    queue.close()
@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.coin_scraper import CoinPriceScraper
+from src.utils.page_extract import PageText, extract_page_text, first_match
+
+
+def test_first_match_respects_pattern_priority():
+    """パターンの優先順が文書順より優先される"""
+    texts = ["合計 円 1,000", "価格 ¥ 245,300 (税込)", None]
+    match = first_match(texts, [r'¥\s*([\d,]+)', r'円\s*([\d,]+)'])
+
+    assert match.group(1) == "245,300"
+
+
+def test_first_match_none():
+    assert first_match(["no price here"], [r'¥\s*([\d,]+)']) is None
+
+
+def test_first_selected_in_order():
+    text = PageText(selected={".a": None, ".b": "$12.50", ".c": "$9"})
+
+    assert text.first_selected([".a", ".b", ".c"]) == "$12.50"
+
+
+@pytest.mark.asyncio
+async def test_extract_page_text_single_evaluate():
+    """抽出は1回の page.evaluate で完結する"""
+    page = MagicMock()
+    page.evaluate = AsyncMock(return_value={
+        "name": "Gold Maple",
+        "selected": {".price": "$2,450.00"},
+        "candidates": ["¥ 380,000"]
+    })
+
+    text = await extract_page_text(page, markers=["¥"], selectors=[".price"], name_selectors=["h1"])
+
+    page.evaluate.assert_awaited_once()
+    assert page.evaluate.call_args.args[1][:3] == [["¥"], [".price"], ["h1"]]
+    assert text.name == "Gold Maple"
+    assert text.selected[".price"] == "$2,450.00"
+    assert text.candidates == ["¥ 380,000"]
+
+
+@pytest.mark.asyncio
+async def test_bullionstar_price_from_candidates():
+    """BullionStarのJPY価格はマーカー付近の候補テキストから取得"""
+    scraper = CoinPriceScraper()
+    scraper.currencies = ["JPY"]
+    page = MagicMock()
+    page.query_selector = AsyncMock(return_value=None)
+    page.evaluate = AsyncMock(return_value={
+        "name": "Canadian Gold Maple Leaf 1 oz",
+        "selected": {},
+        "candidates": ["JPY 999", "1 oz ¥ 412,345"]
+    })
+
+    result = await scraper._scrape_bullionstar(page, "https://www.bullionstar.com/buy/product/x")
+
+    assert result["price"] == 412345.0
+    assert result["name"] == "Canadian Gold Maple Leaf 1 oz"
+    page.evaluate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bullionstar_switches_currency_on_one_page():
+    """1回のページ読み込みで通貨を切り替えて全通貨の価格を取得"""
+    scraper = CoinPriceScraper()
+    scraper.currencies = ["JPY", "SGD"]
+    page = MagicMock()
+    page.query_selector = AsyncMock(return_value=None)
+    page.evaluate = AsyncMock(side_effect=[
+        {"name": "Gold Maple", "selected": {}, "candidates": ["¥ 412,345"]},
+        {"name": "Gold Maple", "selected": {}, "candidates": ["S$3,500.00", "S$ 4,300.50"]},
+    ])
+
+    result = await scraper._scrape_bullionstar(page, "https://www.bullionstar.com/buy/product/x")
+
+    assert result["price"] == 412345.0
+    assert result["prices"] == {"JPY": 412345.0, "SGD": 3500.0}
+    assert page.evaluate.await_count == 2
@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from src.utils.page_pool import PagePool
+
+
+class FakePage:
+    def __init__(self, context, broken=False):
+        self.context = context
+        self.closed = False
+        self.broken = broken
+        self.visited = []
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url):
+        if self.broken:
+            raise RuntimeError("Target crashed")
+        self.visited.append(url)
+
+    async def close(self):
+        if self.broken:
+            raise RuntimeError("Target crashed")
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.dead = False
+
+    async def new_page(self):
+        if self.dead:
+            raise RuntimeError("Target closed")
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+
+@pytest.mark.asyncio
+async def test_pages_spread_across_contexts():
+    """ページはコンテキストにラウンドロビンで割り当て"""
+    contexts = [FakeContext(), FakeContext()]
+    pool = PagePool(contexts, 5)
+    await pool.open()
+
+    assert [len(c.pages) for c in contexts] == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test_pages_are_recycled():
+    """返却したページはリセットして再利用"""
+    context = FakeContext()
+    pool = PagePool([context], 1)
+    await pool.open()
+
+    async with pool.page() as first:
+        pass
+    async with pool.page() as second:
+        pass
+
+    assert first is second
+    assert first.visited == ["about:blank", "about:blank"]
+    assert pool.reused == 2
+    assert len(context.pages) == 1
+
+
+@pytest.mark.asyncio
+async def test_closed_page_is_replaced():
+    """閉じられたページは同じコンテキストの新しいページに置き換え"""
+    context = FakeContext()
+    pool = PagePool([context], 1)
+    await pool.open()
+
+    async with pool.page() as page:
+        await page.close()
+    async with pool.page() as replacement:
+        pass
+
+    assert replacement is not page
+    assert replacement.context is context
+
+
+@pytest.mark.asyncio
+async def test_borrowers_wait_for_free_page():
+    """全ページ貸出中は返却を待つ"""
+    pool = PagePool([FakeContext()], 2)
+    await pool.open()
+    active = []
+    peak = []
+
+    async def worker():
+        async with pool.page() as page:
+            active.append(page)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(page)
+
+    await asyncio.gather(*[worker() for _ in range(6)])
+
+    assert max(peak) == 2
+
+
+@pytest.mark.asyncio
+async def test_close_closes_all_pages():
+    context = FakeContext()
+    pool = PagePool([context], 3)
+    await pool.open()
+    await pool.close()
+
+    assert all(page.closed for page in context.pages)
+
+
+@pytest.mark.asyncio
+async def test_failed_return_keeps_pool_size():
+    """リセットも閉じるのも失敗し、コンテキストも使えなくなったページは他のコンテキストで作り直す"""
+    contexts = [FakeContext(), FakeContext()]
+    pool = PagePool(contexts, 2)
+    await pool.open()
+
+    async with pool.page() as page:
+        page.broken = True
+        page.context.dead = True
+
+    borrowed = []
+    for _ in range(2):
+        borrowed.append(await asyncio.wait_for(pool._idle.get(), 1))
+    assert page not in borrowed
+    assert all(not p.context.dead for p in borrowed)
+
+
+@pytest.mark.asyncio
+async def test_missing_pages_reopened_on_next_borrow():
+    """どのコンテキストでも開けなかったページは次の貸し出し時に作り直す"""
+    context = FakeContext()
+    pool = PagePool([context], 1)
+    await pool.open()
+
+    async with pool.page() as page:
+        page.broken = True
+        context.dead = True
+    context.dead = False
+
+    async with pool.page() as replacement:
+        assert replacement is not page
@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from src.utils.page_readiness import ReadinessStrategy, navigate, wait_for_response_during
+
+
+class FakeExpectation:
+    """page.expect_response() の代わり（value の結果を指定）"""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def value(self):
+        async def resolve():
+            if isinstance(self.outcome, Exception):
+                raise self.outcome
+            return self.outcome
+        return resolve()
+
+
+def _page(outcome="response"):
+    page = MagicMock()
+    page.expect_response = MagicMock(return_value=FakeExpectation(outcome))
+    page.goto = AsyncMock(return_value=MagicMock(status=200))
+    page.wait_for_function = AsyncMock()
+    page.evaluate = AsyncMock(return_value=True)
+    return page
+
+
+@pytest.mark.asyncio
+async def test_response_strategy_ready():
+    """価格XHRが届けば準備完了"""
+    page = _page()
+    statuses = []
+
+    response, ready = await navigate(
+        page, "https://www.bullionstar.com/x", ReadinessStrategy("response", "product/v2/prices"),
+        on_response=lambda r: statuses.append(r.status)
+    )
+
+    assert ready is True
+    assert response.status == 200
+    assert statuses == [200]
+    assert page.goto.call_args.kwargs["wait_until"] == "domcontentloaded"
+
+
+@pytest.mark.asyncio
+async def test_response_strategy_deadline_expires():
+    """デッドライン切れは例外にせず未完了として返す"""
+    page = _page(PlaywrightTimeoutError("timeout"))
+
+    response, ready = await navigate(page, "https://www.bullionstar.com/x", ReadinessStrategy("response", "prices"))
+
+    assert ready is False
+    assert response.status == 200
+
+
+@pytest.mark.asyncio
+async def test_action_failure_propagates():
+    """ナビゲーション自体の失敗はそのまま送出"""
+    page = _page()
+
+    async def failing():
+        raise PlaywrightTimeoutError("navigation timeout")
+
+    with pytest.raises(PlaywrightTimeoutError):
+        await wait_for_response_during(page, failing, "prices", 1.0)
+
+
+@pytest.mark.asyncio
+async def test_selector_strategy_timeout():
+    """価格要素が数値にならなければ未完了"""
+    page = _page()
+    page.wait_for_function = AsyncMock(side_effect=PlaywrightTimeoutError("timeout"))
+
+    _, ready = await navigate(page, "https://www.apmex.com/x", ReadinessStrategy("selector", ".price", deadline=0.1))
+
+    assert ready is False
+    assert page.wait_for_function.call_args.kwargs["timeout"] == 100
+
+
+@pytest.mark.asyncio
+async def test_settle_strategy_uses_quiet_window():
+    page = _page()
+
+    _, ready = await navigate(page, "https://example.com/x", ReadinessStrategy("settle", deadline=2.0, quiet_ms=300))
+
+    assert ready is True
+    assert page.evaluate.call_args.args[1] == [300, 2000]
@@ -0,0 +1,114 @@
+from src.utils.poll_scheduler import PollScheduler
+
+
+def _scheduler(clock, **kwargs):
+    options = dict(min_interval=60, max_interval=7200, base_interval=600, reference_volatility=0.01)
+    options.update(kwargs)
+    return PollScheduler(clock=clock, **options)
+
+
+def test_new_products_due_immediately(clock):
+    scheduler = _scheduler(clock)
+    scheduler.sync(["gold", "silver"])
+
+    assert sorted(scheduler.due()) == ["gold", "silver"]
+    assert scheduler.due() == []
+
+
+def test_volatile_products_polled_more_often(clock):
+    """変動の大きい商品は短く、変動のない商品は最大間隔"""
+    scheduler = _scheduler(clock)
+    scheduler.add("gold", prices=[100, 110, 95, 112, 90])
+    scheduler.add("silver", prices=[50, 50, 50, 50])
+    scheduler.add("new")
+
+    assert scheduler.interval("gold") == 60
+    assert scheduler.interval("silver") == 7200
+    assert scheduler.interval("new") == 600
+
+
+def test_interval_scales_with_volatility(clock):
+    scheduler = _scheduler(clock)
+    # 前回比 +1% / -1% の繰り返し → 標準偏差はほぼ基準値
+    scheduler.add("gold", prices=[100, 101, 99.99, 100.9899])
+
+    assert 500 < scheduler.interval("gold") < 700
+
+
+def test_record_schedules_next_poll(clock):
+    scheduler = _scheduler(clock)
+    scheduler.add("silver", prices=[50, 50, 50])
+    scheduler.due()
+
+    scheduler.record("silver", 50)
+    assert scheduler.seconds_until_next() == 7200
+
+    clock.now = 7199
+    assert scheduler.due() == []
+    clock.now = 7200
+    assert scheduler.due() == ["silver"]
+
+
+def test_failure_retried_at_min_interval(clock):
+    scheduler = _scheduler(clock)
+    scheduler.add("gold")
+    scheduler.due()
+
+    scheduler.record_failure("gold")
+
+    assert scheduler.seconds_until_next() == 60
+
+
+def test_hourly_budget_defers_oldest_first(clock):
+    """1時間の取得数を超える商品は期限の古い順に次の枠まで待つ"""
+    scheduler = _scheduler(clock, hourly_budget=2)
+    scheduler.add("a", due=0)
+    scheduler.add("b", due=1)
+    scheduler.add("c", due=2)
+    clock.now = 10
+
+    assert scheduler.due() == ["a", "b"]
+    assert scheduler.budget_remaining() == 0
+    # 最初の取得から1時間後に枠が空く
+    assert scheduler.next_due() == 3610
+
+    clock.now = 3610
+    assert scheduler.due() == ["c"]
+
+
+def test_sync_removes_products(clock):
+    scheduler = _scheduler(clock)
+    scheduler.sync(["gold", "silver"])
+    scheduler.sync(["gold"])
+
+    assert "silver" not in scheduler
+    assert scheduler.due() == ["gold"]
+
+
+def test_in_flight_products_not_re_added(clock):
+    """取得中の商品は登録済みとして扱い、再登録で履歴を重複させない"""
+    scheduler = _scheduler(clock)
+    scheduler.add("gold", prices=[100, 101, 102])
+    assert scheduler.due() == ["gold"]
+
+    assert "gold" in scheduler
+    scheduler.add("gold", prices=[100, 101, 102])
+    scheduler.sync(["gold"])
+    assert list(scheduler._history["gold"]) == [100, 101, 102]
+    assert scheduler.due() == []
+
+    scheduler.record_failure("gold")
+    clock.now = 60
+    assert scheduler.due() == ["gold"]
+
+
+def test_removed_while_in_flight_not_rescheduled(clock):
+    scheduler = _scheduler(clock)
+    scheduler.sync(["gold"])
+    scheduler.due()
+    scheduler.sync([])
+
+    scheduler.record("gold", 100)
+
+    assert "gold" not in scheduler
+    assert scheduler.next_due() is None
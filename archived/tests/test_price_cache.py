@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from src.utils.price_cache import PriceCache
+
+
+def test_key_normalization():
+    """キーは (商品ID文字列, 通貨大文字, ロケーションID)"""
+    assert PriceCache.key(628, "jpy") == ("628", "JPY", 1)
+    assert PriceCache.key("628", "JPY", 2) == ("628", "JPY", 2)
+
+
+def test_ttl_expiry(clock):
+    """TTLを過ぎた値は返さない"""
+    cache = PriceCache(ttl=10, clock=clock)
+    cache.set("a", 1.0)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1.0
+    clock.now = 10.0
+    assert cache.get("a") is None
+
+
+def test_lru_eviction():
+    """容量超過時は最も古く使われたキーを削除"""
+    cache = PriceCache(max_entries=2)
+    cache.set("a", 1.0)
+    cache.set("b", 2.0)
+    cache.get("a")
+    cache.set("c", 3.0)
+
+    assert cache.get("a") == 1.0
+    assert cache.get("b") is None
+    assert cache.get("c") == 3.0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch():
+    """同じキーへの同時ミスは1回の取得にまとめる"""
+    cache = PriceCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 2613.25
+
+    results = await asyncio.gather(*[cache.get_or_fetch("k", fetch) for _ in range(5)])
+
+    assert results == [2613.25] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_fetch("k", fetch) == 2613.25
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_fetch_many_fetches_only_missing():
+    """バッチ取得ではキャッシュにないキーだけを取得"""
+    cache = PriceCache()
+    cache.set("a", 1.0)
+    requested = []
+
+    async def fetch(keys):
+        requested.append(keys)
+        return {"b": 2.0}
+
+    results = await cache.get_or_fetch_many(["a", "b", "c"], fetch)
+
+    assert requested == [["b", "c"]]
+    assert results == {"a": 1.0, "b": 2.0}
+    assert cache.get("c") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_not_cached():
+    """取得失敗時は待機中のタスクにNoneを返し、キャッシュしない"""
+    cache = PriceCache()
+    started = asyncio.Event()
+
+    async def failing():
+        started.set()
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    owner = asyncio.create_task(cache.get_or_fetch("k", failing))
+    await started.wait()
+    waiter = await cache.get_or_fetch("k", failing)
+
+    assert waiter is None
+    with pytest.raises(RuntimeError):
+        await owner
+    assert cache.get("k") is None
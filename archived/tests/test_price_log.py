@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+
+from src.utils.price_log import PriceLog
+
+
+def _record(index, product_key="gold", timestamp=None):
+    return {
+        'product_key': product_key,
+        'product_name': product_key.title(),
+        'price': 1000.0 + index,
+        'currency': 'JPY',
+        'timestamp': timestamp or f"2026-01-01T00:00:{index % 60:02d}.{index:06d}"
+    }
+
+
+def _lines(log):
+    return sum(len(segment.read_text().splitlines()) for _, segment in log._segments())
+
+
+def test_append_batches_writes(tmp_path):
+    """sync_every 件溜まるまでは書き込まず、flush で残りを書き込む"""
+    log = PriceLog(tmp_path / "log", sync_every=3, sync_interval=3600)
+    log.append(_record(0))
+    log.append(_record(1))
+    assert _lines(log) == 0
+    assert [r['price'] for r in log.recent()] == [1000.0, 1001.0]
+
+    log.append(_record(2))
+    assert _lines(log) == 3
+
+    log.append(_record(3))
+    log.flush()
+    assert _lines(log) == 4
+
+
+def test_reopen_reads_tail_and_history(tmp_path):
+    """再度開くと末尾から直近を、全件はセグメントから返す（件数の上限なし）"""
+    with PriceLog(tmp_path / "log", sync_every=10, segment_bytes=512) as log:
+        for i in range(50):
+            log.append(_record(i, "gold" if i % 2 else "silver"))
+
+    reopened = PriceLog(tmp_path / "log", tail_size=10)
+    assert len(reopened._segments()) > 1
+    assert reopened._truncated
+
+    recent = reopened.recent(5)
+    assert [r['price'] for r in recent] == [1045.0, 1046.0, 1047.0, 1048.0, 1049.0]
+
+    gold = reopened.recent(product_key="gold")
+    assert len(gold) == 25
+    assert len(reopened) == 50
+
+    history = reopened.history(3)
+    assert len(history['prices']) == 3
+    assert history['last_update'] == _record(49)['timestamp']
+
+
+def test_reads_other_writers(tmp_path):
+    """他のインスタンス（プロセス）が追記した記録は読み取り時に取り込む"""
+    reader = PriceLog(tmp_path / "log")
+    writer = PriceLog(tmp_path / "log", sync_every=1)
+
+    writer.append(_record(0))
+    writer.append(_record(1))
+    assert [r['price'] for r in reader.recent()] == [1000.0, 1001.0]
+
+    # 読み取り側の書き込みは他の記録の後ろに並び、二重に読まない
+    reader.append(_record(2))
+    reader.flush()
+    writer.append(_record(3))
+    assert [r['price'] for r in reader.recent()] == [1000.0, 1001.0, 1002.0, 1003.0]
+    assert [r['price'] for r in writer.recent()] == [1000.0, 1001.0, 1002.0, 1003.0]
+
+
+def test_partial_line_is_skipped(tmp_path):
+    """クラッシュで途中まで書かれた行は読み飛ばし、次の追記と繋がらない"""
+    log = PriceLog(tmp_path / "log", sync_every=1)
+    log.append(_record(0))
+    segment = log._segments()[-1][1]
+    with open(segment, 'a') as f:
+        f.write('{"product_key": "gol')
+
+    log.append(_record(1))
+    reopened = PriceLog(tmp_path / "log")
+    assert [r['price'] for r in reopened.recent()] == [1000.0, 1001.0]
+
+
+def test_compaction_merges_segments_and_applies_retention(tmp_path):
+    """閉じたセグメントをまとめ、保持期間より古い記録を削除する"""
+    old = (datetime.now() - timedelta(days=40)).isoformat()
+    new = datetime.now().isoformat()
+    log = PriceLog(tmp_path / "log", sync_every=1, segment_bytes=200, compact_after=100, retention=timedelta(days=30))
+    for i in range(10):
+        log.append(_record(i, timestamp=old if i < 4 else new))
+    before = len(log._segments())
+    assert before > 3
+
+    removed = log.compact()
+    assert removed > 0
+    assert len(log._segments()) < before
+    assert [r['price'] for r in log.read()] == [1000.0 + i for i in range(4, 10)]
+
+    # 統合後も追記・読み取りは続けられる
+    log.append(_record(10, timestamp=new))
+    assert log.recent(1)[0]['price'] == 1010.0
+    assert [r['price'] for r in PriceLog(tmp_path / "log").recent()] == [1000.0 + i for i in range(4, 11)]
+
+
+def test_background_compaction_on_roll(tmp_path):
+    """セグメントの切り替えで閉じたセグメントが溜まると、バックグラウンドで統合する"""
+    log = PriceLog(tmp_path / "log", sync_every=1, segment_bytes=150, compact_after=3)
+    for i in range(20):
+        log.append(_record(i))
+    log.close()
+
+    assert len(log._segments()) < 10
+    assert [r['price'] for r in log.read()] == [1000.0 + i for i in range(20)]
+
+
+def test_imports_legacy_history(tmp_path):
+    """ログが空なら旧形式の price_history.json を取り込む（元のファイルは残す）"""
+    legacy = tmp_path / "price_history.json"
+    legacy.write_text(json.dumps({'prices': [_record(0), _record(1)], 'last_update': None}))
+
+    log = PriceLog(tmp_path / "price_log")
+    assert [r['price'] for r in log.recent()] == [1000.0, 1001.0]
+    assert legacy.exists()
+
+    # 2回目以降は取り込まない
+    assert len(PriceLog(tmp_path / "price_log")) == 2
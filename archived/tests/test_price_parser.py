@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+import pytest
+from src.utils.price_parser import detect_currency, parse_price, parse_price_details, parse_prices
+
+CORPUS = json.loads((Path(__file__).parent / "fixtures" / "price_corpus.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["text"] or "<empty>" for case in CORPUS])
+def test_golden_corpus(case):
+    """実際のレスポンス・ページ表示の価格文字列"""
+    parsed = parse_price_details(case["text"], case["currency"])
+
+    if case["amount"] is None:
+        assert parsed is None
+    else:
+        assert parsed.amount == pytest.approx(case["amount"])
+        assert parsed.currency == case["detected"]
+
+
+def test_batch_matches_single():
+    """一括解析は1件ずつの解析と同じ結果を同じ順序で返す"""
+    texts = [case["text"] for case in CORPUS] + [None, 1234.5]
+    expected = [parse_price(text, "JPY") for text in texts]
+
+    assert parse_prices(texts, "JPY") == expected
+    assert parse_prices(texts * 100, "JPY") == expected * 100
+
+
+def test_numbers_pass_through():
+    assert parse_price(2613.25) == 2613.25
+    assert parse_price(0) is None
+    assert parse_price(None) is None
+
+
+def test_detect_currency():
+    assert detect_currency("合計 ¥ 245,300") == "JPY"
+    assert detect_currency("no price", default="USD") == "USD"
@@ -0,0 +1,155 @@
+import time
+import pytest
+from src.coin_scraper import CoinPriceScraper
+from src.process_scraper import host_shares, resolve_workers, scrape_in_processes, shard_products
+from src.utils.deadline import Budget
+
+
+def _product(host, i):
+    return {"url": f"https://{host}/product/{i}", "name": f"{host} {i}"}
+
+
+def fake_worker(worker_id, products, results, seconds, shares=None):
+    """ブラウザを使わずに商品ごとの結果を送るワーカー"""
+    for product_key, product_info in products.items():
+        results.put(("result", product_key, {
+            "name": product_info["name"], "price": 1.0, "currency": "USD",
+            "source": "browser", "timestamp": f"worker-{worker_id}"
+        }))
+    results.put(("done", worker_id, None))
+
+
+def hung_worker(worker_id, products, results, seconds, shares=None):
+    """1件だけ送って応答しなくなるワーカー"""
+    product_key = next(iter(products))
+    results.put(("result", product_key, {"name": "x", "price": 1.0, "currency": "USD"}))
+    time.sleep(60)
+
+
+def test_shard_keeps_hosts_together():
+    """同じホストの商品は同じシャード、多いホストから空いたシャードへ"""
+    products = {f"a{i}": _product("a.com", i) for i in range(4)}
+    products.update({f"b{i}": _product("b.com", i) for i in range(2)})
+    products.update({f"c{i}": _product("c.com", i) for i in range(2)})
+
+    shards = shard_products(products, 2)
+
+    assert sorted(len(shard) for shard in shards) == [4, 4]
+    for shard in shards:
+        hosts = {info["url"].split("/")[2] for info in shard.values()}
+        assert hosts in ({"a.com"}, {"b.com", "c.com"})
+
+
+def test_large_host_split_across_shards():
+    """1シャード分を超えるホストは分割し、分担するシャード数を返す"""
+    products = {f"a{i}": _product("a.com", i) for i in range(6)}
+    products.update({f"b{i}": _product("b.com", i) for i in range(2)})
+
+    shards = shard_products(products, 4)
+
+    assert sorted(len(shard) for shard in shards) == [2, 2, 2, 2]
+    assert sorted(key for shard in shards for key in shard) == sorted(products)
+    assert host_shares(shards) == {"a.com": 3, "b.com": 1}
+
+
+def test_shard_count_limited_by_products():
+    products = {f"a{i}": _product("a.com", i) for i in range(2)}
+
+    assert len(shard_products(products, 4)) == 2
+
+
+def test_resolve_workers(monkeypatch):
+    monkeypatch.setattr("src.process_scraper.available_cores", lambda: 8)
+
+    assert resolve_workers("auto") == 7
+    assert resolve_workers("3") == 3
+    assert resolve_workers("0") == 1
+
+
+@pytest.mark.asyncio
+async def test_results_streamed_and_merged():
+    """各ワーカーの結果が届いた順にコールバックされ、1つの辞書にまとまる"""
+    products = {f"{host}-{i}": _product(host, i) for host in ("a.com", "b.com") for i in range(3)}
+    streamed = []
+
+    results, missing = await scrape_in_processes(
+        products, 2, on_result=lambda key, result: streamed.append(key), target=fake_worker
+    )
+
+    assert set(results) == set(products)
+    assert sorted(streamed) == sorted(products)
+    assert missing == []
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_terminated_after_budget(monkeypatch):
+    """予算を過ぎても終わらないワーカーは強制終了し、残りを missing にする"""
+    monkeypatch.setattr("src.process_scraper.SHUTDOWN_GRACE", 0.5)
+    products = {"a-0": _product("a.com", 0), "a-1": _product("a.com", 1)}
+
+    started = time.monotonic()
+    results, missing = await scrape_in_processes(products, 1, Budget(2.0), target=hung_worker)
+
+    assert list(results) == ["a-0"]
+    assert missing == ["a-1"]
+    assert time.monotonic() - started < 10
+
+
+@pytest.mark.asyncio
+async def test_scraper_uses_one_observation_time(monkeypatch):
+    """マルチプロセスでも結果の形と観測時刻は単一プロセスと同じ"""
+    scraper = CoinPriceScraper(workers=2)
+    products = {f"{host}-0": _product(host, 0) for host in ("a.com", "b.com")}
+
+    async def fake_scrape(targets, workers, budget, on_result):
+        results = {}
+        for worker_id, product_key in enumerate(targets):
+            results[product_key] = {"price": 1.0, "currency": "USD", "source": "browser", "timestamp": f"w{worker_id}"}
+            on_result(product_key, results[product_key])
+        return results, []
+
+    monkeypatch.setattr("src.coin_scraper.scrape_in_processes", fake_scrape)
+
+    results = await scraper.run(products)
+
+    assert set(results) == set(products)
+    assert scraper.routes == {"a.com-0": "browser", "b.com-0": "browser"}
+    assert all(result["timestamp"] == scraper.observed_at for result in results.values())
+
+
+@pytest.mark.asyncio
+async def test_api_products_stay_in_parent(monkeypatch):
+    """API対応商品は親プロセスでまとめて取得し、無効な商品はワーカー数に数えない"""
+    scraper = CoinPriceScraper(workers=2)
+    api_products = {
+        f"bs-{i}": {"url": f"https://www.bullionstar.com/buy/product/{i}", "name": f"BS {i}", "product_id": i}
+        for i in range(3)
+    }
+    products = dict(api_products, off={"url": "https://b.com/product/0", "name": "Off", "enabled": False})
+    products["a-0"] = _product("a.com", 0)
+    spawned = []
+
+    async def fake_scrape(targets, workers, budget, on_result):
+        spawned.append(sorted(targets))
+        return {}, list(targets)
+
+    async def fake_api(items):
+        return {key: {"name": info["name"], "price": 1.0, "currency": "JPY"} for key, info in items}
+
+    async def fake_multiple(targets, budget=None):
+        return {}
+
+    monkeypatch.setattr("src.coin_scraper.scrape_in_processes", fake_scrape)
+    monkeypatch.setattr(scraper, "_scrape_via_api", fake_api)
+    monkeypatch.setattr(scraper, "scrape_multiple", fake_multiple)
+
+    # 残りが1件なら1プロセス
+    await scraper.run(products)
+    assert spawned == []
+
+    # 残りが複数ならワーカーに渡すのはAPI対応以外だけ
+    products["b-0"] = _product("b.com", 0)
+    results = await scraper.run(products)
+    assert spawned == [["a-0", "b-0"]]
+    assert set(results) == set(api_products)
+    assert all(scraper.routes[key] == "api" for key in api_products)
@@ -0,0 +1,113 @@
+import pytest
+from src.utils.rate_limiter import AdaptiveRateLimiter, HostLimiter, HostPolicy
+
+
+def test_host_key_groups_subdomains():
+    """サブドメインは親ドメインのリミッターを共有"""
+    limiter = AdaptiveRateLimiter()
+
+    assert limiter.host_key("https://services.bullionstar.com/product/v2/prices") == "bullionstar.com"
+    assert limiter.host_key("https://www.apmex.com/product/1") == "apmex.com"
+    assert limiter.host_key("https://example.com/x") == "example.com"
+    assert limiter.limiter_for("https://www.bullionstar.com/") is limiter.limiter_for("services.bullionstar.com")
+
+
+def test_share_host_divides_policy():
+    """ホストを分担するプロセスの取り分は、レートを割り、同時接続数は1以上に保つ"""
+    limiter = AdaptiveRateLimiter()
+    limiter.limiter_for("https://www.bullionstar.com/")
+
+    limiter.share_host("https://www.bullionstar.com/", 4)
+
+    policy = limiter.limiter_for("services.bullionstar.com").policy
+    assert (policy.rate, policy.max_rate, policy.burst) == (0.5, 2.5, 1)
+    assert (policy.concurrency, policy.max_concurrency) == (1, 2)
+
+
+def test_token_bucket_limits_rate(clock):
+    """バケットが空になったら補充まで待機"""
+    host = HostLimiter("example.com", HostPolicy(rate=2.0, burst=2, concurrency=10, max_concurrency=10), clock)
+
+    assert host.try_acquire() == 0
+    assert host.try_acquire() == 0
+    assert host.try_acquire() == pytest.approx(0.5)
+
+    clock.now = 0.5
+    assert host.try_acquire() == 0
+
+
+def test_concurrency_cap(clock):
+    """同時接続数の上限で待機"""
+    host = HostLimiter("example.com", HostPolicy(rate=100, burst=100, concurrency=1), clock)
+
+    assert host.try_acquire() == 0
+    assert host.try_acquire() > 0
+
+    host.release(latency=0.1, status=200)
+    assert host.try_acquire() == 0
+
+
+def test_additive_increase_on_success(clock):
+    """成功が続くと同時接続数とレートが加算的に増える"""
+    policy = HostPolicy(rate=1.0, max_rate=1.5, rate_step=0.1, concurrency=1, max_concurrency=3)
+    host = HostLimiter("example.com", policy, clock)
+
+    for _ in range(20):
+        host.in_flight = 1
+        host.release(latency=0.1, status=200)
+
+    assert host.concurrency == 3
+    assert host.rate == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize("status, latency", [(429, 0.1), (503, 0.1), (200, 10.0)])
+def test_multiplicative_backoff(clock, status, latency):
+    """429/5xx・高レイテンシで乗算的に縮小"""
+    policy = HostPolicy(rate=4.0, concurrency=8, max_concurrency=8, backoff=0.5, target_latency=3.0)
+    host = HostLimiter("example.com", policy, clock)
+    clock.now = 100.0
+
+    host.release(latency=latency, status=status)
+
+    assert host.concurrency == 4
+    assert host.rate == 2.0
+
+
+def test_backoff_once_per_congestion_window(clock):
+    """同じ混雑期間中の連続エラーでは1回だけ縮小"""
+    policy = HostPolicy(rate=4.0, concurrency=8, max_concurrency=8, backoff=0.5, target_latency=3.0)
+    host = HostLimiter("example.com", policy, clock)
+    clock.now = 100.0
+
+    host.release(latency=0.1, status=500)
+    host.release(latency=0.1, status=500)
+    assert host.concurrency == 4
+
+    clock.now = 104.0
+    host.release(latency=0.1, status=500)
+    assert host.concurrency == 2
+
+
+def test_penalize_blocks_until_retry_after(clock):
+    """Retry-Afterの期間は新規リクエストを止める"""
+    host = HostLimiter("example.com", HostPolicy(burst=10), clock)
+    host.penalize(30)
+
+    assert host.try_acquire() == 30
+    clock.now = 31
+    assert host.try_acquire() == 0
+
+
+@pytest.mark.asyncio
+async def test_slot_records_status():
+    """slot() は返却時に記録したステータスで調整"""
+    limiter = AdaptiveRateLimiter(policies={"example.com": HostPolicy(concurrency=4, max_concurrency=8)})
+
+    async with limiter.slot("https://example.com/a") as slot:
+        assert limiter.limiter_for("example.com").in_flight == 1
+        slot.record(429, retry_after="5")
+
+    host = limiter.limiter_for("example.com")
+    assert host.in_flight == 0
+    assert host.concurrency == 2
+    assert host.blocked_until > 0
@@ -0,0 +1,109 @@
+import json
+import aiohttp
+import pytest
+
+from src.replay.routing import from_replay, to_replay
+from src.replay.server import ReplayServer
+from src.replay.store import FixtureStore, fixture_key
+from src.scrapers.bullionstar import BullionStarScraper
+from src.utils.price_cache import PriceCache
+from src.utils.rate_limiter import AdaptiveRateLimiter
+
+API_URL = BullionStarScraper.API_URL
+
+
+def test_fixture_key_ignores_scheme_and_query_order():
+    assert fixture_key("get", "https://Example.com/p?b=2&a=1") == fixture_key("GET", "http://example.com/p?a=1&b=2")
+
+
+def test_store_round_trip_and_path_fallback(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.put("GET", "https://example.com/p?id=1", 200, {"Content-Type": "text/html", "Set-Cookie": "x"}, b"<p>1</p>")
+    store.put("GET", "https://example.com/q", 200, {}, b"<p>1</p>")
+    store.save()
+
+    reloaded = FixtureStore(tmp_path)
+    recorded = reloaded.get("GET", "https://example.com/p?id=1")
+    assert recorded.headers == {"content-type": "text/html"}
+    assert reloaded.body(recorded) == b"<p>1</p>"
+    # クエリ違いは同じパスの記録で代替（exact なら一致のみ）
+    assert reloaded.get("GET", "https://example.com/p?id=2") == recorded
+    assert reloaded.get("GET", "https://example.com/p?id=2", exact=True) is None
+    # 同じ本文は1回だけ保存
+    assert len(list((tmp_path / "bodies").iterdir())) == 1
+
+
+@pytest.mark.asyncio
+async def test_api_requests_need_exact_recording(tmp_path):
+    """APIは通貨・商品IDの違う記録で代替せず、未記録として返す"""
+    store = FixtureStore(tmp_path)
+    store.put("GET", f"{API_URL}?currency=JPY&locationId=1&productIds=1", 200, {}, b'{"products": []}')
+    store.put("GET", "https://example.com/search?currency=JPY", 200, {}, b"[]")
+
+    assert store.get("GET", f"{API_URL}?currency=SGD&locationId=1&productIds=1") is None
+    assert store.get("GET", "https://example.com/search?currency=SGD") is None
+
+    async with ReplayServer(store, latency=0) as server:
+        async with aiohttp.ClientSession() as session:
+            url = to_replay(f"{API_URL}?currency=SGD&locationId=1&productIds=1", server.url)
+            async with session.get(url) as response:
+                assert response.status == 404
+    assert server.stats["misses"] == 1
+
+
+def test_replay_url_round_trip():
+    url = "https://www.apmex.com/product/1?x=1"
+    replayed = to_replay(url, "http://127.0.0.1:9000/")
+    assert replayed == "http://127.0.0.1:9000/www.apmex.com/product/1?x=1"
+    assert from_replay("/www.apmex.com/product/1", "x=1") == url
+    assert to_replay(url) == url
+
+
+@pytest.mark.asyncio
+async def test_bullionstar_scraper_runs_against_replay(tmp_path, monkeypatch):
+    """SCRAPER_REPLAY_URL を設定すると BullionStarScraper は記録した応答を使う"""
+    store = FixtureStore(tmp_path)
+    body = json.dumps({"products": [{"productId": 628, "price": "S$1,234.50"}]}).encode()
+    store.put("GET", f"{API_URL}?currency=SGD&locationId=1&productIds=628", 200,
+              {"Content-Type": "application/json"}, body)
+
+    async with ReplayServer(store) as server:
+        monkeypatch.setenv("SCRAPER_REPLAY_URL", server.url)
+        scraper = BullionStarScraper(currencies=["SGD"])
+        scraper.fx = None
+        scraper.limiter = AdaptiveRateLimiter()
+        scraper.cache = PriceCache()
+        monkeypatch.setattr(scraper, "load_products", lambda: {
+            "gold": {"id": 628, "url": "https://www.bullionstar.com/buy/product/gold", "name": "Gold"}
+        })
+        async with scraper:
+            results = await scraper.scrape_prices()
+
+    assert results["gold"]["price"] == 1234.5
+    assert server.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_errors_and_misses(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.put("GET", "https://example.com/coin", 200, {"ETag": '"v1"', "Content-Type": "text/html"}, b"<h1>Coin</h1>")
+
+    async with ReplayServer(store, latency=0.01, jitter=0.005, seed=1) as server:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(to_replay("https://example.com/coin", server.url)) as response:
+                assert response.status == 200
+                assert response.headers["Content-Type"] == "text/html"
+                assert await response.text() == "<h1>Coin</h1>"
+            async with session.get(to_replay("https://example.com/coin", server.url),
+                                   headers={"If-None-Match": '"v1"'}) as response:
+                assert response.status == 304
+            async with session.get(to_replay("https://example.com/other", server.url)) as response:
+                assert response.status == 404
+
+        server.error_rate = 1.0
+        async with aiohttp.ClientSession() as session:
+            async with session.get(to_replay("https://example.com/coin", server.url)) as response:
+                assert response.status == 503
+                assert response.headers["Retry-After"] == "1"
+
+    assert server.stats == {"requests": 4, "hits": 2, "misses": 1, "errors": 1, "not_modified": 1}
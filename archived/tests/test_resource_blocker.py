@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.utils.resource_blocker import ResourceBlocker, SiteAllowlist
+
+
+def _request(url, resource_type, page_url="https://www.bullionstar.com/buy/product/x"):
+    request = MagicMock()
+    request.url = url
+    request.resource_type = resource_type
+    request.frame.page.main_frame.url = page_url
+    return request
+
+
+def test_blocks_heavy_resource_types():
+    """画像・フォント・CSS・動画はブロック"""
+    blocker = ResourceBlocker()
+
+    for resource_type in ("image", "font", "stylesheet", "media"):
+        assert blocker.should_block("https://www.bullionstar.com/a", resource_type)
+
+
+def test_keeps_document_and_api_calls():
+    """ページ本体と価格APIは読み込む"""
+    blocker = ResourceBlocker()
+
+    assert not blocker.should_block("https://www.bullionstar.com/buy/product/x", "document")
+    assert not blocker.should_block("https://services.bullionstar.com/product/v2/prices?productIds=1", "xhr")
+    assert not blocker.should_block("https://www.bullionstar.com/app.js", "script")
+
+
+def test_blocks_tracking_domains():
+    """解析・広告ドメインはタイプに関係なくブロック"""
+    blocker = ResourceBlocker()
+
+    assert blocker.should_block("https://www.googletagmanager.com/gtm.js", "script")
+    assert blocker.should_block("https://region1.google-analytics.com/g/collect", "fetch")
+
+
+def test_site_allowlist():
+    """サイト別の許可リストが優先される"""
+    blocker = ResourceBlocker(allowlists={
+        "apmex.com": SiteAllowlist(resource_types={"stylesheet"}, domains={"cdn.apmex.com"})
+    })
+
+    assert not blocker.should_block("https://www.apmex.com/site.css", "stylesheet", site="www.apmex.com")
+    assert not blocker.should_block("https://cdn.apmex.com/img.png", "image", site="www.apmex.com")
+    assert blocker.should_block("https://www.bullionstar.com/site.css", "stylesheet", site="www.bullionstar.com")
+
+
+@pytest.mark.asyncio
+async def test_handler_aborts_and_counts_savings():
+    """中止したリクエスト数と推定節約量をページ単位で集計"""
+    blocker = ResourceBlocker()
+    image = _request("https://www.bullionstar.com/a.png", "image")
+    page = image.frame.page
+    api = _request("https://services.bullionstar.com/product/v2/prices", "xhr")
+    api.frame.page = page
+
+    image_route, api_route = AsyncMock(), AsyncMock()
+    await blocker._handle(image_route, image)
+    await blocker._handle(api_route, api)
+
+    image_route.abort.assert_awaited_once()
+    api_route.fallback.assert_awaited_once()
+
+    stats = blocker.report(page, "https://www.bullionstar.com/buy/product/x")
+    assert stats.blocked_requests == 1
+    assert stats.allowed_requests == 1
+    assert stats.bytes_saved > 0
+    assert stats.blocked_by_type == {"image": 1}
+    assert blocker.pop_stats(page).blocked_requests == 0
@@ -0,0 +1,89 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from src.utils.static_fetch import BROWSER, STATIC, ConditionalFetcher, HostPathMemory, extract_static_text
+
+
+class FakeResponse:
+    def __init__(self, status, body="", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self, errors="strict"):
+        return self.body
+
+
+def fake_session(*responses):
+    session = MagicMock()
+    session.get = MagicMock(side_effect=list(responses))
+    return session
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_reuses_body_on_304():
+    """2回目は ETag / Last-Modified を送り、304なら前回の本文を返す"""
+    session = fake_session(
+        FakeResponse(200, "<p>$30</p>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        FakeResponse(304),
+    )
+    fetcher = ConditionalFetcher()
+
+    first = await fetcher.fetch(session, "https://example.com/coin")
+    second = await fetcher.fetch(session, "https://example.com/coin")
+
+    assert first.status == 200 and not first.not_modified
+    assert second.not_modified and second.html == "<p>$30</p>"
+    headers = session.get.call_args_list[1].kwargs["headers"]
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert fetcher.not_modified == 1
+
+
+@pytest.mark.asyncio
+async def test_error_status_returns_none_and_skips_validators():
+    session = fake_session(FakeResponse(503), FakeResponse(200, "<p>x</p>"))
+    fetcher = ConditionalFetcher()
+
+    assert await fetcher.fetch(session, "https://example.com/a") is None
+    await fetcher.fetch(session, "https://example.com/a")
+    assert session.get.call_args_list[1].kwargs["headers"] == {}
+
+
+def test_host_path_memory_reprobes_browser_hosts(tmp_path):
+    """browser と記録したホストは一定時間後に静的取得を試し直す"""
+    now = [datetime(2024, 1, 1)]
+    memory = HostPathMemory(tmp_path / "paths.json", reprobe_after=timedelta(hours=1), now=lambda: now[0])
+
+    assert memory.use_static("https://a.example.com/x")
+    memory.record("https://a.example.com/x", BROWSER)
+    memory.record("https://b.example.com/x", STATIC)
+    assert not memory.use_static("https://a.example.com/other")
+    assert memory.use_static("https://b.example.com/other")
+
+    now[0] += timedelta(hours=2)
+    assert memory.use_static("https://a.example.com/x")
+
+    # 永続化されている
+    reloaded = HostPathMemory(tmp_path / "paths.json")
+    assert reloaded.path_for("https://a.example.com/") == BROWSER
+    assert reloaded.path_for("https://b.example.com/") == STATIC
+
+
+def test_extract_static_text_reads_name_and_selectors():
+    pytest.importorskip("bs4")
+    html = """
+        <h1 class="product-title"> Silver   Eagle </h1>
+        <meta itemprop="price" content="31.50">
+        <span class="price-value">$32.10</span>
+    """
+    text = extract_static_text(html, ['[itemprop="price"]', ".price-value", ".missing"], ["h1.product-title"])
+
+    assert text.name == "Silver Eagle"
+    assert text.selected == {'[itemprop="price"]': "31.50", ".price-value": "$32.10", ".missing": None}
@@ -0,0 +1,110 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.utils.structured_data import (
+    JSON_LD, MICRODATA, OPENGRAPH, StructuredData, collect_structured_data, extract_structured_price, to_amount
+)
+
+
+def json_ld(data):
+    return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+
+def test_json_ld_product_offer():
+    html = json_ld({
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": "1 oz Gold Maple Leaf",
+        "offers": {"@type": "Offer", "price": "2,345.67", "priceCurrency": "usd"},
+    })
+
+    offer = extract_structured_price(html)
+
+    assert (offer.price, offer.currency, offer.name, offer.source) == (2345.67, "USD", "1 oz Gold Maple Leaf", JSON_LD)
+
+
+def test_json_ld_graph_and_aggregate_offer():
+    """@graph 内の Product・AggregateOffer の lowPrice も読む（壊れたブロックは飛ばす）"""
+    html = '<script type="application/ld+json">{broken</script>' + json_ld({
+        "@graph": [
+            {"@type": "BreadcrumbList"},
+            {"@type": ["Product"], "name": "Eagle",
+             "offers": [{"@type": "AggregateOffer", "lowPrice": 31.5, "priceCurrency": "USD"}]},
+        ]
+    })
+
+    offer = extract_structured_price(html)
+
+    assert (offer.price, offer.currency, offer.name) == (31.5, "USD", "Eagle")
+
+
+def test_microdata_text_and_content():
+    html = """
+        <div itemscope itemtype="https://schema.org/Product">
+          <h1 itemprop="name">Silver <b>Bar</b></h1>
+          <span itemprop="price"><span>1,234</span></span>
+          <meta itemprop="priceCurrency" content="JPY">
+        </div>
+    """
+
+    offer = extract_structured_price(html)
+
+    assert (offer.price, offer.currency, offer.name, offer.source) == (1234.0, "JPY", "Silver Bar", MICRODATA)
+
+
+def test_opengraph_meta():
+    html = """
+        <meta property="og:title" content="Krugerrand">
+        <meta property="product:price:amount" content="2100.00">
+        <meta property="product:price:currency" content="EUR">
+    """
+
+    offer = extract_structured_price(html)
+
+    assert (offer.price, offer.currency, offer.name, offer.source) == (2100.0, "EUR", "Krugerrand", OPENGRAPH)
+
+
+def test_json_ld_takes_precedence_over_meta():
+    offer = {"@type": "Offer", "price": 2, "priceCurrency": "SGD"}
+    html = '<meta property="og:price:amount" content="1">' + json_ld(offer)
+
+    assert extract_structured_price(html).price == 2.0
+
+
+def test_no_price_returns_none():
+    assert extract_structured_price("<h1>Coin</h1><span class='price'>$5</span>") is None
+    assert StructuredData(json_ld=[json.dumps({"@type": "Offer", "price": "0"})]).offer() is None
+
+
+def test_to_amount():
+    assert to_amount(" 1,234.50 ") == 1234.5
+    assert to_amount("1,234") == 1234.0
+    assert to_amount("12,5") == 12.5
+    assert to_amount(7) == 7.0
+    assert to_amount("n/a") is None
+    assert to_amount(True) is None
+
+
+def test_collect_keeps_first_meta():
+    data = collect_structured_data('<meta name="og:title" content="A"><meta property="og:title" content="B">')
+    assert data.meta == {"og:title": "A"}
+
+
+@pytest.mark.asyncio
+async def test_static_scrape_uses_structured_data_without_selectors(tmp_path):
+    """構造化データがあれば HTML パーサーなしで静的取得できる"""
+    from src.coin_scraper import CoinPriceScraper
+    from src.utils.rate_limiter import AdaptiveRateLimiter
+    from src.utils.static_fetch import StaticPage
+
+    scraper = CoinPriceScraper()
+    scraper.limiter = AdaptiveRateLimiter()
+    scraper.http_session = MagicMock()
+    html = json_ld({"@type": "Product", "name": "Eagle", "offers": {"@type": "Offer", "price": "32.10"}})
+    scraper.static_fetcher.fetch = AsyncMock(return_value=StaticPage("https://www.apmex.com/p/1", 200, html))
+
+    result = await scraper.scrape_static("https://www.apmex.com/p/1")
+
+    # 通貨がなければサイトの既定通貨
+    assert (result["price"], result["currency"], result["site"], result["name"]) == (32.1, "USD", "APMEX", "Eagle")
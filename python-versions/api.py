@@ -11,13 +11,14 @@ from datetime import datetime
 import hashlib
 from functools import wraps
 
+from src.utils.price_log import get_price_log
+
 app = Flask(__name__)
 CORS(app)
 
 # 設定
 DATA_DIR = 'data'
 PRODUCTS_FILE = os.path.join(DATA_DIR, 'products.json')
-PRICE_HISTORY_FILE = os.path.join(DATA_DIR, 'price_history.json')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 
 # データディレクトリの作成
@@ -45,17 +46,9 @@ def save_products(products):
     with open(PRODUCTS_FILE, 'w', encoding='utf-8') as f:
         json.dump(products, f, ensure_ascii=False, indent=2)
 
-def load_price_history():
-    """価格履歴を読み込む"""
-    if not os.path.exists(PRICE_HISTORY_FILE):
-        return {'prices': [], 'last_update': None}
-    with open(PRICE_HISTORY_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def save_price_history(history):
-    """価格履歴を保存"""
-    with open(PRICE_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+def load_price_history(limit=None, product_key=None):
+    """価格ログから価格履歴を読み込む（limit なしは全件）"""
+    return get_price_log().history(limit, product_key)
 
 @app.route('/')
 def index():
@@ -172,8 +165,9 @@ def toggle_product(product_key):
 
 @app.route('/api/prices', methods=['GET'])
 def get_prices():
-    """価格履歴を取得"""
-    history = load_price_history()
+    """価格履歴を取得（?limit=件数（0で全件、既定1000）&product=商品キー）"""
+    limit = request.args.get('limit', 1000, type=int)
+    history = load_price_history(limit or None, request.args.get('product'))
     return jsonify(history)
 
 @app.route('/api/check-prices', methods=['POST'])
@@ -192,21 +186,18 @@ def check_prices_now():
         asyncio.set_event_loop(loop)
         prices = loop.run_until_complete(scraper.scrape_prices())
 
-        # 価格履歴を更新
-        history = load_price_history()
+        # 価格履歴に追記
+        price_log = get_price_log()
         timestamp = datetime.now().isoformat()
 
-        for product_key, price_data in prices.items():
-            history['prices'].append({
-                'product_key': product_key,
-                'product_name': products.get(product_key, {}).get('name', product_key),
-                'price': price_data['price'],
-                'currency': price_data['currency'],
-                'timestamp': timestamp
-            })
-
-        history['last_update'] = timestamp
-        save_price_history(history)
+        price_log.append_many({
+            'product_key': product_key,
+            'product_name': products.get(product_key, {}).get('name', product_key),
+            'price': price_data['price'],
+            'currency': price_data['currency'],
+            'timestamp': timestamp
+        } for product_key, price_data in prices.items())
+        price_log.flush()
 
         return jsonify({'success': True, 'prices': prices})
     except Exception as e:
@@ -5,9 +5,11 @@ BullionStar Price Monitor - Production Web Application
 """
 
 import os
+import sys
 import json
 import hashlib
 import secrets
+from pathlib import Path
 from datetime import datetime, timedelta
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session
 from flask_cors import CORS
@@ -16,11 +18,18 @@ from flask_migrate import Migrate
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from apscheduler.schedulers.background import BackgroundScheduler
-import aiohttp
 import asyncio
-import re
 from functools import wraps
 
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.utils.deadline import Budget, BudgetExceeded, product_budget
+from src.utils.http_client import get_http_client
+from src.utils.poll_scheduler import PollScheduler
+from src.utils.price_cache import PriceCache, get_price_cache
+from src.utils.price_parser import parse_price
+
 # 環境設定
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', secrets.token_hex(32))
@@ -40,6 +49,14 @@ login_manager.login_view = 'login'
 # スケジューラーの初期化
 scheduler = BackgroundScheduler()
 
+# 商品ごとの取得時刻（価格変動に応じて間隔を調整）と、期限を確認する間隔（秒）
+poll_scheduler = PollScheduler.from_env()
+POLL_TICK = int(os.getenv('POLL_TICK', '60'))
+
+# 全ルートとスケジュールジョブで共有するHTTPクライアント
+http_client = get_http_client()
+price_cache = get_price_cache()
+
 # データベースモデル
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -94,7 +111,14 @@ def admin_required(f):
 
 # 価格取得関数
 async def fetch_price_from_api(product_id, currency='JPY'):
-    """BullionStar APIから価格を取得"""
+    """BullionStar APIから価格を取得（短時間の重複呼び出しはキャッシュで吸収）"""
+    return await price_cache.get_or_fetch(
+        PriceCache.key(product_id, currency),
+        lambda: _request_price(product_id, currency)
+    )
+
+async def _request_price(product_id, currency):
+    """BullionStar APIを呼び出して価格を取得"""
     url = "https://services.bullionstar.com/product/v2/prices"
     params = {
         "currency": currency,
@@ -102,22 +126,32 @@ async def fetch_price_from_api(product_id, currency='JPY'):
         "productIds": product_id
     }
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if 'products' in data and len(data['products']) > 0:
-                        product = data['products'][0]
-                        price_str = product.get('price', '')
-                        if price_str:
-                            match = re.search(r'([\d,]+\.?\d*)', price_str)
-                            if match:
-                                return float(match.group(1).replace(',', ''))
-        except Exception as e:
-            print(f"Error fetching price: {e}")
+    try:
+        async with http_client.session.get(url, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                if 'products' in data and len(data['products']) > 0:
+                    product = data['products'][0]
+                    return parse_price(product.get('price'), currency)
+    except Exception as e:
+        print(f"Error fetching price: {e}")
     return None
 
+async def fetch_prices_from_api(targets, budget=None):
+    """(商品ID, 通貨) のリストの価格を共有セッションで並行取得（予算切れの商品はNone）"""
+    budget = budget or Budget()
+
+    async def fetch_one(product_id, currency):
+        try:
+            return await budget.run(fetch_price_from_api(product_id, currency), product_budget())
+        except BudgetExceeded:
+            return None
+
+    return await asyncio.gather(*[
+        fetch_one(product_id, currency)
+        for product_id, currency in targets
+    ])
+
 # ルート
 @app.route('/')
 def index():
@@ -187,10 +221,7 @@ def add_product():
         return jsonify({'error': 'Product already exists'}), 400
 
     # 価格を取得
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    price = loop.run_until_complete(fetch_price_from_api(product_id))
-    loop.close()
+    price = http_client.run(fetch_price_from_api(product_id))
 
     # 商品を保存
     product = Product(
@@ -249,14 +280,11 @@ def update_prices():
     products = Product.query.filter_by(enabled=True).all()
     updated = []
 
-    for product in products:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        price = loop.run_until_complete(
-            fetch_price_from_api(product.product_id, product.currency)
-        )
-        loop.close()
+    prices = http_client.run(fetch_prices_from_api(
+        [(p.product_id, p.currency) for p in products]
+    ))
 
+    for product, price in zip(products, prices):
         if price:
             # 価格変動チェック
             if product.current_price:
@@ -351,17 +379,46 @@ def setup():
 
 # スケジュールジョブ
 def scheduled_price_update():
-    """定期的な価格更新"""
+    """定期的な価格更新（取得時刻を過ぎた商品のみ）"""
     with app.app_context():
-        products = Product.query.filter_by(enabled=True).all()
-        for product in products:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            price = loop.run_until_complete(
-                fetch_price_from_api(product.product_id, product.currency)
-            )
-            loop.close()
+        enabled = {str(p.id): p for p in Product.query.filter_by(enabled=True).all()}
+
+        # 新しい商品は保存済みの価格履歴から変動を引き継ぐ
+        for key, product in enabled.items():
+            if key not in poll_scheduler:
+                recent = PriceHistory.query.filter_by(product_id=product.id) \
+                    .order_by(PriceHistory.timestamp.desc()).limit(poll_scheduler.history_size).all()
+                poll_scheduler.add(key, prices=[h.price for h in reversed(recent)])
+        poll_scheduler.sync(enabled)
+
+        products = [enabled[key] for key in poll_scheduler.due()]
+        if not products:
+            return
+
+        # 次の確認に重ならないようサイクル全体の予算を設ける
+        budget = Budget.from_env('CYCLE_BUDGET', POLL_TICK * 0.8)
+        try:
+            prices = http_client.run(fetch_prices_from_api(
+                [(p.product_id, p.currency) for p in products],
+                budget
+            ))
+        except Exception:
+            # 取得中のまま残さず、最短間隔で再試行する
+            for product in products:
+                poll_scheduler.record_failure(str(product.id))
+            raise
+
+        for product, price in zip(products, prices):
+            if price:
+                poll_scheduler.record(str(product.id), price)
+            else:
+                poll_scheduler.record_failure(str(product.id))
+
+        missing = [product.name for product, price in zip(products, prices) if not price]
+        if missing:
+            print(f"Partial price update: {len(missing)} products missing: {', '.join(missing)}")
 
+        for product, price in zip(products, prices):
             if price:
                 product.current_price = price
                 product.updated_at = datetime.utcnow()
@@ -386,7 +443,7 @@ def initialize():
         scheduler.add_job(
             func=scheduled_price_update,
             trigger="interval",
-            hours=1,
+            seconds=POLL_TICK,
             id='price_update',
             replace_existing=True
         )
@@ -4,9 +4,18 @@ BullionStarの商品IDを特定するスクリプト
 """
 
 import asyncio
-from playwright.async_api import async_playwright
+import os
+import sys
+from pathlib import Path
 import re
 
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.utils.browser_service import close_browser_service, get_browser_service
+from src.scrapers.bullionstar import BullionStarScraper
+from src.utils.discovery_index import ProductDiscoveryIndex
+
 async def find_product_ids():
     """各商品ページから商品IDを抽出"""
 
@@ -25,54 +34,94 @@ async def find_product_ids():
         }
     ]
 
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=True)
-    context = await browser.new_context()
-    page = await context.new_page()
-
     print("BullionStar商品ID検出")
     print("=" * 70)
 
+    # 検出済みの商品はインデックスから表示し、ブラウザを起動しない
+    index = ProductDiscoveryIndex()
+    pending = []
+    stale = []
     for product in products:
-        try:
+        entry = index.lookup(product['url'])
+        if entry and not index.needs_revalidation(entry):
             print(f"\n商品: {product['name']}")
-            print(f"URL: {product['url']}")
-
-            # APIコールを監視
-            api_calls = []
-
-            async def handle_request(request):
-                if 'services.bullionstar.com' in request.url and 'productIds' in request.url:
-                    api_calls.append(request.url)
-
-            page.on('request', handle_request)
-
-            await page.goto(product['url'], wait_until='networkidle')
-
-            # APIコールから商品IDを抽出
-            for api_url in api_calls:
-                match = re.search(r'productIds=(\d+)', api_url)
-                if match:
-                    product_id = match.group(1)
-                    print(f"✅ 商品ID: {product_id}")
-                    break
-            else:
-                # ページのHTMLから商品IDを探す
-                html = await page.content()
-                match = re.search(r'productId["\']?\s*[:=]\s*["\']?(\d+)', html)
-                if match:
-                    product_id = match.group(1)
-                    print(f"✅ 商品ID (HTML): {product_id}")
-                else:
-                    print("❌ 商品IDが見つかりませんでした")
-
+            print(f"✅ 商品ID (キャッシュ): {entry['product_id']}")
+        elif entry:
+            stale.append((product, entry))
+        else:
+            pending.append(product)
+
+    # 古いエントリは価格APIで商品IDがまだ有効か確認（無効なものだけブラウザで再検出）
+    if stale:
+        try:
+            async with BullionStarScraper() as api:
+                prices = await api.fetch_prices(
+                    [entry['product_id'] for _, entry in stale], os.getenv('CURRENCY', 'JPY')
+                )
         except Exception as e:
-            print(f"❌ エラー: {e}")
-
-        await asyncio.sleep(2)
-
-    await context.close()
-    await browser.close()
+            # API障害時は既存のエントリをそのまま使う
+            print(f"⚠️ 価格APIで確認できませんでした: {e}")
+            prices = {str(entry['product_id']): None for _, entry in stale}
+        for product, entry in stale:
+            if str(entry['product_id']) in prices:
+                if prices[str(entry['product_id'])] is not None:
+                    index.mark_validated(product['url'])
+                print(f"\n商品: {product['name']}")
+                print(f"✅ 商品ID (キャッシュ・再検証): {entry['product_id']}")
+            else:
+                index.forget(product['url'])
+                pending.append(product)
+
+    if not pending:
+        print("\n" + "=" * 70)
+        print("検出完了")
+        return
+
+    # 共有ブラウザサービスのコンテキストを借りる
+    try:
+        async with get_browser_service().page() as page:
+            for product in pending:
+                try:
+                    print(f"\n商品: {product['name']}")
+                    print(f"URL: {product['url']}")
+
+                    # APIコールを監視
+                    api_calls = []
+
+                    async def handle_request(request):
+                        if 'services.bullionstar.com' in request.url and 'productIds' in request.url:
+                            api_calls.append(request.url)
+
+                    page.on('request', handle_request)
+
+                    await page.goto(product['url'], wait_until='networkidle')
+
+                    # APIコールから商品IDを抽出
+                    for api_url in api_calls:
+                        match = re.search(r'productIds=(\d+)', api_url)
+                        if match:
+                            product_id = match.group(1)
+                            print(f"✅ 商品ID: {product_id}")
+                            index.record(product['url'], product_id, product['name'])
+                            break
+                    else:
+                        # ページのHTMLから商品IDを探す
+                        html = await page.content()
+                        match = re.search(r'productId["\']?\s*[:=]\s*["\']?(\d+)', html)
+                        if match:
+                            product_id = match.group(1)
+                            print(f"✅ 商品ID (HTML): {product_id}")
+                            index.record(product['url'], product_id, product['name'])
+                        else:
+                            print("❌ 商品IDが見つかりませんでした")
+
+                except Exception as e:
+                    print(f"❌ エラー: {e}")
+
+                await asyncio.sleep(2)
+
+    finally:
+        await close_browser_service()
 
     print("\n" + "=" * 70)
     print("検出完了")
@@ -15,6 +15,7 @@ from src.config import Config, setup_logging
 from src.scraper import BullionStarScraper
 from src.analyzer import PriceAnalyzer
 from src.notifier import EmailNotifier
+from src.utils.browser_service import close_browser_service
 import logging
 
 async def main():
@@ -72,6 +73,9 @@ async def main():
         logger.error(f"Fatal error: {e}", exc_info=True)
         return 1
 
+    finally:
+        await close_browser_service()
+
 if __name__ == "__main__":
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
\ No newline at end of file
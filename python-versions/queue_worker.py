@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+価格取得ワーカー
+ジョブキュー（JOB_QUEUE）から商品ジョブを取得して価格を取得する。台数を増やすほど並列に処理できる
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dotenv import load_dotenv
+from src.jobs.scrape import ScrapeJobWorker, get_job_queue
+from src.utils.browser_service import close_browser_service
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(exit_when_idle: bool) -> int:
+    """メイン処理"""
+    load_dotenv()
+    queue = get_job_queue()
+    if queue is None:
+        logger.error("JOB_QUEUE is not set")
+        return 1
+
+    try:
+        await ScrapeJobWorker(queue).run(exit_when_idle=exit_when_idle)
+        return 0
+    finally:
+        queue.close()
+        await close_browser_service()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="価格取得ジョブのワーカー")
+    parser.add_argument("--once", action="store_true", help="取得できるジョブがなくなったら終了")
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(main(args.once)))
+    except KeyboardInterrupt:
+        sys.exit(0)
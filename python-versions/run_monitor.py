@@ -4,7 +4,7 @@ import logging
 import os
 import sys
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 from dotenv import load_dotenv
 
 # プロジェクトのパスを追加
@@ -13,6 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from src.scrapers.bullionstar import BullionStarScraper
 from src.notifiers.email_notifier import EmailNotifier
 from src.analyzers.price_analyzer import PriceAnalyzer
+from src.utils.deadline import Budget
+from src.utils.poll_scheduler import PollScheduler
 
 # ロギング設定
 def setup_logging():
@@ -44,6 +46,8 @@ class GoldPriceMonitor:
         self.recipient_email = os.getenv("RECIPIENT_EMAIL")
         self.threshold_price = float(os.getenv("THRESHOLD_PRICE", "3000"))
         self.check_interval = int(os.getenv("CHECK_INTERVAL", "3600"))  # デフォルト1時間
+        # 1サイクルの時間予算（既定は監視間隔の8割、次のチェックに重ならないように）
+        self.cycle_budget = float(os.getenv("CYCLE_BUDGET", self.check_interval * 0.8))
 
         # 設定の検証
         self._validate_config()
@@ -52,6 +56,8 @@ class GoldPriceMonitor:
         self.scraper = BullionStarScraper()
         self.notifier = EmailNotifier(self.gmail_address, self.gmail_password)
         self.analyzer = PriceAnalyzer()
+        # 直近のサイクルで取得した価格（商品キー -> 結果）
+        self.last_prices = {}
 
     def _validate_config(self):
         """設定の検証"""
@@ -65,14 +71,17 @@ class GoldPriceMonitor:
         if missing:
             raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
 
-    async def run_once(self) -> bool:
-        """1回の監視サイクルを実行"""
+    async def run_once(self, product_keys: Optional[Iterable[str]] = None) -> bool:
+        """1回の監視サイクルを実行（product_keys を指定すればその商品のみ）"""
+        self.last_prices = {}
         try:
             logger.info("Starting price check cycle")
 
-            # 価格を取得
+            # 価格を取得（予算切れの場合は取得できた分だけで続行）
+            budget = Budget(self.cycle_budget)
             async with self.scraper as scraper:
-                prices = await scraper.scrape_prices()
+                prices = await scraper.scrape_prices(budget, product_keys)
+            self.last_prices = prices
 
             if not prices:
                 logger.warning("No prices were scraped")
@@ -196,18 +205,36 @@ class GoldPriceMonitor:
         return html
 
     async def run_continuous(self):
-        """継続的な監視を実行"""
-        logger.info(f"Starting continuous monitoring (interval: {self.check_interval}s)")
+        """継続的な監視を実行（商品ごとに価格変動に応じた間隔で取得）"""
+        scheduler = PollScheduler.from_env(base_interval=self.check_interval)
+        logger.info(
+            f"Starting continuous monitoring (interval: {scheduler.min_interval:.0f}-{scheduler.max_interval:.0f}s, "
+            f"base {scheduler.base_interval:.0f}s)"
+        )
 
         while True:
-            try:
-                await self.run_once()
-            except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-
-            # 次のチェックまで待機
-            logger.info(f"Waiting {self.check_interval} seconds until next check")
-            await asyncio.sleep(self.check_interval)
+            # 商品の追加・削除を反映
+            scheduler.sync(self.scraper.load_products())
+
+            due = scheduler.due()
+            if due:
+                try:
+                    await self.run_once(due)
+                except Exception as e:
+                    logger.error(f"Unexpected error: {e}")
+
+                for product_key in due:
+                    result = self.last_prices.get(product_key)
+                    if result:
+                        scheduler.record(product_key, result['price'])
+                    else:
+                        scheduler.record_failure(product_key)
+
+            # 次に期限が来る商品まで待機（商品の追加を拾うため最短間隔より長くは待たない）
+            wait = scheduler.seconds_until_next()
+            wait = scheduler.min_interval if wait is None else min(wait, scheduler.min_interval)
+            logger.info(f"Waiting {wait:.0f} seconds until next check")
+            await asyncio.sleep(wait)
 
 async def main():
     """メイン関数"""
@@ -11,12 +11,16 @@ import sys
 import requests
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 # プロジェクトルートをパスに追加
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.coin_scraper import CoinPriceScraper
+from src.jobs.scrape import get_job_queue, scrape_via_queue
+from src.utils.browser_service import close_browser_service
+from src.utils.deadline import Budget
+from src.utils.price_log import get_price_log
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +33,7 @@ class CloudflareKVUpdater:
     def __init__(self):
         self.worker_url = os.getenv('WORKER_URL', 'https://coin-price-checker.h-abe.workers.dev')
         self.admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
+        self.price_log = get_price_log()
 
     def get_products(self) -> Dict:
         """KVから商品リストを取得"""
@@ -69,39 +74,27 @@ class CloudflareKVUpdater:
             logger.error(f"Failed to update price for {product_key}: {e}")
             return False
 
-    def save_price_history(self, product_key: str, product_name: str, price: float):
-        """価格履歴をローカルに保存"""
-        history_file = Path("data/price_history.json")
-        history_file.parent.mkdir(exist_ok=True)
-
-        # 既存の履歴を読み込み
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        else:
-            history = {'prices': [], 'last_update': None}
-
-        # 新しい価格を追加
-        history['prices'].append({
+    def save_price_history(
+        self,
+        product_key: str,
+        product_name: str,
+        price: float,
+        currency: str = 'JPY',
+        prices: Optional[Dict[str, float]] = None,
+        timestamp: Optional[str] = None
+    ):
+        """価格履歴を価格ログに追記（prices は同じ観測時刻の通貨別価格、書き込みは sync_every 件ごと）"""
+        self.price_log.append({
             'product_key': product_key,
             'product_name': product_name,
             'price': price,
-            'currency': 'JPY',
-            'timestamp': datetime.now().isoformat()
+            'currency': currency,
+            'prices': prices or {currency: price},
+            'timestamp': timestamp or datetime.now().isoformat()
         })
 
-        history['last_update'] = datetime.now().isoformat()
-
-        # 最新1000件のみ保持
-        if len(history['prices']) > 1000:
-            history['prices'] = history['prices'][-1000:]
-
-        # 保存
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
-
-    def update_all_prices_in_kv(self, price_results: Dict):
-        """すべての価格をCloudflare KVに一括更新"""
+    def update_all_prices_in_kv(self, price_results: Dict, missing: List[str] = ()):
+        """すべての価格をCloudflare KVに一括更新（missing の商品は前回の価格のまま stale を付ける）"""
         try:
             # 現在の商品データを取得
             products = self.get_products()
@@ -111,9 +104,17 @@ class CloudflareKVUpdater:
             for product_key, result in price_results.items():
                 if product_key in products:
                     products[product_key]['current_price'] = result['price']
+                    if result.get('prices'):
+                        products[product_key]['prices'] = result['prices']
                     products[product_key]['last_updated'] = result['timestamp']
+                    products[product_key].pop('stale', None)
                     updated.append(product_key)
 
+            # 時間切れ等で取得できなかった商品に印を付ける
+            for product_key in missing:
+                if product_key in products:
+                    products[product_key]['stale'] = True
+
             # Worker API経由で一括更新
             # 注: 現在のWorkerは個別更新のみサポートしているため、
             # GitHub Actionsからdata/products.jsonを直接更新する方法を使用
@@ -154,9 +155,19 @@ async def main():
 
         logger.info(f"Found {len(products)} products to check")
 
-        # Playwrightで価格を取得
-        scraper = CoinPriceScraper()
-        price_results = await scraper.run(products)
+        # Playwrightで価格を取得（サイクル全体の予算内、取得できなかった商品は missing に残る）
+        budget = Budget.from_env('CYCLE_BUDGET', 600)
+        queue = get_job_queue()
+        if queue:
+            # ジョブキュー経由（他のマシンのワーカーも取得に参加、このプロセスもワーカーを1つ動かす）
+            try:
+                price_results, missing = await scrape_via_queue(queue, products, budget)
+            finally:
+                queue.close()
+        else:
+            scraper = CoinPriceScraper()
+            price_results = await scraper.run(products, budget)
+            missing = scraper.missing
 
         if not price_results:
             logger.error("No prices retrieved")
@@ -192,7 +203,7 @@ async def main():
                 )
 
         # KVを更新
-        updater.update_all_prices_in_kv(price_results)
+        updater.update_all_prices_in_kv(price_results, missing)
 
         # 価格履歴を保存
         for product_key, result in price_results.items():
@@ -200,8 +211,12 @@ async def main():
                 updater.save_price_history(
                     product_key,
                     products[product_key]['name'],
-                    result['price']
+                    result['price'],
+                    result.get('currency', 'JPY'),
+                    result.get('prices'),
+                    result.get('timestamp')
                 )
+        updater.price_log.flush()
 
         logger.info("Price update completed successfully")
         return 0
@@ -210,6 +225,9 @@ async def main():
         logger.error(f"Fatal error: {e}", exc_info=True)
         return 1
 
+    finally:
+        await close_browser_service()
+
 
 if __name__ == "__main__":
     exit_code = asyncio.run(main())
@@ -7,17 +7,44 @@ Web UI for BullionStar Price Monitor
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from flask_cors import CORS
 import json
-import asyncio
+import sys
 from pathlib import Path
 from datetime import datetime
-import aiohttp
-from playwright.async_api import async_playwright
 import re
 import os
+import atexit
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.utils.browser_service import get_browser_service
+from src.utils.discovery_index import ProductDiscoveryIndex
+from src.utils.http_client import get_http_client
+from src.utils.price_cache import PriceCache, get_price_cache
+from src.utils.price_log import get_price_log
+from src.utils.price_parser import parse_price
+from src.utils.page_readiness import wait_for_response_during
 
 app = Flask(__name__)
 CORS(app)
 
+# 価格APIの呼び出しで共有するHTTPクライアント
+http_client = get_http_client()
+price_cache = get_price_cache()
+
+# 商品ID検出で共有する常駐ブラウザ（HTTPクライアントのループ上で起動・終了）
+browser_service = get_browser_service()
+
+def close_browser():
+    """終了時にブラウザを閉じる"""
+    if browser_service.started:
+        http_client.run(browser_service.close(), timeout=10)
+
+atexit.register(close_browser)
+
+# 検出済みの URL -> 商品ID（ブラウザでの再検出を省く）
+discovery_index = ProductDiscoveryIndex()
+
 # データファイルのパス
 PRODUCTS_FILE = Path("data/products.json")
 PRODUCTS_FILE.parent.mkdir(exist_ok=True)
@@ -35,61 +62,73 @@ def save_products(products):
         json.dump(products, f, indent=2, ensure_ascii=False)
 
 async def detect_product_id(url):
-    """URLから商品IDを自動検出"""
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=True)
-    context = await browser.new_context()
-    page = await context.new_page()
-
+    """URLから商品IDを自動検出（常駐ブラウザの温めたコンテキストを使用）"""
+    async with browser_service.page() as page:
+        try:
+            return await _detect_on_page(page, url)
+        except Exception as e:
+            print(f"Error detecting product ID: {e}")
+            return None, None
+        finally:
+            if browser_service.blocker:
+                browser_service.blocker.report(page, url)
+
+async def _detect_on_page(page, url):
+    """ページの価格API呼び出しとHTMLから商品IDと商品名を取得"""
     product_id = None
     product_name = None
 
-    try:
-        # APIコールを監視
-        api_calls = []
+    # APIコールを監視
+    api_calls = []
 
-        async def handle_request(request):
-            if 'services.bullionstar.com' in request.url and 'productIds' in request.url:
-                api_calls.append(request.url)
+    async def handle_request(request):
+        if 'services.bullionstar.com' in request.url and 'productIds' in request.url:
+            api_calls.append(request.url)
 
-        page.on('request', handle_request)
+    page.on('request', handle_request)
 
-        await page.goto(url, wait_until='networkidle', timeout=30000)
+    # 商品IDを含む価格APIの呼び出しまで待つ（networkidleまで待たない）
+    await wait_for_response_during(
+        page,
+        lambda: page.goto(url, wait_until='domcontentloaded', timeout=30000),
+        'productIds',
+        10.0
+    )
 
-        # APIコールから商品IDを抽出
-        for api_url in api_calls:
-            match = re.search(r'productIds=(\d+)', api_url)
-            if match:
-                product_id = int(match.group(1))
-                break
+    # APIコールから商品IDを抽出
+    for api_url in api_calls:
+        match = re.search(r'productIds=(\d+)', api_url)
+        if match:
+            product_id = int(match.group(1))
+            break
 
-        # 商品名を取得
-        try:
-            h1_element = await page.query_selector('h1')
-            if h1_element:
-                product_name = await h1_element.inner_text()
-                product_name = product_name.strip()
-        except:
-            pass
-
-        # IDが見つからない場合はHTMLから探す
-        if not product_id:
-            html = await page.content()
-            match = re.search(r'productId["\']?\s*[:=]\s*["\']?(\d+)', html)
-            if match:
-                product_id = int(match.group(1))
-
-    except Exception as e:
-        print(f"Error detecting product ID: {e}")
-
-    finally:
-        await context.close()
-        await browser.close()
+    # 商品名を取得
+    try:
+        h1_element = await page.query_selector('h1')
+        if h1_element:
+            product_name = await h1_element.inner_text()
+            product_name = product_name.strip()
+    except:
+        pass
+
+    # IDが見つからない場合はHTMLから探す
+    if not product_id:
+        html = await page.content()
+        match = re.search(r'productId["\']?\s*[:=]\s*["\']?(\d+)', html)
+        if match:
+            product_id = int(match.group(1))
 
     return product_id, product_name
 
 async def test_product_price(product_id, currency="JPY"):
-    """商品IDから価格を取得してテスト"""
+    """商品IDから価格を取得してテスト（直前に取得した価格はキャッシュから返す）"""
+    return await price_cache.get_or_fetch(
+        PriceCache.key(product_id, currency),
+        lambda: _request_price(product_id, currency)
+    )
+
+async def _request_price(product_id, currency):
+    """BullionStar APIを呼び出して価格を取得"""
     url = "https://services.bullionstar.com/product/v2/prices"
     params = {
         "currency": currency,
@@ -97,19 +136,39 @@ async def test_product_price(product_id, currency="JPY"):
         "productIds": product_id
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                if 'products' in data and len(data['products']) > 0:
-                    product = data['products'][0]
-                    price_str = product.get('price', '')
-                    if price_str:
-                        match = re.search(r'([\d,]+\.?\d*)', price_str)
-                        if match:
-                            return float(match.group(1).replace(',', ''))
+    async with http_client.session.get(url, params=params) as response:
+        if response.status == 200:
+            data = await response.json()
+            if 'products' in data and len(data['products']) > 0:
+                product = data['products'][0]
+                return parse_price(product.get('price'), currency)
     return None
 
+def resolve_product_id(url):
+    """検出インデックスを確認し、なければブラウザで商品IDを検出して登録"""
+    entry = discovery_index.lookup(url)
+    if entry:
+        if not discovery_index.needs_revalidation(entry):
+            return entry['product_id'], entry['name']
+
+        # 古いエントリは価格APIで商品IDがまだ有効か確認
+        try:
+            valid = http_client.run(test_product_price(entry['product_id'])) is not None
+        except Exception:
+            # API障害時は既存のエントリをそのまま使う
+            return entry['product_id'], entry['name']
+        if valid:
+            discovery_index.mark_validated(url)
+            return entry['product_id'], entry['name']
+        discovery_index.forget(url)
+
+    # ブラウザサービスはHTTPクライアントの常駐ループ上で動かす
+    product_id, product_name = http_client.run(detect_product_id(url))
+
+    if product_id:
+        discovery_index.record(url, product_id, product_name)
+    return product_id, product_name
+
 @app.route('/')
 def index():
     """メインページ"""
@@ -131,20 +190,14 @@ def add_product():
     if not url:
         return jsonify({'error': 'URL is required'}), 400
 
-    # 商品IDと名前を自動検出（非同期処理）
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    product_id, product_name = loop.run_until_complete(detect_product_id(url))
-    loop.close()
+    # 商品IDと名前を取得（未検出のURLのみブラウザで検出）
+    product_id, product_name = resolve_product_id(url)
 
     if not product_id:
         return jsonify({'error': 'Could not detect product ID from URL'}), 400
 
     # 価格テスト
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    price = loop.run_until_complete(test_product_price(product_id))
-    loop.close()
+    price = http_client.run(test_product_price(product_id))
 
     if not price:
         return jsonify({'error': 'Could not fetch price for this product'}), 400
@@ -202,15 +255,12 @@ def test_url():
     if not url:
         return jsonify({'error': 'URL is required'}), 400
 
-    # 商品IDと名前を自動検出
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    product_id, product_name = loop.run_until_complete(detect_product_id(url))
+    # 商品IDと名前を取得（未検出のURLのみブラウザで検出）
+    product_id, product_name = resolve_product_id(url)
 
     if product_id:
         # 価格を取得
-        price = loop.run_until_complete(test_product_price(product_id))
-        loop.close()
+        price = http_client.run(test_product_price(product_id))
 
         return jsonify({
             'success': True,
@@ -220,17 +270,13 @@ def test_url():
             'currency': os.getenv('CURRENCY', 'JPY')
         })
 
-    loop.close()
     return jsonify({'error': 'Could not detect product information'}), 400
 
 @app.route('/api/prices/history', methods=['GET'])
 def get_price_history():
-    """価格履歴を取得"""
-    history_file = Path("data/price_history.json")
-    if history_file.exists():
-        with open(history_file, 'r') as f:
-            return jsonify(json.load(f))
-    return jsonify({})
+    """価格履歴を取得（?limit=件数（0で全件、既定1000）&product=商品キー）"""
+    limit = request.args.get('limit', 1000, type=int)
+    return jsonify(get_price_log().history(limit or None, request.args.get('product')))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file